@@ -0,0 +1,84 @@
+"""
+benchmark_excel_read - compares full workbook load and streaming Excel read
+
+Usage: python benchmark/benchmark_excel_read.py (--rows 200000) (--files 4) (--workers 4)
+"""
+# package to handle arguments from command line
+import argparse
+# package to handle files/folders and related metadata/operations
+import os
+# package to interact with the interpreter
+import sys
+# package to create temporary folders
+import tempfile
+# package to measure elapsed time
+import time
+# package to handle numerical structures
+import numpy
+# package to write Excel workbooks
+import openpyxl
+# package to handle Data Frames
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'sources'))
+from tableau_hyper_management.DataDiskRead import DataDiskRead
+
+
+def build_workbook(file_name, rows_count):
+    random_generator = numpy.random.default_rng(seed=20)
+    work_book = openpyxl.Workbook(write_only=True)
+    work_sheet = work_book.create_sheet('Data')
+    work_sheet.append(['Country', 'Amount', 'Quantity', 'Comment'])
+    amounts = random_generator.integers(0, 100000, rows_count) / 100
+    quantities = random_generator.integers(0, 1000, rows_count)
+    for crt_row in range(rows_count):
+        work_sheet.append(['RO' if crt_row % 3 == 0 else 'FR', float(amounts[crt_row]),
+                           int(quantities[crt_row]), None if crt_row % 7 == 0 else 'text'])
+    work_book.save(file_name)
+
+
+def current_read(file_list):
+    return pd.concat([pd.read_excel(io=crt_file, verbose=True) for crt_file in file_list])
+
+
+def streaming_read(file_list, workers_count):
+    in_dict = {
+        'column renames': {},
+        'columns': [],
+        'error details': None,
+        'excel range': 'Data',
+        'files list': file_list,
+        'filter rule': None,
+        'format': 'excel',
+        'workers': workers_count,
+    }
+    in_dict = DataDiskRead.fn_internal_load_excel_file_into_data_frame(in_dict)
+    if in_dict['error details'] is not None:
+        raise in_dict['error details']
+    return in_dict['out data frame']
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=4)
+    parameters = parser.parse_args()
+    folder = tempfile.mkdtemp()
+    files = [os.path.join(folder, 'workbook_' + str(crt_file) + '.xlsx')
+             for crt_file in range(parameters.files)]
+    for crt_file_name in files:
+        build_workbook(crt_file_name, parameters.rows)
+    results = {}
+    for crt_label in ('current', 'streaming'):
+        start_time = time.perf_counter()
+        if crt_label == 'current':
+            data_frame = current_read(files)
+        else:
+            data_frame = streaming_read(files, parameters.workers)
+        results[crt_label] = time.perf_counter() - start_time
+        print('{label:>10}: {seconds:8.2f} seconds, {rate:12,.0f} rows/second'.format(
+            label=crt_label, seconds=results[crt_label],
+            rate=len(data_frame) / results[crt_label]))
+    print('{label:>10}: {ratio:8.1f}x'.format(
+        label='speed-up', ratio=results['current'] / results['streaming']))
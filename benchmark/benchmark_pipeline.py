@@ -0,0 +1,278 @@
+"""
+benchmark_pipeline - measures conversion pipeline throughput on synthetic data
+
+Every stage (load, structure detection, rebuild, insert, read-back, export) is measured
+in isolation (best of given repeats, with inputs prepared upfront) and then end-to-end,
+with rows/second, process peak resident memory so far (a high-water mark, not the peak
+of a single stage) and timings stored into a JSON report
+
+Usage: python benchmark/benchmark_pipeline.py (--rows 1000000)
+    (--columns int:2,float-dot:2,date-YMD:1,date-DMY:1,datetime-24-YMD:1,str:2)
+    (--null-share 0.1) (--repeats 3) (--report-file benchmark-report.json)
+    (--baseline-file <previous_report>.json)
+"""
+# package to handle arguments from command line
+import argparse
+# package to handle JSON report
+import json
+# package to produce structured logs
+import logging
+# package to handle files/folders and related metadata/operations
+import os
+# package to identify the running platform
+import platform
+# package to interact with the interpreter
+import sys
+# package to create temporary folders
+import tempfile
+# package to measure elapsed time
+import time
+# useful methods to measure time performance by small pieces of code
+from codetiming import Timer
+# package to handle numerical structures
+import numpy
+# package to handle Data Frames
+import pandas as pd
+# package to measure peak resident memory (not available on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+REPOSITORY_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPOSITORY_FOLDER, 'sources'))
+from tableau_hyper_management.DataDiskRead import DataDiskRead
+from tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+from tableau_hyper_management.TypeDetermination import TypeDetermination
+
+STAGES = ['load', 'structure detection', 'rebuild', 'insert', 'read-back', 'export']
+
+
+def build_column(column_type, rows_count, null_share, random_generator):
+    days = pd.Timestamp('2000-01-01') \
+        + pd.to_timedelta(random_generator.integers(0, 9000, rows_count), unit='D')
+    seconds = pd.to_timedelta(random_generator.integers(0, 86400, rows_count), unit='s')
+    generators = {
+        'int': lambda: random_generator.integers(-100000, 100000, rows_count),
+        'float-dot': lambda: numpy.round(random_generator.random(rows_count) * 10000, 2),
+        'date-YMD': lambda: days.strftime('%Y-%m-%d'),
+        'date-MDY': lambda: days.strftime('%m/%d/%Y'),
+        'date-DMY': lambda: days.strftime('%d.%m.%Y'),
+        'datetime-24-YMD': lambda: (days + seconds).strftime('%Y-%m-%d %H:%M:%S'),
+        'str': lambda: pd.Series(random_generator.integers(0, 5000, rows_count))
+        .map('Text {}'.format).mask(random_generator.random(rows_count) < null_share),
+    }
+    if column_type not in generators:
+        raise ValueError('Unknown column type "' + column_type + '", known ones are: '
+                         + ', '.join(generators.keys()))
+    return generators[column_type]()
+
+
+def build_data_file(file_name, parameters):
+    random_generator = numpy.random.default_rng(seed=20)
+    columns = {}
+    for crt_definition in parameters.columns.split(','):
+        column_type, column_count = crt_definition.split(':')
+        for crt_index in range(int(column_count)):
+            columns[column_type + ' ' + str(crt_index + 1)] = build_column(
+                column_type, parameters.rows, parameters.null_share, random_generator)
+    pd.DataFrame(columns).to_csv(file_name, index=False)
+
+
+def get_peak_rss_mb():
+    if resource is None:
+        return None
+    # Linux reports kilobytes, macOS bytes
+    divider = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divider, 1)
+
+
+def load_data_types():
+    with open(os.path.join(REPOSITORY_FOLDER, 'sources', 'config',
+                           'tableau-hyper-management.json'), 'r') as config_file:
+        data_types = json.load(config_file)['data_types']
+    # same special cases as converter
+    data_types['empty'] = '^$'
+    data_types['str'] = ''
+    return data_types
+
+
+class PipelineStages:
+    logger = None
+    settings = None
+    thael = None
+    td = None
+    timer = None
+
+    def __init__(self, in_settings):
+        self.logger = logging.getLogger(__name__)
+        self.settings = in_settings
+        self.thael = TableauHyperApiExtraLogic('en_US')
+        self.td = TypeDetermination('en_US')
+        self.timer = Timer('benchmark', logger=None)
+
+    def load(self, in_artifacts):
+        in_dict = DataDiskRead.fn_internal_load_csv_file_into_data_frame({
+            'column renames': {},
+            'columns': [],
+            'compression': 'infer',
+            'error details': None,
+            'field delimiter': ',',
+            'files list': [self.settings['input file']],
+            'filter rule': None,
+            'format': 'csv',
+            'workers': 1,
+        })
+        if in_dict['error details'] is not None:
+            raise in_dict['error details']
+        # file name column is not part of the generated content
+        in_artifacts['data frame'] = in_dict['out data frame'].drop(
+            columns=['Source Data File Name'])
+        return len(in_artifacts['data frame'])
+
+    def structure_detection(self, in_artifacts):
+        in_artifacts['data frame structure'] = self.td.fn_get_data_frame_structure(
+            self.logger, self.timer, {
+                'data frame': in_artifacts['data frame'],
+                'input data types': self.settings['data types'],
+                'input parameters': argparse.Namespace(
+                    unique_values_to_analyze_limit=self.settings['unique values limit']),
+            })
+        in_artifacts['hyper table columns'] = self.thael.fn_build_hyper_columns(
+            self.logger, self.timer, in_artifacts['data frame structure'])
+        return len(in_artifacts['data frame'])
+
+    def rebuild(self, in_artifacts):
+        # rebuild changes data frame in place, so every run gets its own copy
+        in_artifacts['data'] = self.thael.fn_rebuild_data_frame_content_for_hyper(
+            self.logger, self.timer, {
+                'data frame': in_artifacts['data frame'].copy(),
+                'data frame structure': in_artifacts['data frame structure'],
+            })
+        return len(in_artifacts['data'])
+
+    def insert(self, in_artifacts):
+        self.thael.fn_hyper_handle(self.logger, self.timer, {
+            'action': 'overwrite',
+            'data': in_artifacts['data'],
+            'hyper file': self.settings['hyper file'],
+            'hyper table columns': in_artifacts['hyper table columns'],
+            'schema name': 'Extract',
+            'table name': 'Extract',
+        })
+        return len(in_artifacts['data'])
+
+    def read_back(self, in_artifacts):
+        in_artifacts['read data frame'] = self.thael.fn_hyper_handle(
+            self.logger, self.timer, {
+                'action': 'read',
+                'hyper file': self.settings['hyper file'],
+            })
+        return len(in_artifacts['read data frame'])
+
+    def export(self, in_artifacts):
+        in_dict = {
+            'action': 'export',
+            'hyper file': self.settings['hyper file'],
+            'output': {
+                'chunk rows': self.settings['chunk rows'],
+                'compression': 'infer',
+                'field delimiter': ',',
+                'format': 'csv',
+                'name': self.settings['export file'],
+            },
+        }
+        self.thael.fn_hyper_handle(self.logger, self.timer, in_dict)
+        return len(in_artifacts['data'])
+
+    def run(self, in_stage, in_artifacts):
+        start_time = time.perf_counter()
+        rows_count = getattr(self, in_stage.replace(' ', '_').replace('-', '_'))(in_artifacts)
+        return rows_count, time.perf_counter() - start_time
+
+
+def build_stage_result(rows_count, seconds):
+    return {
+        # ru_maxrss only grows, so this is the process peak reached up to this stage
+        'process peak RSS so far [MB]': get_peak_rss_mb(),
+        'rows': rows_count,
+        'rows per second': round(rows_count / seconds) if seconds != 0 else None,
+        'seconds': round(seconds, 4),
+    }
+
+
+def compare_with_baseline(in_report, baseline_file):
+    with open(baseline_file, 'r') as file_handle:
+        baseline = json.load(file_handle)
+    print('{stage:>20}: {ratio}'.format(stage='vs. baseline', ratio='time ratio (>1 = slower)'))
+    for crt_stage, crt_result in list(in_report['Stages'].items()) \
+            + [('end-to-end', in_report['End To End'])]:
+        if crt_stage == 'end-to-end':
+            baseline_result = baseline.get('End To End')
+        else:
+            baseline_result = baseline.get('Stages', {}).get(crt_stage)
+        if baseline_result is not None and baseline_result['seconds'] != 0:
+            print('{stage:>20}: {ratio:8.2f}x'.format(
+                stage=crt_stage, ratio=crt_result['seconds'] / baseline_result['seconds']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--columns', type=str,
+                        default='int:2,float-dot:2,date-YMD:1,date-DMY:1,datetime-24-YMD:1,str:2')
+    parser.add_argument('--null-share', type=float, default=0.1)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--unique-values-limit', type=int, default=200)
+    parser.add_argument('--report-file', type=str, default='benchmark-report.json')
+    parser.add_argument('--baseline-file', type=str, default=None)
+    parameters = parser.parse_args()
+    report_file = os.path.abspath(parameters.report_file)
+    working_folder = tempfile.mkdtemp()
+    # Hyper engine writes its own logs into current folder
+    os.chdir(working_folder)
+    settings = {
+        'chunk rows': parameters.chunk_rows,
+        'data types': load_data_types(),
+        'export file': os.path.join(working_folder, 'export.csv'),
+        'hyper file': os.path.join(working_folder, 'benchmark.hyper'),
+        'input file': os.path.join(working_folder, 'input.csv'),
+        'unique values limit': parameters.unique_values_limit,
+    }
+    build_data_file(settings['input file'], parameters)
+    pipeline = PipelineStages(settings)
+    report = {
+        'Environment': {
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+        },
+        'Settings': {
+            'columns': parameters.columns,
+            'input file size [bytes]': os.path.getsize(settings['input file']),
+            'null share': parameters.null_share,
+            'repeats': parameters.repeats,
+            'rows': parameters.rows,
+        },
+        'Stages': {},
+    }
+    # isolated: every stage works on artifacts of previous ones, best run is kept
+    artifacts = {}
+    for crt_stage in STAGES:
+        measurements = [pipeline.run(crt_stage, artifacts)
+                        for _ in range(max(1, parameters.repeats))]
+        rows_count, seconds = min(measurements, key=lambda crt: crt[1])
+        report['Stages'][crt_stage] = build_stage_result(rows_count, seconds)
+    # end-to-end: all stages in a row, once, starting from nothing
+    artifacts = {}
+    end_to_end_seconds = sum([pipeline.run(crt_stage, artifacts)[1] for crt_stage in STAGES])
+    report['End To End'] = build_stage_result(parameters.rows, end_to_end_seconds)
+    for crt_stage, crt_result in list(report['Stages'].items()) \
+            + [('end-to-end', report['End To End'])]:
+        print('{stage:>20}: {seconds:8.2f} seconds, {rate:12,} rows/second'.format(
+            stage=crt_stage, seconds=crt_result['seconds'], rate=crt_result['rows per second']))
+    with open(report_file, 'w') as file_handle:
+        json.dump(report, file_handle, indent=4)
+    print('Report stored into ' + report_file)
+    if parameters.baseline_file is not None:
+        compare_with_baseline(report, parameters.baseline_file)
@@ -0,0 +1,78 @@
+"""
+benchmark_shift_column - compares legacy per-row and vectorized column shifting
+
+Usage: python benchmark/benchmark_shift_column.py (--rows 10000000) (--shifts 3)
+"""
+# package to handle arguments from command line
+import argparse
+# package to produce structured logs
+import logging
+# package to handle files/folders and related metadata/operations
+import os
+# package to interact with the interpreter
+import sys
+# package to measure elapsed time
+import time
+# useful methods to measure time performance by small pieces of code
+from codetiming import Timer
+# package to handle numerical structures
+import numpy
+# package to handle Data Frames
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'sources'))
+from tableau_hyper_management.DataManipulator import DataManipulator
+
+
+def legacy_add_and_shift_column(input_data_frame, input_details):
+    for crt_dict in input_details:
+        input_data_frame[crt_dict['New Column']] = input_data_frame[crt_dict['Original Column']]
+        col_offset = DataManipulator.fn_set_shifting_value(crt_dict)
+        input_data_frame[crt_dict['New Column']] = \
+            input_data_frame[crt_dict['New Column']].shift(col_offset)
+        input_data_frame[crt_dict['New Column']] = \
+            input_data_frame[crt_dict['New Column']].apply(
+                lambda x: str(x).replace('nan', str(crt_dict['Empty Values Replacement']))
+                .replace('.0', ''))
+    return input_data_frame
+
+
+def build_data_frame(rows_count):
+    random_generator = numpy.random.default_rng(seed=20)
+    amounts = random_generator.integers(0, 100000, rows_count) / 100
+    amounts[random_generator.random(rows_count) < 0.05] = numpy.nan
+    return pd.DataFrame({'Amount': amounts})
+
+
+def build_shift_definitions(shifts_count):
+    return [{
+        'Deviation': crt_shift + 1,
+        'Direction': 'down',
+        'Empty Values Replacement': 0,
+        'New Column': 'Amount shifted by ' + str(crt_shift + 1),
+        'Original Column': 'Amount',
+    } for crt_shift in range(shifts_count)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--shifts', type=int, default=3)
+    parameters = parser.parse_args()
+    shift_definitions = build_shift_definitions(parameters.shifts)
+    results = {}
+    for crt_label in ('legacy', 'vectorized'):
+        data_frame = build_data_frame(parameters.rows)
+        start_time = time.perf_counter()
+        if crt_label == 'legacy':
+            legacy_add_and_shift_column(data_frame, shift_definitions)
+        else:
+            DataManipulator().fn_add_and_shift_column(
+                logging.getLogger(__name__), Timer(crt_label, logger=None), data_frame,
+                shift_definitions)
+        results[crt_label] = time.perf_counter() - start_time
+        print('{label:>10}: {seconds:8.2f} seconds, {rate:12,.0f} rows/second'.format(
+            label=crt_label, seconds=results[crt_label],
+            rate=parameters.rows * parameters.shifts / results[crt_label]))
+    print('{label:>10}: {ratio:8.1f}x'.format(
+        label='speed-up', ratio=results['legacy'] / results['vectorized']))
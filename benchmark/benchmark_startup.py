@@ -0,0 +1,80 @@
+"""
+benchmark_startup - measures start-up time of every entry point
+
+Each script is started with --help (best of given repeats) and once more under
+"python -X importtime" to list the imports costing most
+
+Usage: python benchmark/benchmark_startup.py (--repeats 5) (--top 10)
+    (--report-file startup-report.json)
+"""
+# package to handle arguments from command line
+import argparse
+# package to handle JSON report
+import json
+# package to handle files/folders and related metadata/operations
+import os
+# package to run entry points as separate processes
+import subprocess
+# package to interact with the interpreter
+import sys
+# package to measure elapsed time
+import time
+SOURCES_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'sources')
+SCRIPTS = ['converter', 'maintain_hyper_files', 'publish_data_source',
+           'publish_data_sources_bulk']
+
+
+def run_script(script_name, extra_options):
+    start_time = time.perf_counter()
+    completed_process = subprocess.run(
+        [sys.executable] + extra_options + [os.path.join(SOURCES_FOLDER, script_name + '.py'),
+                                            '--help'],
+        cwd=SOURCES_FOLDER, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    if completed_process.returncode != 0:
+        raise RuntimeError(script_name + ' failed to start: ' + completed_process.stderr)
+    return time.perf_counter() - start_time, completed_process.stderr
+
+
+def parse_import_times(import_time_output):
+    # line format is "import time: <self [us]> | <cumulative [us]> | <indentation><package>"
+    top_level_imports = {}
+    for crt_line in import_time_output.splitlines():
+        if not crt_line.startswith('import time:') or 'cumulative' in crt_line:
+            continue
+        _, cumulative, package = crt_line.split('|', 2)
+        # nested imports are indented, only those started by the script itself are kept
+        if package.startswith(' ') and not package.startswith('  '):
+            top_level_imports[package.strip()] = int(cumulative.strip()) / 1000000
+    return top_level_imports
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--report-file', type=str, default=None)
+    parameters = parser.parse_args()
+    report = {}
+    for crt_script in SCRIPTS:
+        seconds = min([run_script(crt_script, [])[0]
+                       for _ in range(max(1, parameters.repeats))])
+        import_times = parse_import_times(run_script(crt_script, ['-X', 'importtime'])[1])
+        slowest_imports = sorted(import_times.items(), key=lambda crt: crt[1], reverse=True)
+        report[crt_script] = {
+            'imports [seconds]': round(sum(import_times.values()), 4),
+            'seconds': round(seconds, 4),
+            'slowest imports': {crt_package: round(crt_seconds, 4) for crt_package, crt_seconds
+                                in slowest_imports[:parameters.top]},
+        }
+        print('{script:>26}: {seconds:6.3f} seconds to answer --help, '
+              '{imports:6.3f} seconds in imports'.format(
+                script=crt_script, seconds=seconds, imports=report[crt_script][
+                    'imports [seconds]']))
+        for crt_package, crt_seconds in slowest_imports[:parameters.top]:
+            print('{package:>40}: {seconds:6.3f}'.format(package=crt_package,
+                                                         seconds=crt_seconds))
+    if parameters.report_file is not None:
+        with open(parameters.report_file, 'w') as file_handle:
+            json.dump(report, file_handle, indent=4)
@@ -6,14 +6,33 @@ and correct execution is possible
 """
 # package to handle files/folders and related metadata/operations
 import os
+# package to run catalog compilation with current interpreter
+import subprocess
+# package to interact with the interpreter
+import sys
 # facilitate dependencies management
 from setuptools import setup, find_packages
+from setuptools.command.build_py import build_py
 
 with open(os.path.join(os.path.dirname(__file__), 'README.md'), 'r') as fh:
     long_description_readme = fh.read()
 
 this_package_website = 'https://github.com/danielgp/tableau-hyper-management'
 
+
+class BuildPyWithCompiledCatalogs(build_py):
+    """
+    Compiles localization catalogs (.po into .mo) and their stamp before packaging,
+    so installed scripts never have to compile anything at start-up
+    """
+
+    def run(self):
+        subprocess.check_call([sys.executable, os.path.join(
+            os.path.dirname(os.path.abspath(__file__)),
+            'sources', 'project_locale', 'localizations_compile.py')])
+        super().run()
+
+
 setup(
     author='Daniel Popiniuc',
     author_email='danielpopiniuc@gmail.com',
@@ -25,20 +44,26 @@ setup(
         'Intended Audience :: System Administrators',
         'License :: OSI Approved :: GNU Lesser General Public License v3 (LGPLv3)',
         'Natural Language :: English',
-        'Programming Language :: Python :: 3.6',
-        'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Topic :: Scientific/Engineering :: Information Analysis'
     ],
+    cmdclass={
+        'build_py': BuildPyWithCompiledCatalogs,
+    },
     description='Wrapper to ease data management into Tableau Hyper format from CSV files',
+    extras_require={
+        'zstd': ['zstandard>=0.15,<1'],
+    },
     include_package_data=True,
     install_requires=[
         'Babel>=2.8.0,<3',
         'codetiming>=1.1,<2',
         'datedelta>=1.3,<2.0',
         'numpy>=1.17.4,<2',
-        'pandas>=1.0,<2',
-        'pyarrow>=0.17,<1.0',
+        'openpyxl>=3,<4',
+        'pandas>=1.4,<2',
+        'pyarrow>=1.0.1,<15',
+        'requests>=2.22,<3',
         'tableauhyperapi',
         'tableauserverclient',
         'xlrd>=1,<2',
@@ -64,7 +89,10 @@ setup(
                          '/issues?q=is%3Aissue+is%3Aopen+sort%3Aupdated-desc',
         'Source Code': this_package_website
     },
-    python_requires='>=3.6',
+    python_requires='>=3.8',
+    setup_requires=[
+        'Babel>=2.8.0,<3',
+    ],
     url=this_package_website + '/releases',  # project home page, if any
     version='1.5.1'
 )
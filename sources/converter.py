@@ -8,8 +8,6 @@ import os
 # Custom classes specific to this package
 from project_locale.localizations_common import LocalizationsCommon
 from tableau_hyper_management.ProjectNeeds import ProjectNeeds
-from tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
-from tableau_hyper_management.TypeDetermination import TypeDetermination
 # get current script name
 SCRIPT_NAME = os.path.basename(__file__).replace('.py', '')
 
@@ -25,6 +23,11 @@ if __name__ == '__main__':
     class_pn = ProjectNeeds(SCRIPT_NAME, language_to_use)
     # load application configuration (inputs are defined into a json file)
     class_pn.load_configuration()
+    # heavy packages are imported only once arguments are known to be valid,
+    # so --help or a wrong usage answers right away
+    from tableau_hyper_management.DataManipulator import DataManipulator
+    from tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+    from tableau_hyper_management.TypeDetermination import TypeDetermination
     # adding a special case data type
     class_pn.config['data_types']['empty'] = '^$'
     class_pn.config['data_types']['str'] = ''
@@ -70,8 +73,11 @@ if __name__ == '__main__':
     relevant_files_list = class_pn.class_fo.fn_build_file_list(
         class_pn.class_ln.logger, class_pn.timer, class_pn.parameters.input_file)
     # log file statistic details
+    class_pn.class_rm.fn_start_stage('statistics')
     class_pn.class_fo.fn_store_file_statistics(
         class_pn.class_ln.logger, class_pn.timer, relevant_files_list, 'Input')
+    class_pn.class_rm.fn_stop_stage('statistics')
+    input_bytes = class_pn.class_rm.fn_get_files_size(relevant_files_list)
     # further could be required to assess "load_data_frame_necessary" value
     if not load_data_frame_necessary:
         final_verdict = class_pn.source_vs_destination_file_modification_assesment(
@@ -89,7 +95,11 @@ if __name__ == '__main__':
     # loading from a specific folder all files matching a given pattern into a data frame
     input_dict = {
         'action': class_pn.parameters.policy_to_handle_hyper_file,
+        'chunk rows': class_pn.parameters.input_chunk_rows,
+        'column renames': class_pn.fn_split_column_map(class_pn.parameters.input_column_renames),
+        'columns': class_pn.fn_split_column_list(class_pn.parameters.input_columns),
         'compression': class_pn.parameters.input_file_compression,
+        'excel range': class_pn.parameters.input_excel_range,
         'field delimiter': class_pn.parameters.csv_field_separator,
         'file list': relevant_files_list,
         'format': class_pn.parameters.input_file_format,
@@ -97,17 +107,81 @@ if __name__ == '__main__':
         'query': class_pn.parameters.sql_query_to_handle_data,
         'schema name': 'Extract',
         'table name': 'Extract',
+        'workers': class_pn.parameters.input_workers,
     }
+    transformations = []
+    if class_pn.parameters.transformations_file != 'None':
+        transformations = class_pn.class_fo.fn_open_file_and_get_content(
+            class_pn.parameters.transformations_file, 'json')['Transformations']
+    # a leading filter rule is applied already while files are read
+    if class_pn.parameters.input_file_format != 'hyper' and len(transformations) != 0 \
+            and transformations[0]['operation'] == 'filter' and 'rule' in transformations[0]:
+        input_dict['filter rule'] = transformations.pop(0)['rule']
     working_data_frame = None
     if class_pn.parameters.input_file_format == 'hyper':
         if relevant_files_list:
-            input_dict['action'] = 'read from existing hyper'
             input_dict['hyper file'] = relevant_files_list[0]
-            working_data_frame = class_thael.fn_hyper_handle(
-                class_pn.class_ln.logger, class_pn.timer, input_dict)
+            if class_pn.parameters.output_file_format.lower() in ('csv', 'feather', 'parquet') \
+                    and len(transformations) == 0:
+                # flat file is exported batch by batch, never holding entire content in memory
+                input_dict['action'] = 'export'
+                input_dict['output'] = {
+                    'chunk rows': class_pn.parameters.output_chunk_rows,
+                    'compression': class_pn.parameters.output_file_compression,
+                    'field delimiter': class_pn.parameters.csv_field_separator,
+                    'format': class_pn.parameters.output_file_format,
+                    'name': class_pn.parameters.output_file,
+                    'partition columns': class_pn.fn_split_column_list(
+                        class_pn.parameters.output_partition_columns),
+                }
+                if class_pn.parameters.output_file_write_mode != 'direct' \
+                        and len(input_dict['output']['partition columns']) == 0:
+                    input_dict['output']['name'] = class_pn.class_fo.fn_build_staging_file_name(
+                        class_pn.parameters.output_file)
+                class_pn.class_rm.fn_start_stage('export')
+                try:
+                    class_thael.fn_hyper_handle(
+                        class_pn.class_ln.logger, class_pn.timer, input_dict)
+                    if input_dict['output']['name'] != class_pn.parameters.output_file:
+                        class_pn.class_fo.fn_promote_staging_file(
+                            class_pn.class_ln.logger, class_pn.timer, {
+                                'final file': class_pn.parameters.output_file,
+                                'keep previous': (class_pn.parameters.output_file_write_mode
+                                                  == 'staged-keep-previous'),
+                                'staging file': input_dict['output']['name'],
+                            })
+                finally:
+                    # a failed export (exception or exit) never leaves a partial staging file
+                    if input_dict['output']['name'] != class_pn.parameters.output_file \
+                            and os.path.isfile(input_dict['output']['name']):
+                        os.remove(input_dict['output']['name'])
+                class_pn.class_rm.fn_stop_stage(
+                    'export', input_dict['output'].get('rows written'),
+                    class_pn.class_rm.fn_get_files_size([class_pn.parameters.output_file]))
+                class_pn.class_rm.fn_start_stage('statistics')
+                class_pn.class_fo.fn_store_file_statistics(
+                    class_pn.class_ln.logger, class_pn.timer,
+                    class_pn.fn_get_generated_file_name(), 'Generated')
+                class_pn.class_rm.fn_stop_stage('statistics')
+            else:
+                input_dict['action'] = 'read'
+                class_pn.class_rm.fn_start_stage('load')
+                working_data_frame = class_thael.fn_hyper_handle(
+                    class_pn.class_ln.logger, class_pn.timer, input_dict)
+                class_pn.class_rm.fn_stop_stage('load', len(working_data_frame), input_bytes)
     elif load_data_frame_necessary:
+        class_pn.class_rm.fn_start_stage('load')
         working_data_frame = class_pn.class_dio.fn_load_file_into_data_frame(
             class_pn.class_ln.logger, class_pn.timer, input_dict)
+        class_pn.class_rm.fn_stop_stage(
+            'load', None if working_data_frame is None else len(working_data_frame), input_bytes)
+    # optional transformations, applied before any type detection or output
+    if working_data_frame is not None and len(transformations) != 0:
+        class_pn.class_rm.fn_start_stage('transformations')
+        working_data_frame = DataManipulator(language_to_use)\
+            .fn_apply_transformations_to_data_frame(
+                class_pn.class_ln.logger, class_pn.timer, working_data_frame, transformations)
+        class_pn.class_rm.fn_stop_stage('transformations', len(working_data_frame))
     if working_data_frame is not None:
         output_dict = input_dict
         # overwrite few important values with relevant information for output
@@ -115,18 +189,28 @@ if __name__ == '__main__':
         output_dict['format'] = class_pn.parameters.output_file_format
         output_dict['name'] = class_pn.parameters.output_file
         output_dict['compression'] = class_pn.parameters.output_file_compression
+        output_dict['write mode'] = class_pn.parameters.output_file_write_mode
+        output_dict['chunk rows'] = class_pn.parameters.output_chunk_rows
+        output_dict['partition columns'] = class_pn.fn_split_column_list(
+            class_pn.parameters.output_partition_columns)
         if class_pn.parameters.input_file_format.lower() == 'hyper':
             tuple_supported_file_types = class_thael.supported_output_file_types
         else:
             tuple_supported_file_types = class_pn.class_dio.implemented_disk_write_file_types
         wanted_output_format = class_pn.parameters.output_file_format.lower()
         if class_pn.parameters.output_file_format.lower() in tuple_supported_file_types:
+            class_pn.class_rm.fn_start_stage('store')
             class_pn.class_dio.fn_store_data_frame_to_file(
                 class_pn.class_ln.logger, class_pn.timer, working_data_frame, output_dict)
+            class_pn.class_rm.fn_stop_stage(
+                'store', len(working_data_frame),
+                class_pn.class_rm.fn_get_files_size([class_pn.parameters.output_file]))
             # store statistics about output file
+            class_pn.class_rm.fn_start_stage('statistics')
             class_pn.class_fo.fn_store_file_statistics(
                 class_pn.class_ln.logger, class_pn.timer,
-                class_pn.parameters.output_file, 'Generated')
+                class_pn.fn_get_generated_file_name(), 'Generated')
+            class_pn.class_rm.fn_stop_stage('statistics')
         elif wanted_output_format == 'hyper':
             supported_types = class_thael.supported_input_file_types
             if class_pn.parameters.input_file_format.lower() in supported_types:
@@ -139,28 +223,50 @@ if __name__ == '__main__':
                     'hyper file': class_pn.parameters.output_file,
                     'schema name': input_dict['schema name'],
                     'table name': input_dict['table name'],
+                    'write mode': class_pn.parameters.output_file_write_mode,
+                    'key columns': class_pn.fn_split_column_list(
+                        class_pn.parameters.upsert_key_columns),
+                    'query': input_dict['query'],
+                    'rollups': [],
+                    'row count mode': class_pn.parameters.row_count_mode,
+                    'sort key columns': class_pn.fn_split_column_list(
+                        class_pn.parameters.sort_key_columns),
                 }
-                if fn_dict['action'] in ('append', 'create', 'overwrite'):
+                # pre-aggregated tables to be computed by Hyper after detail data is handled
+                if class_pn.parameters.rollups_file != 'None':
+                    fn_dict['rollups'] = class_pn.class_fo.fn_open_file_and_get_content(
+                        class_pn.parameters.rollups_file, 'json')['Rollups']
+                if fn_dict['action'] in ('append', 'create', 'overwrite', 'upsert'):
                     # advanced detection of data type within Data Frame
+                    class_pn.class_rm.fn_start_stage('structure detection')
                     fn_dict['data frame structure'] = c_td.fn_get_data_frame_structure(
                         class_pn.class_ln.logger, class_pn.timer, fn_dict)
                     # determine Hyper Table Columns
                     fn_dict['hyper table columns'] = class_thael.fn_build_hyper_columns(
                         class_pn.class_ln.logger, class_pn.timer, fn_dict['data frame structure'])
+                    class_pn.class_rm.fn_stop_stage('structure detection', len(working_data_frame))
                     # The rows to insert into the <hyper_table> table.
+                    class_pn.class_rm.fn_start_stage('rebuild')
                     fn_dict['data'] = class_thael.fn_rebuild_data_frame_content_for_hyper(
                         class_pn.class_ln.logger, class_pn.timer, fn_dict)
+                    class_pn.class_rm.fn_stop_stage('rebuild', len(fn_dict['data']))
                     # check if output Hyper file does not exists
                     # and if so action will be always "overwrite"
                     # which will trigger internal Hyper structure creation (schema and table)
                     if not os.path.isfile(fn_dict['hyper file']):
                         fn_dict['action'] = 'overwrite'
                 # manipulate destination Tableau Extract (Hyper)
+                class_pn.class_rm.fn_start_stage('insert')
                 class_thael.fn_hyper_handle(class_pn.class_ln.logger, class_pn.timer, fn_dict)
+                class_pn.class_rm.fn_stop_stage(
+                    'insert', len(fn_dict['data']) if 'data' in fn_dict else None,
+                    class_pn.class_rm.fn_get_files_size([class_pn.parameters.output_file]))
                 # store statistics about output file
+                class_pn.class_rm.fn_start_stage('statistics')
                 class_pn.class_fo.fn_store_file_statistics(
                     class_pn.class_ln.logger, class_pn.timer,
-                    class_pn.parameters.output_file, 'Generated')
+                    class_pn.fn_get_generated_file_name(), 'Generated')
+                class_pn.class_rm.fn_stop_stage('statistics')
             else:
                 class_pn.class_ln.logger.error(
                     class_pn.locale.gettext(
@@ -169,6 +275,8 @@ if __name__ == '__main__':
                         + 'And {given_file_type} is not among "{supported_file_types}"')
                         .replace('{given_file_type}', wanted_output_format)
                         .replace('{supported_file_types}', '", "'.join(supported_types)))
+    # per-stage metrics for dashboards
+    class_pn.fn_store_run_metrics()
     # just final message
     class_pn.class_bn.fn_final_message(
         class_pn.class_ln.logger, class_pn.parameters.output_log_file,
@@ -0,0 +1,58 @@
+"""
+main - entry point of the package
+
+This file is compacting existing HYPER files (rewriting them into fresh ones)
+and measures time elapsed (performance)
+"""
+# Custom classes specific to this package
+from project_locale.localizations_common import LocalizationsCommon
+from tableau_hyper_management.ProjectNeeds import ProjectNeeds
+# get current script name
+SCRIPT_NAME = 'maintainer'
+
+# main execution logic
+if __name__ == '__main__':
+    # instantiate Localizations Common class
+    class_lc = LocalizationsCommon()
+    # ensure all compiled localization files are in place (as needed for localized messages later)
+    class_lc.run_localization_compile()
+    # establish localization language to use
+    language_to_use = class_lc.get_region_language_to_use_from_operating_system()
+    # instantiate Extractor Specific Needs class
+    class_pn = ProjectNeeds(SCRIPT_NAME, language_to_use)
+    # load application configuration (inputs are defined into a json file)
+    class_pn.load_configuration()
+    # heavy packages are imported only once arguments are known to be valid,
+    # so --help or a wrong usage answers right away
+    from tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+    # initiate Logging sequence
+    class_pn.initiate_logger_and_timer()
+    # reflect title and input parameters given values in the log
+    class_pn.class_clam.listing_parameter_values(
+        class_pn.class_ln.logger, class_pn.timer, 'Tableau Hyper Maintainer',
+        class_pn.config['input_options'][SCRIPT_NAME], class_pn.parameters)
+    # as input file might contain CalculatedDate expression an evaluation is required
+    class_pn.parameters.input_file = class_pn.class_ph.eval_expression(
+        class_pn.class_ln.logger, class_pn.parameters.input_file, 7)
+    # identify all files matching input file information
+    relevant_files_list = class_pn.class_fo.fn_build_file_list(
+        class_pn.class_ln.logger, class_pn.timer, class_pn.parameters.input_file)
+    # instantiate Tableau Hyper Api Extra Logic class
+    class_thael = TableauHyperApiExtraLogic(language_to_use)
+    for crt_file in relevant_files_list:
+        class_pn.class_rm.fn_start_stage('compaction')
+        compaction_details = class_thael.fn_compact_hyper_file(
+            class_pn.class_ln.logger, class_pn.timer, {
+                'hyper file': crt_file,
+                'sort key columns': class_pn.fn_split_column_list(
+                    class_pn.parameters.sort_key_columns),
+                'write mode': class_pn.parameters.output_file_write_mode,
+            })
+        class_pn.class_rm.fn_stop_stage('compaction', None,
+                                        compaction_details['size before [bytes]'])
+    # per-stage metrics for dashboards
+    class_pn.fn_store_run_metrics()
+    # just final message
+    class_pn.class_bn.fn_final_message(
+        class_pn.class_ln.logger, class_pn.parameters.output_log_file,
+        class_pn.timer.timers.total(SCRIPT_NAME))
@@ -2,6 +2,10 @@
 localizations_common - common class for various localizations tasks
 """
 import glob
+# package to fingerprint localization sources
+import hashlib
+# package to handle compiled catalogs stamp
+import json
 # package to facilitate operating system project_locale detection
 import locale
 # package to handle files/folders and related metadata/operations
@@ -9,9 +13,12 @@ import os
 import pathlib
 # package to facilitate multiple operation system operations
 import platform
+# package to interact with the interpreter
+import sys
 
 
 class LocalizationsCommon:
+    compiled_stamp_file = 'compiled-catalogs.json'
     locale_implemented = [
         'it_IT',
         'ro_RO',
@@ -50,6 +57,76 @@ class LocalizationsCommon:
             file_situation_verdict = 'missing'
         return get_details_to_operate, file_situation_verdict
 
+    def get_compiled_catalogs_fingerprint(self, in_with_content_hash=True):
+        fingerprint = {}
+        for current_source in self.get_project_localisation_source_files('po'):
+            # a missing compiled catalog invalidates any stamp
+            if not os.path.isfile(current_source.replace('.po', '.mo')):
+                return None
+            file_details = os.stat(current_source)
+            fingerprint[pathlib.PurePath(os.path.relpath(
+                current_source, self.get_this_file_folder())).as_posix()] = {
+                'modified': file_details.st_mtime_ns,
+                'sha256': self.get_file_content_hash(current_source)
+                if in_with_content_hash else None,
+                'size': file_details.st_size,
+            }
+        return fingerprint
+
+    @staticmethod
+    def get_file_content_hash(in_file_name):
+        with open(in_file_name, 'rb') as file_handle:
+            return hashlib.sha256(file_handle.read()).hexdigest()
+
+    def get_catalog_folders_fingerprint(self, in_catalogs):
+        # project localization folder reveals new/removed domains, while every catalog folder
+        # reveals added, removed or replaced .po/.mo files (git checkout, editors saving)
+        catalog_folders = set(['.'] + [pathlib.PurePath(crt).parent.as_posix()
+                                       for crt in in_catalogs])
+        return {crt_folder: os.stat(os.path.join(self.get_this_file_folder(),
+                                                 crt_folder)).st_mtime_ns
+                for crt_folder in sorted(catalog_folders)}
+
+    def is_compiled_catalogs_stamp_valid(self):
+        stamp_file = os.path.join(self.get_this_file_folder(), self.compiled_stamp_file)
+        try:
+            with open(stamp_file, 'r', encoding='utf-8') as file_handle:
+                stamp_content = json.load(file_handle)
+            # usual case: a few folder modification times, no catalog is looked at
+            if stamp_content['folders'] == self.get_catalog_folders_fingerprint(
+                    stamp_content['catalogs'].keys()):
+                return True
+        except (AttributeError, KeyError, OSError, TypeError, ValueError):
+            # missing, unreadable or corrupt stamp means compilation has to run again
+            return False
+        # folders touched since (like after a re-install) get every catalog compared
+        if not self.is_catalogs_fingerprint_matching(stamp_content['catalogs']):
+            return False
+        try:
+            self.store_compiled_catalogs_stamp()
+        except OSError:
+            # read-only installation, same comparison will take place next time
+            pass
+        return True
+
+    def is_catalogs_fingerprint_matching(self, in_stamped_catalogs):
+        # file sizes and modification times are enough most of the time,
+        # content is hashed only for files touched since
+        fingerprint = self.get_compiled_catalogs_fingerprint(False)
+        if not isinstance(in_stamped_catalogs, dict) or fingerprint is None \
+                or sorted(in_stamped_catalogs.keys()) != sorted(fingerprint.keys()):
+            return False
+        for current_source, current_details in fingerprint.items():
+            stamped_details = in_stamped_catalogs[current_source]
+            if not isinstance(stamped_details, dict) \
+                    or stamped_details.get('size') != current_details['size']:
+                return False
+            if stamped_details.get('modified') != current_details['modified'] \
+                    and stamped_details.get('sha256') != self.get_file_content_hash(
+                        os.path.join(self.get_this_file_folder(), current_source)):
+                return False
+        return True
+
     @staticmethod
     def file_counter_limit(in_file_counter, in_file_list_size):
         file_list_paring_complete = False
@@ -74,30 +151,22 @@ class LocalizationsCommon:
         return os.path.dirname(__file__)
 
     def get_project_localisation_source_files(self, in_extension):
-        file_pattern = os.path.join(os.path.dirname(__file__), '**/*.' + in_extension)
+        file_pattern = os.path.join(self.get_this_file_folder(), '**/*.' + in_extension)
         initial_list = glob.glob(file_pattern, recursive=True)
         normalizer = lambda x: self.path_normalize(x)
         return list(map(normalizer, initial_list))
 
     @staticmethod
     def get_project_root():
-        file_parts = os.path.normpath(os.path.abspath(__file__))\
-            .replace('\\', os.altsep).split(os.altsep)
-        return os.altsep.join(file_parts[:-3])
+        return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
     def get_virtual_environment_python_binary(self):
-        python_binary = 'python'
+        # same interpreter as current one (having Babel), unless a project one is found
+        python_binary = sys.executable
         if platform.system() == 'Windows':
             project_root = self.get_project_root()
-            join_separator = os.path.altsep
-            elements_to_join = [
-                project_root,
-                'virtual_environment',
-                'Scripts',
-            ]
-            virtual_env_long = join_separator.join(elements_to_join)
-            elements_to_join[1] = 'venv'
-            virtual_env_short = join_separator.join(elements_to_join)
+            virtual_env_long = os.path.join(project_root, 'virtual_environment', 'Scripts')
+            virtual_env_short = os.path.join(project_root, 'venv', 'Scripts')
             if os.path.isdir(virtual_env_long):
                 python_binary = os.path.join(virtual_env_long, 'python.exe')
             elif os.path.isdir(virtual_env_short):
@@ -121,12 +190,24 @@ class LocalizationsCommon:
                             os.path.basename(in_file_name))
 
     def run_localization_compile(self):
-        command_parts_to_run = [
-            self.get_virtual_environment_python_binary(),
-            ' ',
-            self.get_this_file_folder(),
-            os.path.altsep,
-            'localizations_compile.py',
-        ]
-        os.system(''.join(command_parts_to_run))
+        # compiled catalogs are normally prepared at build/install time,
+        # so a single stamp check is enough on every run
+        if self.is_compiled_catalogs_stamp_valid():
+            return
+        os.system(self.get_virtual_environment_python_binary() + ' '
+                  + os.path.join(self.get_this_file_folder(), 'localizations_compile.py'))
+
+    def store_compiled_catalogs_stamp(self):
+        fingerprint = self.get_compiled_catalogs_fingerprint()
+        if fingerprint is None:
+            return False
+        with open(os.path.join(self.get_this_file_folder(), self.compiled_stamp_file),
+                  'w', encoding='utf-8') as file_handle:
+            # folders are looked at only once stamp file exists, as creating it changes
+            # modification time of its folder (writing content does not)
+            json.dump({
+                'catalogs': fingerprint,
+                'folders': self.get_catalog_folders_fingerprint(fingerprint.keys()),
+            }, file_handle, indent=4, sort_keys=True)
+        return True
 
@@ -51,3 +51,7 @@ my_class = CustomizedLocalizationCompiling()
 locale_source_files = my_class.get_project_localisation_source_files('po')
 operation_locale_dict = my_class.evaluate_compilation_necessity(locale_source_files)
 my_class.operate_localisation_files(operation_locale_dict)
+# next runs only check this stamp instead of comparing every catalog pair
+if not my_class.store_compiled_catalogs_stamp():
+    print('Not all localization catalogs could be compiled')
+    exit(1)
@@ -18,15 +18,11 @@ class LocalizationsMaintainSources(LocalizationsCommon):
         while not file_list_paring_complete:
             template_localisation_file = in_list_localisation_source_files[file_counter]
             for current_locale in self.locale_implemented:
-                join_separator = os.path.altsep
-                elements_to_join = [
-                    os.path.dirname(template_localisation_file),
-                    current_locale,
-                    'LC_MESSAGES',
-                    os.path.basename(template_localisation_file).replace('.pot', '.po'),
-                ]
                 fn_dict = {
-                    'destination': join_separator.join(elements_to_join),
+                    'destination': os.path.join(
+                        os.path.dirname(template_localisation_file), current_locale,
+                        'LC_MESSAGES',
+                        os.path.basename(template_localisation_file).replace('.pot', '.po')),
                     'counter': file_counter,
                     'locale': current_locale,
                     'source': template_localisation_file,
@@ -10,7 +10,6 @@ measuring time elapsed (performance)
 # Custom classes specific to this package
 from project_locale.localizations_common import LocalizationsCommon
 from tableau_hyper_management.ProjectNeeds import ProjectNeeds
-from tableau_hyper_management.TableauServerCommunicator import TableauServerCommunicator
 # get current script name
 #SCRIPT_NAME = os.path.basename(__file__).replace('.py', '')
 SCRIPT_NAME = 'publisher'
@@ -27,6 +26,9 @@ if __name__ == '__main__':
     class_pn = ProjectNeeds(SCRIPT_NAME, language_to_use)
     # load application configuration (inputs are defined into a json file)
     class_pn.load_configuration()
+    # heavy packages are imported only once arguments are known to be valid,
+    # so --help or a wrong usage answers right away
+    from tableau_hyper_management.TableauServerCommunicator import TableauServerCommunicator
     # initiate Logging sequence
     class_pn.initiate_logger_and_timer()
     # reflect title and input parameters given values in the log
@@ -44,14 +46,23 @@ if __name__ == '__main__':
     relevant_files_list = class_pn.class_fo.fn_build_file_list(
             class_pn.class_ln.logger, class_pn.timer, class_pn.parameters.input_file)
     # log file statistic details
+    class_pn.class_rm.fn_start_stage('statistics')
     class_pn.class_fo.fn_store_file_statistics(
             class_pn.class_ln.logger, class_pn.timer, relevant_files_list, 'Input')
+    class_pn.class_rm.fn_stop_stage('statistics')
     # get the secrets from provided file
     credentials = class_pn.class_fo.fn_open_file_and_get_content(
             class_pn.parameters.input_credentials_file, 'json')
     credentials_dict = credentials['Credentials']['LDAP']['Production']['Default']
     # instantiate main library that ensure Tableau Server communication
     c_tsc = TableauServerCommunicator(language_to_use)
+    # projects listing can be reused across runs within cache time-to-live
+    c_tsc.configure_project_cache(class_pn.parameters.project_cache_file,
+                                  class_pn.parameters.project_cache_ttl)
+    # a stalled Tableau Server fails a request (to be retried) instead of hanging it
+    c_tsc.configure_request_timeout(class_pn.parameters.upload_timeout)
+    # unchanged extracts (compared to last successful publish) will be skipped
+    c_tsc.configure_publish_ledger(class_pn.parameters.publish_ledger_file)
     # initiate Tableau Server connection
     c_tsc.connect_to_tableau_server(class_pn.class_ln.logger, class_pn.timer, {
         'Tableau Server': class_pn.parameters.tableau_server,
@@ -67,13 +78,22 @@ if __name__ == '__main__':
     if c_tsc.is_publishing_possible(
             class_pn.class_ln.logger, class_pn.parameters.tableau_project, list_project_details):
         # perform the publishing of data source
+        class_pn.class_rm.fn_start_stage('publish')
         c_tsc.publish_data_source_to_tableau_server(class_pn.class_ln.logger, class_pn.timer, {
             'Project ID': list_project_details[0],
             'Tableau Extract File': class_pn.parameters.input_file,
             'Publishing Mode': class_pn.parameters.publishing_mode,
+            'Chunk Size [MB]': class_pn.parameters.upload_chunk_size,
+            'Retries': class_pn.parameters.upload_retries,
+            'Retry Backoff Seconds': class_pn.parameters.upload_retry_backoff,
         })
+        class_pn.class_rm.fn_stop_stage(
+            'publish', None,
+            class_pn.class_rm.fn_get_files_size([class_pn.parameters.input_file]))
     # disconnect from Tableau Server
     c_tsc.disconnect_from_tableau_server(class_pn.class_ln.logger, class_pn.timer)
+    # per-stage metrics for dashboards
+    class_pn.fn_store_run_metrics()
     # just final message
     class_pn.class_bn.fn_final_message(
             class_pn.class_ln.logger, class_pn.parameters.output_log_file,
@@ -0,0 +1,94 @@
+"""
+main - entry point of the package
+
+This file is connecting once to a Tableau Server and publishes multiple local HYPER files
+(as described within a publishing plan) concurrently, measuring time elapsed (performance)
+"""
+# Custom classes specific to this package
+from project_locale.localizations_common import LocalizationsCommon
+from tableau_hyper_management.ProjectNeeds import ProjectNeeds
+# get current script name
+SCRIPT_NAME = 'bulk-publisher'
+
+# main execution logic
+if __name__ == '__main__':
+    # instantiate Localizations Common class
+    class_lc = LocalizationsCommon()
+    # ensure all compiled localization files are in place (as needed for localized messages later)
+    class_lc.run_localization_compile()
+    # establish localization language to use
+    language_to_use = class_lc.get_region_language_to_use_from_operating_system()
+    # instantiate Extractor Specific Needs class
+    class_pn = ProjectNeeds(SCRIPT_NAME, language_to_use)
+    # load application configuration (inputs are defined into a json file)
+    class_pn.load_configuration()
+    # heavy packages are imported only once arguments are known to be valid,
+    # so --help or a wrong usage answers right away
+    from tableau_hyper_management.TableauServerCommunicator import TableauServerCommunicator
+    # initiate Logging sequence
+    class_pn.initiate_logger_and_timer()
+    # reflect title and input parameters given values in the log
+    class_pn.class_clam.listing_parameter_values(
+        class_pn.class_ln.logger, class_pn.timer, 'Tableau Data Source Bulk Publisher',
+        class_pn.config['input_options'][SCRIPT_NAME], class_pn.parameters)
+    # get the publishing plan from provided file
+    publishing_plan = class_pn.class_fo.fn_open_file_and_get_content(
+        class_pn.parameters.input_publishing_plan_file, 'json')
+    # every plan entry can point to multiple files (matching pattern or CalculatedDate expression)
+    publishing_list = []
+    for crt_plan in publishing_plan['Publishing Plan']:
+        crt_input_file = class_pn.class_ph.eval_expression(
+            class_pn.class_ln.logger, crt_plan['Input File'], 7)
+        relevant_files_list = class_pn.class_fo.fn_build_file_list(
+            class_pn.class_ln.logger, class_pn.timer, crt_input_file)
+        for crt_file in relevant_files_list:
+            publishing_list.append({
+                'Publishing Mode': crt_plan.get('Publishing Mode', 'Overwrite'),
+                'Tableau Extract File': crt_file,
+                'Tableau Project': crt_plan['Tableau Project'],
+            })
+    # get the secrets from provided file
+    credentials = class_pn.class_fo.fn_open_file_and_get_content(
+            class_pn.parameters.input_credentials_file, 'json')
+    credentials_dict = credentials['Credentials']['LDAP']['Production']['Default']
+    # instantiate main library that ensure Tableau Server communication
+    c_tsc = TableauServerCommunicator(language_to_use)
+    # projects listing can be reused across runs within cache time-to-live
+    c_tsc.configure_project_cache(class_pn.parameters.project_cache_file,
+                                  class_pn.parameters.project_cache_ttl)
+    # a stalled Tableau Server fails a request (to be retried) instead of hanging it
+    c_tsc.configure_request_timeout(class_pn.parameters.upload_timeout)
+    # unchanged extracts (compared to last successful publish) will be skipped
+    c_tsc.configure_publish_ledger(class_pn.parameters.publish_ledger_file)
+    # initiate Tableau Server connection (once for entire publishing plan)
+    c_tsc.connect_to_tableau_server(class_pn.class_ln.logger, class_pn.timer, {
+        'Tableau Server': class_pn.parameters.tableau_server,
+        'Tableau Site': class_pn.parameters.tableau_site,
+        'Username': credentials_dict['Username'],
+        'Password': credentials_dict['Password'],
+    })
+    # perform the publishing of all data sources
+    class_pn.class_rm.fn_start_stage('publish')
+    publishing_results = c_tsc.publish_multiple_data_sources_to_tableau_server(
+        class_pn.class_ln.logger, class_pn.timer, {
+            'Chunk Size [MB]': class_pn.parameters.upload_chunk_size,
+            'Publishing Plan': publishing_list,
+            'Retries': class_pn.parameters.upload_retries,
+            'Retry Backoff Seconds': class_pn.parameters.upload_retry_backoff,
+            'Workers': class_pn.parameters.workers,
+        })
+    class_pn.class_rm.fn_stop_stage('publish', None, class_pn.class_rm.fn_get_files_size(
+        [crt_publish['Tableau Extract File'] for crt_publish in publishing_list]))
+    # disconnect from Tableau Server
+    c_tsc.disconnect_from_tableau_server(class_pn.class_ln.logger, class_pn.timer)
+    # any data source not published makes the whole run a failure for schedulers
+    failed_counted = c_tsc.fn_log_publishing_failures(class_pn.class_ln.logger,
+                                                      publishing_results)
+    # per-stage metrics for dashboards
+    class_pn.fn_store_run_metrics('success' if failed_counted == 0 else 'failure')
+    # just final message
+    class_pn.class_bn.fn_final_message(
+            class_pn.class_ln.logger, class_pn.parameters.output_log_file,
+            class_pn.timer.timers.total(SCRIPT_NAME))
+    if failed_counted != 0:
+        exit(1)
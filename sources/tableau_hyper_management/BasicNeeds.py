@@ -5,25 +5,19 @@ This library has functions useful to keep main logic short and simple
 """
 # package to handle date and times
 from datetime import datetime, timedelta
-# package to add support for multi-language (i18n)
-import gettext
 # package to handle files/folders and related metadata/operations
 import os
 # package regular expressions
 import re
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
 
 
 class BasicNeeds:
     locale = None
 
     def __init__(self, in_language='en_US'):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def fn_add_value_to_dictionary(self, in_list, adding_value, adding_type, reference_column):
         add_type = adding_type.lower()
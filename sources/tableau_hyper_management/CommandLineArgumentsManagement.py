@@ -6,23 +6,15 @@ to call the main package functions
 """
 # package to handle arguments from command line
 import argparse
-# package to add support for multi-language (i18n)
-import gettext
-# package to facilitate operating system operations
-import os
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
 
 
 class CommandLineArgumentsManagement:
     locale = None
 
     def __init__(self, in_language='en_US'):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def listing_parameter_values(self, in_logger, timer, title, in_config, given_parameter_values):
         timer.start()
@@ -1,68 +1,269 @@
 """
 DataOutput - class to handle disk file storage
 """
+# package to run multiple file reads at once
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+# package to bind arguments to functions
+from functools import partial
 # package to handle files/folders and related metadata/operations
 import os
 # package facilitating Data Frames manipulation
 import pandas
+# package to read Arrow IPC (Feather) files
+import pyarrow.feather
+# package to facilitate data frame filtering
+from .DataManipulator import DataManipulator
+# package to facilitate file operations
+from .FileOperations import FileOperations
 
 
 class DataDiskRead:
+    # converting Arrow into pandas while freeing Arrow buffers needs pyarrow 1.0 or newer
+    arrow_conversion_options = {'split_blocks': True, 'self_destruct': True} \
+        if int(pyarrow.__version__.split('.')[0]) >= 1 else {}
+
+    @staticmethod
+    def fn_internal_get_columns_to_read(in_dict):
+        if len(in_dict['columns']) == 0:
+            return None
+        return in_dict['columns']
+
+    @staticmethod
+    def fn_internal_get_parquet_filters(in_dict):
+        if in_dict['filter rule'] is None:
+            return None
+        parquet_filters = DataManipulator.fn_convert_filter_to_parquet_filters(
+            in_dict['filter rule'])
+        if parquet_filters is None:
+            return None
+        # filter rule considers renamed columns, while Parquet file knows only original ones
+        original_names = {new_name: old_name
+                          for old_name, new_name in in_dict['column renames'].items()}
+        return [[(original_names.get(crt_column, crt_column), crt_operator, crt_value)
+                 for crt_column, crt_operator, crt_value in crt_conjunction]
+                for crt_conjunction in parquet_filters]
+
+    @staticmethod
+    def fn_internal_shape_loaded_data_frame(in_dict, in_data_frame):
+        # formats without read-time column selection get it right after load
+        if len(in_dict['columns']) != 0 and list(in_data_frame.columns) != in_dict['columns']:
+            in_data_frame = in_data_frame[in_dict['columns']]
+        if len(in_dict['column renames']) != 0:
+            in_data_frame = in_data_frame.rename(columns=in_dict['column renames'])
+        # filtering every file as soon as loaded keeps memory bounded to retained rows
+        if in_dict['filter rule'] is not None:
+            in_data_frame = in_data_frame.loc[
+                DataManipulator.fn_build_filter_mask(in_data_frame, in_dict['filter rule'])]
+        return in_data_frame
 
     @staticmethod
     def fn_internal_load_csv_file_into_data_frame(in_dict):
         if in_dict['format'].lower() == 'csv':
             try:
-                out_data_frame = []
-                for index_file, crt_file in enumerate(in_dict['files list']):
-                    out_data_frame.append(index_file)
-                    out_data_frame[index_file] = pandas.read_csv(
-                        filepath_or_buffer=crt_file, delimiter=in_dict['field delimiter'],
-                        cache_dates=True, index_col=None, memory_map=True, low_memory=False,
-                        encoding='utf-8')
-                    out_data_frame[index_file]['Source Data File Name'] = os.path.basename(crt_file)
-                in_dict['out data frame'] = pandas.concat(out_data_frame)
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_csv_file)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_load_files_in_parallel(in_dict, read_single_file,
+                                           executor_class=ThreadPoolExecutor):
+        # decompression and parsing release the GIL for most of their work, so threads overlap
+        workers = max(1, min(int(in_dict['workers']), len(in_dict['files list'])))
+        if workers == 1:
+            out_data_frame = [read_single_file(in_dict, crt_file)
+                              for crt_file in in_dict['files list']]
+        else:
+            with executor_class(max_workers=workers) as executor:
+                out_data_frame = list(executor.map(partial(read_single_file, in_dict),
+                                                   in_dict['files list']))
+        return pandas.concat(out_data_frame)
+
+    @staticmethod
+    def fn_internal_read_csv_file(in_dict, crt_file):
+        file_compression = FileOperations.fn_detect_file_compression(
+            crt_file, in_dict['compression'])
+        out_data_frame = DataDiskRead.fn_internal_shape_loaded_data_frame(
+            in_dict, pandas.read_csv(
+                filepath_or_buffer=crt_file, delimiter=in_dict['field delimiter'],
+                cache_dates=True, index_col=None, compression=file_compression,
+                # memory mapping only makes sense when content is read as stored
+                memory_map=(file_compression is None), low_memory=False, encoding='utf-8',
+                usecols=DataDiskRead.fn_internal_get_columns_to_read(in_dict)))
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
+
     @staticmethod
     def fn_internal_load_excel_file_into_data_frame(in_dict):
         if in_dict['format'].lower() == 'excel':
             try:
-                out_data_frame = []
-                for index_file, crt_file in enumerate(in_dict['files list']):
-                    out_data_frame.append(index_file)
-                    out_data_frame[index_file] = pandas.read_excel(io=crt_file, verbose=True)
-                    out_data_frame[index_file]['Source Data File Name'] = os.path.basename(crt_file)
-                in_dict['out data frame'] = pandas.concat(out_data_frame)
+                # workbook parsing is pure Python and holds the GIL, so files go to processes
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_excel_file, ProcessPoolExecutor)
+            except Exception as err:
+                in_dict['error details'] = err
+        return in_dict
+
+    @staticmethod
+    def fn_internal_read_excel_file(in_dict, crt_file):
+        excel_range = DataDiskRead.fn_internal_split_excel_range(in_dict['excel range'])
+        if crt_file.lower().endswith(('.xlsx', '.xlsm')):
+            out_data_frame = DataDiskRead.fn_internal_stream_excel_sheet(
+                in_dict, crt_file, excel_range)
+        else:
+            # legacy binary workbooks have no streaming reader
+            out_data_frame = pandas.read_excel(
+                io=crt_file, sheet_name=excel_range['sheet'], verbose=True,
+                usecols=DataDiskRead.fn_internal_get_columns_to_read(in_dict))
+        out_data_frame = DataDiskRead.fn_internal_shape_loaded_data_frame(in_dict, out_data_frame)
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
+
+    @staticmethod
+    def fn_internal_split_excel_range(in_excel_range):
+        # follows Excel notation: "Sheet Name!A1:F1000", "Sheet Name" or "!A1:F1000"
+        sheet_name, cell_range = 0, None
+        if in_excel_range not in (None, ''):
+            if '!' in in_excel_range:
+                sheet_name, cell_range = in_excel_range.rsplit('!', 1)
+                cell_range = cell_range.replace('$', '')
+            else:
+                sheet_name = in_excel_range
+            if sheet_name == '':
+                sheet_name = 0
+        return {'sheet': sheet_name, 'range': cell_range}
+
+    @staticmethod
+    def fn_internal_stream_excel_sheet(in_dict, crt_file, in_excel_range):
+        # package to stream Excel workbooks row by row, imported only when Excel is read
+        import openpyxl
+        from openpyxl.utils.cell import range_boundaries
+        # read-only mode parses sheet XML lazily instead of building the whole workbook in memory
+        work_book = openpyxl.load_workbook(crt_file, read_only=True, data_only=True)
+        try:
+            if in_excel_range['sheet'] == 0:
+                work_sheet = work_book.worksheets[0]
+            else:
+                work_sheet = work_book[in_excel_range['sheet']]
+            boundaries = {}
+            if in_excel_range['range'] is not None:
+                boundaries = dict(zip(['min_col', 'min_row', 'max_col', 'max_row'],
+                                      range_boundaries(in_excel_range['range'])))
+            rows_iterator = work_sheet.iter_rows(values_only=True, **boundaries)
+            header = [str(crt_value) for crt_value in next(rows_iterator, ())]
+            column_indexes = list(range(len(header)))
+            if len(in_dict['columns']) != 0:
+                column_indexes = [header.index(crt_column) for crt_column in in_dict['columns']]
+            # trailing empty cells are not stored, so shorter rows get padded
+            out_data_frame = pandas.DataFrame.from_records(
+                [[crt_row[crt_index] if crt_index < len(crt_row) else None
+                  for crt_index in column_indexes]
+                 for crt_row in rows_iterator
+                 if any(crt_value is not None for crt_value in crt_row)],
+                columns=[header[crt_index] for crt_index in column_indexes])
+        finally:
+            work_book.close()
+        return out_data_frame
+
+    @staticmethod
+    def fn_internal_load_feather_file_into_data_frame(in_dict):
+        if in_dict['format'].lower() == 'feather':
+            try:
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_feather_file)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_read_feather_file(in_dict, crt_file):
+        # memory mapping avoids reading file content upfront, only needed columns are touched
+        arrow_table = pyarrow.feather.read_table(
+            crt_file, columns=DataDiskRead.fn_internal_get_columns_to_read(in_dict),
+            memory_map=True)
+        out_data_frame = DataDiskRead.fn_internal_shape_loaded_data_frame(
+            in_dict, arrow_table.to_pandas(**DataDiskRead.arrow_conversion_options))
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
+
     @staticmethod
     def fn_internal_load_json_file_into_data_frame(in_dict):
         if in_dict['format'].lower() == 'json':
             try:
-                out_data_frame = []
-                for index_file, crt_file in enumerate(in_dict['files list']):
-                    out_data_frame.append(index_file)
-                    out_data_frame[index_file] = pandas.read_json(
-                        path_or_buf=crt_file, compression=in_dict['compression'])
-                    out_data_frame[index_file]['Source Data File Name'] = os.path.basename(crt_file)
-                in_dict['out data frame'] = pandas.concat(out_data_frame)
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_json_file)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_read_json_file(in_dict, crt_file):
+        out_data_frame = DataDiskRead.fn_internal_shape_loaded_data_frame(
+            in_dict, pandas.read_json(
+                path_or_buf=crt_file, compression=FileOperations.fn_detect_file_compression(
+                    crt_file, in_dict['compression'])))
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
+
+    @staticmethod
+    def fn_internal_flatten_nested_columns(in_data_frame):
+        # only columns holding objects (dictionaries) are flattened, into dotted names
+        for crt_column in in_data_frame.select_dtypes(include='object').columns:
+            column_values = in_data_frame[crt_column]
+            if not column_values.map(lambda x: isinstance(x, dict)).any():
+                continue
+            flattened_columns = pandas.json_normalize(
+                [crt if isinstance(crt, dict) else {} for crt in column_values], sep='.')
+            flattened_columns.columns = [crt_column + '.' + crt
+                                         for crt in flattened_columns.columns]
+            flattened_columns.index = in_data_frame.index
+            in_data_frame = pandas.concat(
+                [in_data_frame.drop(columns=[crt_column]), flattened_columns], axis=1)
+        return in_data_frame
+
+    @staticmethod
+    def fn_internal_load_json_lines_file_into_data_frame(in_dict):
+        if in_dict['format'].lower() == 'jsonl':
+            try:
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_json_lines_file)
+            except Exception as err:
+                in_dict['error details'] = err
+        return in_dict
+
+    @staticmethod
+    def fn_internal_read_json_lines_file(in_dict, crt_file):
+        out_data_frame = []
+        # newline delimited content is read in chunks of rows,
+        # every chunk being shaped (and possibly reduced) before next one is read
+        with pandas.read_json(path_or_buf=crt_file, lines=True, chunksize=in_dict['chunk rows'],
+                              compression=FileOperations.fn_detect_file_compression(
+                                  crt_file, in_dict['compression'])) as json_reader:
+            for crt_chunk in json_reader:
+                crt_chunk = DataDiskRead.fn_internal_flatten_nested_columns(crt_chunk)
+                # a nested key may be absent from a whole chunk, so it gets empty values
+                if len(in_dict['columns']) != 0:
+                    crt_chunk = crt_chunk.reindex(columns=in_dict['columns'])
+                out_data_frame.append(DataDiskRead.fn_internal_shape_loaded_data_frame(
+                    in_dict, crt_chunk))
+        out_data_frame = pandas.concat(out_data_frame, ignore_index=True)
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
+
     @staticmethod
     def fn_internal_load_parquet_file_into_data_frame(in_dict):
         if in_dict['format'].lower() == 'parquet':
             try:
+                # row groups which cannot match are skipped while reading
+                parquet_filters = DataDiskRead.fn_internal_get_parquet_filters(in_dict)
                 out_data_frame = []
                 for index_file, crt_file in enumerate(in_dict['files list']):
                     out_data_frame.append(index_file)
-                    out_data_frame[index_file] = pandas.read_parquet(path=crt_file)
+                    out_data_frame[index_file] = DataDiskRead.fn_internal_shape_loaded_data_frame(
+                        in_dict, pandas.read_parquet(
+                            path=crt_file, filters=parquet_filters,
+                            columns=DataDiskRead.fn_internal_get_columns_to_read(in_dict)))
                     out_data_frame[index_file]['Source Data File Name'] = os.path.basename(crt_file)
                 in_dict['out data frame'] = pandas.concat(out_data_frame)
             except Exception as err:
@@ -73,13 +274,17 @@ class DataDiskRead:
     def fn_internal_load_pickle_file_into_data_frame(in_dict):
         if in_dict['format'].lower() == 'pickle':
             try:
-                out_data_frame = []
-                for index_file, crt_file in enumerate(in_dict['files list']):
-                    out_data_frame.append(index_file)
-                    out_data_frame[index_file] = pandas.read_pickle(
-                        filepath_or_buffer=crt_file, compression=in_dict['compression'])
-                    out_data_frame[index_file]['Source Data File Name'] = os.path.basename(crt_file)
-                in_dict['out data frame'] = pandas.concat(out_data_frame)
+                in_dict['out data frame'] = DataDiskRead.fn_internal_load_files_in_parallel(
+                    in_dict, DataDiskRead.fn_internal_read_pickle_file)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
+
+    @staticmethod
+    def fn_internal_read_pickle_file(in_dict, crt_file):
+        out_data_frame = DataDiskRead.fn_internal_shape_loaded_data_frame(
+            in_dict, pandas.read_pickle(
+                filepath_or_buffer=crt_file, compression=FileOperations.fn_detect_file_compression(
+                    crt_file, in_dict['compression'])))
+        out_data_frame['Source Data File Name'] = os.path.basename(crt_file)
+        return out_data_frame
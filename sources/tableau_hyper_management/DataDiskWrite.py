@@ -1,24 +1,32 @@
 """
 DataInput - class to handle data storing to disk (from Pandas Data Frame
 """
+# package to write Data Frames incrementally
+from .DataStreamWriter import DataStreamWriter
 
 
 class DataDiskWrite:
-    implemented_disk_write_file_types = ['csv', 'excel', 'json', 'parquet', 'pickle']
+    implemented_disk_write_file_types = ['csv', 'excel', 'feather', 'json', 'jsonl', 'parquet',
+                                         'pickle']
 
     @staticmethod
     def fn_internal_store_data_frame_to_csv_file(in_dict):
         if in_dict['format'].lower() == 'csv':
             try:
-                in_dict['in data frame'].to_csv(path_or_buf = in_dict['name'],
-                                                sep = in_dict['field delimiter'],
-                                                header = True,
-                                                index = False,
-                                                encoding = 'utf-8')
+                DataDiskWrite.fn_internal_store_data_frame_in_chunks(in_dict)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_store_data_frame_in_chunks(in_dict):
+        # slices are handed over one by one, so compression overlaps with formatting
+        chunk_rows = int(in_dict['chunk rows'])
+        with DataStreamWriter.fn_get_stream_writer(in_dict) as stream_writer:
+            for row_start in range(0, max(len(in_dict['in data frame']), 1), chunk_rows):
+                stream_writer.fn_write(
+                    in_dict['in data frame'].iloc[row_start:(row_start + chunk_rows)])
+
     @staticmethod
     def fn_internal_store_data_frame_to_excel_file(in_dict):
         if in_dict['format'].lower() == 'excel':
@@ -33,6 +41,15 @@ class DataDiskWrite:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_store_data_frame_to_feather_file(in_dict):
+        if in_dict['format'].lower() == 'feather':
+            try:
+                DataDiskWrite.fn_internal_store_data_frame_in_chunks(in_dict)
+            except Exception as err:
+                in_dict['error details'] = err
+        return in_dict
+
     @staticmethod
     def fn_internal_store_data_frame_to_json_file(in_dict):
         if in_dict['format'].lower() == 'json':
@@ -43,13 +60,23 @@ class DataDiskWrite:
                 in_dict['error details'] = err
         return in_dict
 
+    @staticmethod
+    def fn_internal_store_data_frame_to_json_lines_file(in_dict):
+        if in_dict['format'].lower() == 'jsonl':
+            try:
+                in_dict['in data frame'].to_json(path_or_buf = in_dict['name'],
+                                                 compression = in_dict['compression'],
+                                                 orient = 'records',
+                                                 lines = True)
+            except Exception as err:
+                in_dict['error details'] = err
+        return in_dict
+
     @staticmethod
     def fn_internal_store_data_frame_to_parquet_file(in_dict):
         if in_dict['format'].lower() == 'parquet':
             try:
-                in_dict['in data frame'].to_parquet(path = in_dict['name'],
-                                                    compression = in_dict['compression'],
-                                                    use_deprecated_int96_timestamps = True)
+                DataDiskWrite.fn_internal_store_data_frame_in_chunks(in_dict)
             except Exception as err:
                 in_dict['error details'] = err
         return in_dict
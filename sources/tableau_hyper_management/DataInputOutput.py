@@ -1,28 +1,23 @@
 """
 Data Input Output class
 """
-# package to add support for multi-language (i18n)
-import gettext
 # package to handle files/folders and related metadata/operations
 import os
 
 # local packages
 from .DataDiskRead import DataDiskRead
 from .DataDiskWrite import DataDiskWrite
+from .FileOperations import FileOperations
+from .LocaleNeeds import LocaleNeeds
 
 
 class DataInputOutput(DataDiskRead, DataDiskWrite):
+    class_fo = None
     locale = None
 
     def __init__(self, in_language):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep) \
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts) - 1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-                os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'),
-                locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir = locale_folder,
-                                          languages = [in_language], fallback = True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
+        self.class_fo = FileOperations(in_language)
 
     @staticmethod
     def fn_add_missing_defaults_to_dict_message(in_dict):
@@ -30,6 +25,22 @@ class DataInputOutput(DataDiskRead, DataDiskWrite):
             in_dict['field delimiter'] = os.pathsep
         if 'compression' not in in_dict:
             in_dict['compression'] = 'infer'
+        if 'write mode' not in in_dict:
+            in_dict['write mode'] = 'direct'
+        if 'filter rule' not in in_dict:
+            in_dict['filter rule'] = None
+        if 'columns' not in in_dict:
+            in_dict['columns'] = []
+        if 'chunk rows' not in in_dict:
+            in_dict['chunk rows'] = 100000
+        if 'workers' not in in_dict:
+            in_dict['workers'] = 1
+        if 'partition columns' not in in_dict:
+            in_dict['partition columns'] = []
+        if 'column renames' not in in_dict:
+            in_dict['column renames'] = {}
+        if 'excel range' not in in_dict:
+            in_dict['excel range'] = ''
         return in_dict
 
     def fn_build_feedback_for_logger(self, operation_details):
@@ -97,7 +108,9 @@ class DataInputOutput(DataDiskRead, DataDiskWrite):
             in_dict = self.fn_pack_dict_message(in_dict, in_dict['file list'])
             in_dict = self.fn_internal_load_csv_file_into_data_frame(in_dict)
             in_dict = self.fn_internal_load_excel_file_into_data_frame(in_dict)
+            in_dict = self.fn_internal_load_feather_file_into_data_frame(in_dict)
             in_dict = self.fn_internal_load_json_file_into_data_frame(in_dict)
+            in_dict = self.fn_internal_load_json_lines_file_into_data_frame(in_dict)
             in_dict = self.fn_internal_load_parquet_file_into_data_frame(in_dict)
             in_dict = self.fn_internal_load_pickle_file_into_data_frame(in_dict)
             self.fn_file_operation_logger(in_logger, in_dict)
@@ -110,16 +123,24 @@ class DataInputOutput(DataDiskRead, DataDiskWrite):
                 and in_dict['compression'].lower() == 'none':
             in_dict['compression'] = None
         return {
+            'chunk rows'     : int(in_dict['chunk rows']),
+            'column renames' : in_dict['column renames'],
+            'columns'        : in_dict['columns'],
             'compression'    : in_dict['compression'],
             'field delimiter': in_dict['field delimiter'],
             'files list'     : in_file_list,
             'files counted'  : len(in_file_list),
             'error details'  : None,
+            'excel range'    : in_dict['excel range'],
+            'filter rule'    : in_dict['filter rule'],
             'format'         : in_dict['format'],
             'name'           : in_dict['name'],
             'in data frame'  : None,
             'operation'      : in_dict['operation'],
             'out data frame' : None,
+            'partition columns': in_dict['partition columns'],
+            'workers'        : in_dict['workers'],
+            'write mode'     : in_dict['write mode'],
         }
 
     def fn_store_data_frame_to_file(self, in_logger, timer, in_data_frame, in_dict):
@@ -129,11 +150,33 @@ class DataInputOutput(DataDiskRead, DataDiskWrite):
             in_dict.update({'operation': 'save'})
             in_dict = self.fn_pack_dict_message(in_dict, [])
             in_dict.update({'in data frame': in_data_frame})
+            final_file_name = in_dict['name']
+            # partitioned datasets are folders, staged and swapped by their own writer
+            if len(in_dict['partition columns']) != 0:
+                in_dict['write mode'] = 'direct'
+            # when staged, writers produce a temporary file which replaces final one at the end
+            if in_dict['write mode'] != 'direct':
+                in_dict['name'] = self.class_fo.fn_build_staging_file_name(final_file_name)
             # special case treatment
             in_dict = self.fn_internal_store_data_frame_to_csv_file(in_dict)
             in_dict = self.fn_internal_store_data_frame_to_excel_file(in_dict)
+            in_dict = self.fn_internal_store_data_frame_to_feather_file(in_dict)
             in_dict = self.fn_internal_store_data_frame_to_json_file(in_dict)
+            in_dict = self.fn_internal_store_data_frame_to_json_lines_file(in_dict)
             in_dict = self.fn_internal_store_data_frame_to_parquet_file(in_dict)
             in_dict = self.fn_internal_store_data_frame_to_pickle_file(in_dict)
+            if in_dict['write mode'] != 'direct':
+                staging_file_name = in_dict['name']
+                in_dict['name'] = final_file_name
+                if in_dict['error details'] is None:
+                    timer.stop()
+                    self.class_fo.fn_promote_staging_file(in_logger, timer, {
+                        'final file': final_file_name,
+                        'keep previous': (in_dict['write mode'] == 'staged-keep-previous'),
+                        'staging file': staging_file_name,
+                    })
+                    timer.start()
+                elif os.path.isfile(staging_file_name):
+                    os.remove(staging_file_name)
             self.fn_file_operation_logger(in_logger, in_dict)
         timer.stop()
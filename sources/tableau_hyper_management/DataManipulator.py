@@ -1,36 +1,37 @@
 """
 Data Manipulation class
 """
-# package to add support for multi-language (i18n)
-import gettext
-# package to handle files/folders and related metadata/operations
-import os
+# package to handle numerical structures
+import numpy
+# package to handle Data Frames (in this file)
+import pandas as pd
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
 
 
 class DataManipulator:
     locale = None
 
     def __init__(self, in_language='en_US'):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def fn_add_and_shift_column(self, local_logger, timer, input_data_frame, input_details: list):
         evr = 'Empty Values Replacement'
+        # every original column is encoded only once, regardless of how many shifts use it
+        encoded_columns = {}
         for crt_dict in input_details:
             timer.start()
-            input_data_frame[crt_dict['New Column']] = input_data_frame[crt_dict['Original Column']]
+            if crt_dict['Original Column'] not in encoded_columns:
+                encoded_columns[crt_dict['Original Column']] = self.fn_encode_column_as_text(
+                    input_data_frame[crt_dict['Original Column']])
+            encoded_column = encoded_columns[crt_dict['Original Column']]
             col_offset = self.fn_set_shifting_value(crt_dict)
-            input_data_frame[crt_dict['New Column']] = \
-                input_data_frame[crt_dict['New Column']].shift(col_offset)
-            input_data_frame[crt_dict['New Column']] = \
-                input_data_frame[crt_dict['New Column']].apply(lambda x: str(x)
-                                                               .replace('nan', str(crt_dict[evr]))
-                                                               .replace('.0', ''))
+            # shifting happens on integer codes, where -1 (NULL or shifted-in) gets replacement
+            shifted_codes = pd.Series(encoded_column['codes']) \
+                .shift(col_offset, fill_value=-1).to_numpy()
+            text_values = numpy.append(encoded_column['texts'], str(crt_dict[evr]))
+            input_data_frame[crt_dict['New Column']] = pd.Series(
+                text_values[shifted_codes], index=input_data_frame.index)
             local_logger.info(self.locale.gettext(
                 'A new column named "{new_column_name}" as copy from "{original_column}" '
                 + 'then shifted by {shifting_rows} to relevant data frame '
@@ -53,37 +54,202 @@ class DataManipulator:
             grouped_df.rename(columns=dict_expression['map'], inplace=True)
         return grouped_df
 
-    def fn_apply_query_to_data_frame(self, local_logger, timer, input_data_frame, extract_params):
+    def fn_apply_transformations_to_data_frame(self, local_logger, timer, input_data_frame,
+                                               input_transformations: list):
+        """
+        Applies an ordered list of transformations (filter, shift, derive, rename, drop)
+        to a data frame, consecutive shifts being handled together
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param input_data_frame: data frame to transform
+        :param input_transformations: list of dictionaries, each having an "operation" key
+            and the keys expected by the relevant operation
+        :return: transformed data frame
+        """
+        pending_shifts = []
+        for crt_transformation in input_transformations + [{'operation': 'end'}]:
+            if crt_transformation['operation'] == 'shift':
+                pending_shifts.append(crt_transformation)
+                continue
+            if len(pending_shifts) != 0:
+                input_data_frame = self.fn_add_and_shift_column(
+                    local_logger, timer, input_data_frame, pending_shifts)
+                pending_shifts = []
+            if crt_transformation['operation'] == 'filter':
+                if 'rule' in crt_transformation:
+                    input_data_frame = self.fn_apply_filter_to_data_frame(
+                        local_logger, timer, input_data_frame, crt_transformation['rule'])
+                elif 'query' in crt_transformation:
+                    timer.start()
+                    input_data_frame = input_data_frame.query(crt_transformation['query'])
+                    timer.stop()
+                else:
+                    input_data_frame = self.fn_apply_query_to_data_frame(
+                        local_logger, timer, input_data_frame, crt_transformation)
+            elif crt_transformation['operation'] in ('derive', 'drop', 'rename'):
+                timer.start()
+                input_data_frame = self.fn_apply_structural_transformation(
+                    input_data_frame, crt_transformation)
+                timer.stop()
+            elif crt_transformation['operation'] != 'end':
+                raise ValueError(self.locale.gettext(
+                    'Transformation "{operation}" is not among supported ones: "{operations}"')
+                                 .replace('{operation}', crt_transformation['operation'])
+                                 .replace('{operations}', '", "'.join(
+                                     ['derive', 'drop', 'filter', 'rename', 'shift'])))
+            if crt_transformation['operation'] != 'end':
+                local_logger.info(self.locale.gettext(
+                    'Transformation "{operation}" applied, data frame has {rows_count} rows '
+                    + 'and {columns_count} columns')
+                                  .replace('{operation}', crt_transformation['operation'])
+                                  .replace('{rows_count}', str(len(input_data_frame)))
+                                  .replace('{columns_count}',
+                                           str(len(input_data_frame.columns))))
+        return input_data_frame
+
+    @staticmethod
+    def fn_apply_structural_transformation(input_data_frame, in_transformation):
+        if in_transformation['operation'] == 'derive':
+            input_data_frame[in_transformation['New Column']] = \
+                input_data_frame.eval(in_transformation['Expression'])
+        elif in_transformation['operation'] == 'drop':
+            input_data_frame = input_data_frame.drop(columns=in_transformation['columns'])
+        elif in_transformation['operation'] == 'rename':
+            input_data_frame = input_data_frame.rename(columns=in_transformation['map'])
+        return input_data_frame
+
+    def fn_apply_filter_to_data_frame(self, local_logger, timer, input_data_frame, filter_rule):
         timer.start()
-        query_expression = ''
+        rows_before = len(input_data_frame)
+        input_data_frame = input_data_frame.loc[
+            self.fn_build_filter_mask(input_data_frame, filter_rule)]
+        local_logger.info(self.locale.gettext(
+            'Filter retained {rows_after} rows out of {rows_before}')
+                          .replace('{rows_after}', str(len(input_data_frame)))
+                          .replace('{rows_before}', str(rows_before)))
+        timer.stop()
+        return input_data_frame
+
+    def fn_apply_query_to_data_frame(self, local_logger, timer, input_data_frame, extract_params):
         generic_pre_feedback = self.locale.gettext('Will retain only values {filter_type} '
                                                    + '"{filter_values}" within the field '
                                                    + '"{column_to_filter}"') \
             .replace('{column_to_filter}', extract_params['column_to_filter'])
+        filter_rule = {'column': extract_params['column_to_filter']}
         if extract_params['filter_to_apply'] == 'equal':
             local_logger.debug(generic_pre_feedback
                                .replace('{filter_type}', self.locale.gettext('equal with'))
                                .replace('{filter_values}', extract_params['filter_values']))
-            query_expression = '`' + extract_params['column_to_filter'] + '` == "' \
-                               + extract_params['filter_values'] + '"'
+            filter_rule.update({'operator': 'eq', 'value': extract_params['filter_values']})
         elif extract_params['filter_to_apply'] == 'different':
             local_logger.debug(generic_pre_feedback
                                .replace('{filter_type}', self.locale.gettext('different than'))
                                .replace('{filter_values}', extract_params['filter_values']))
-            query_expression = '`' + extract_params['column_to_filter'] + '` != "' \
-                               + extract_params['filter_values'] + '"'
+            filter_rule.update({'operator': 'ne', 'value': extract_params['filter_values']})
         elif extract_params['filter_to_apply'] == 'multiple_match':
-            multiple_values = '["' + '", "'.join(extract_params['filter_values'].values()) + '"]'
+            multiple_values = list(extract_params['filter_values'].values())
             local_logger.debug(generic_pre_feedback
                                .replace('{filter_type}',
                                         self.locale.gettext('matching any of these values'))
-                               .replace('{filter_values}', multiple_values))
-            query_expression = '`' + extract_params['column_to_filter'] + '` in ' + multiple_values
-        local_logger.debug(self.locale.gettext('Query expression to apply is: {query_expression}')
-                           .replace('{query_expression}', query_expression))
-        input_data_frame.query(query_expression, inplace=True)
-        timer.stop()
-        return input_data_frame
+                               .replace('{filter_values}', '["' + '", "'.join(multiple_values)
+                                        + '"]'))
+            filter_rule.update({'operator': 'isin', 'values': multiple_values})
+        return self.fn_apply_filter_to_data_frame(
+            local_logger, timer, input_data_frame, filter_rule)
+
+    @staticmethod
+    def fn_encode_column_as_text(in_series):
+        # formatting only distinct values is far cheaper than formatting every row
+        value_codes, unique_values = pd.factorize(in_series)
+        unique_values = pd.Series(unique_values)
+        text_values = unique_values.astype(str)
+        # whole numbers stored as float (due to NULLs) are written without trailing ".0"
+        if pd.api.types.is_float_dtype(unique_values):
+            whole_values = (unique_values % 1 == 0) & (unique_values.abs() < 2 ** 63)
+            text_values[whole_values] = unique_values[whole_values].astype('int64').astype(str)
+        return {
+            'codes': value_codes,
+            'texts': text_values.to_numpy(dtype=object),
+        }
+
+    @staticmethod
+    def fn_build_filter_mask(input_data_frame, filter_rule):
+        """
+        Evaluates a filter rule into a boolean mask in a single vectorized pass
+
+        :param input_data_frame: data frame to evaluate rule against
+        :param filter_rule: either {"and": [rules]}, {"or": [rules]} or a condition having
+            "column", "operator" (eq|ne|gt|ge|lt|le|isin|notin|between|isnull|notnull)
+            and, depending on operator, "value", "values" or "lower" and "upper"
+        :return: boolean Series aligned with data frame index
+        """
+        if 'and' in filter_rule or 'or' in filter_rule:
+            combination = 'and' if 'and' in filter_rule else 'or'
+            masks = [DataManipulator.fn_build_filter_mask(input_data_frame, crt_rule)
+                     for crt_rule in filter_rule[combination]]
+            if len(masks) == 0:
+                # an empty "and" keeps every row, an empty "or" none
+                return pd.Series(combination == 'and', index=input_data_frame.index)
+            if combination == 'and':
+                return numpy.logical_and.reduce(masks)
+            return numpy.logical_or.reduce(masks)
+        column = input_data_frame[filter_rule['column']]
+        operator = filter_rule['operator']
+        if operator in ('eq', 'ne', 'gt', 'ge', 'lt', 'le'):
+            return getattr(column, operator)(filter_rule['value'])
+        elif operator in ('isin', 'notin'):
+            # a set is hashed once, so membership check is cheap whatever the values count
+            mask = column.isin(set(filter_rule['values']))
+            return mask if operator == 'isin' else ~mask
+        elif operator == 'between':
+            return column.between(filter_rule['lower'], filter_rule['upper'])
+        elif operator == 'isnull':
+            return column.isnull()
+        elif operator == 'notnull':
+            return column.notnull()
+        raise ValueError('Unknown filter operator "' + operator + '"')
+
+    @staticmethod
+    def fn_convert_filter_to_parquet_filters(filter_rule):
+        """
+        Translates a filter rule into the disjunctive normal form accepted by Parquet readers,
+        so row groups not matching can be skipped while reading
+
+        :param filter_rule: filter rule, see fn_build_filter_mask
+        :return: list of lists of (column, operator, value) tuples or None if not translatable
+        """
+        # "ne" and "notin" are left out on purpose: Parquet readers drop NULL rows for them,
+        # while in-memory evaluation keeps them, so those are evaluated after reading only
+        operators = {'eq': '=', 'gt': '>', 'ge': '>=', 'lt': '<', 'le': '<=', 'isin': 'in'}
+        if len(filter_rule.get('and', filter_rule.get('or', [None]))) == 0:
+            # empty groups are left to in-memory evaluation
+            return None
+        if 'or' in filter_rule:
+            disjunction = []
+            for crt_rule in filter_rule['or']:
+                crt_filters = DataManipulator.fn_convert_filter_to_parquet_filters(crt_rule)
+                if crt_filters is None:
+                    return None
+                disjunction.extend(crt_filters)
+            return disjunction
+        if 'and' in filter_rule:
+            conjunction = []
+            for crt_rule in filter_rule['and']:
+                crt_filters = DataManipulator.fn_convert_filter_to_parquet_filters(crt_rule)
+                if crt_filters is None or len(crt_filters) != 1:
+                    return None
+                conjunction.extend(crt_filters[0])
+            return [conjunction]
+        if filter_rule['operator'] == 'between':
+            return [[(filter_rule['column'], '>=', filter_rule['lower']),
+                     (filter_rule['column'], '<=', filter_rule['upper'])]]
+        if filter_rule['operator'] == 'isin':
+            return [[(filter_rule['column'], operators['isin'], list(filter_rule['values']))]]
+        if filter_rule['operator'] in operators:
+            return [[(filter_rule['column'], operators[filter_rule['operator']],
+                      filter_rule['value'])]]
+        return None
 
     def fn_filter_data_frame_by_index(self, local_logger, in_data_frame, filter_rule):
         reference_expression = filter_rule['Query Expression for Reference Index']
@@ -0,0 +1,304 @@
+"""
+DataStreamWriter - classes to write Data Frames to disk incrementally
+
+Frames (or batches of rows) are appended one after another, so memory needed is bound
+by the size of a single batch rather than the entire content,
+either into a single file or into a partitioned dataset
+"""
+# package to compress content
+import bz2
+import gzip
+import lzma
+import zipfile
+# package to combine context managers
+import contextlib
+# package to run partitions writing at once
+from concurrent.futures import ThreadPoolExecutor
+# package to handle JSON content
+import json
+# package to handle files/folders and related metadata/operations
+import os
+# package to exchange content between threads
+import queue
+# package to replace entire dataset folders
+import shutil
+# package to run compression aside from content preparation
+import threading
+# package to build partition folder names
+import urllib.parse
+# package to handle Data Frames
+import pandas
+# package to handle Parquet files
+import pyarrow
+import pyarrow.ipc
+import pyarrow.parquet
+# package to facilitate file operations
+from .FileOperations import FileOperations
+
+
+class DataStreamWriter:
+    compression = None
+    csv_queue = None
+    csv_thread = None
+    csv_thread_error = None
+    feather_writer = None
+    file_name = None
+    file_format = None
+    header_written = False
+    parquet_writer = None
+    rows_written = 0
+    settings = None
+
+    def __init__(self, in_dict):
+        """
+        :param in_dict: dictionary containing following keys with relevant values:
+            "format" (csv|feather|parquet), "name", "compression", "field delimiter"
+            and "chunk rows" (rows per Parquet row group or Arrow record batch)
+        """
+        self.file_format = in_dict['format'].lower()
+        self.file_name = in_dict['name']
+        self.settings = in_dict
+        self.compression = in_dict.get('compression', 'infer')
+        if self.compression == 'infer':
+            self.compression = FileOperations.fn_get_compression_by_extension(self.file_name)
+        if self.compression is not None and str(self.compression).lower() == 'none':
+            self.compression = None
+        # Parquet compresses internally, by column chunks, which is worth having by default
+        if self.file_format == 'parquet' and in_dict.get('compression', 'infer') == 'infer':
+            self.compression = 'snappy'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        self.fn_close()
+
+    def fn_close(self):
+        if self.feather_writer is not None:
+            self.feather_writer.close()
+            self.feather_writer = None
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+        if self.csv_thread is not None:
+            self.csv_queue.put(None)
+            self.csv_thread.join()
+            self.csv_thread = None
+            if self.csv_thread_error is not None:
+                raise self.csv_thread_error
+
+    def fn_open_compressed_stream(self):
+        if self.compression is None:
+            return open(self.file_name, 'wb')
+        elif self.compression == 'gzip':
+            return gzip.open(self.file_name, 'wb', compresslevel=6)
+        elif self.compression == 'bz2':
+            return bz2.open(self.file_name, 'wb')
+        elif self.compression == 'xz':
+            return lzma.open(self.file_name, 'wb')
+        elif self.compression == 'zstd':
+            # optional dependency, only needed when Zstandard output is wanted
+            import zstandard
+            return zstandard.ZstdCompressor(threads=-1).stream_writer(
+                open(self.file_name, 'wb'), closefd=True)
+        elif self.compression == 'zip':
+            return self.fn_open_zip_member_stream()
+        raise ValueError('Unsupported compression "' + str(self.compression) + '"')
+
+    @contextlib.contextmanager
+    def fn_open_zip_member_stream(self):
+        # single member archive, member being named as the file without ".zip" extension
+        member_name = os.path.basename(self.file_name)
+        if member_name.lower().endswith('.zip'):
+            member_name = member_name[:-4]
+        with zipfile.ZipFile(self.file_name, 'w', compression=zipfile.ZIP_DEFLATED) \
+                as zip_archive, zip_archive.open(member_name, 'w', force_zip64=True) as zip_member:
+            yield zip_member
+
+    def fn_run_csv_compression(self):
+        try:
+            with self.fn_open_compressed_stream() as file_handler:
+                content_block = self.csv_queue.get()
+                while content_block is not None:
+                    file_handler.write(content_block)
+                    content_block = self.csv_queue.get()
+        except Exception as err:
+            self.csv_thread_error = err
+            # keep consuming, so producer is never blocked on a full queue
+            while self.csv_queue.get() is not None:
+                pass
+
+    def fn_write(self, in_data_frame):
+        if self.file_format == 'csv':
+            self.fn_write_csv(in_data_frame)
+        elif self.file_format == 'feather':
+            self.fn_write_feather(in_data_frame)
+        elif self.file_format == 'parquet':
+            self.fn_write_parquet(in_data_frame)
+        else:
+            raise ValueError('Streaming is not implemented for "' + self.file_format + '"')
+        self.rows_written += len(in_data_frame)
+
+    def fn_write_csv(self, in_data_frame):
+        if self.csv_thread is None:
+            # bounded queue keeps at most few blocks in memory while compression catches up
+            self.csv_queue = queue.Queue(maxsize=4)
+            self.csv_thread = threading.Thread(target=self.fn_run_csv_compression, daemon=True)
+            self.csv_thread.start()
+        if self.csv_thread_error is not None:
+            raise self.csv_thread_error
+        self.csv_queue.put(in_data_frame.to_csv(
+            sep=self.settings['field delimiter'], header=(not self.header_written),
+            index=False).encode('utf-8'))
+        self.header_written = True
+
+    def fn_write_feather(self, in_data_frame):
+        arrow_table = pyarrow.Table.from_pandas(in_data_frame, preserve_index=False)
+        if self.feather_writer is None:
+            # Arrow IPC file (Feather V2) is kept uncompressed, so it can be memory-mapped
+            self.feather_writer = pyarrow.ipc.new_file(self.file_name, arrow_table.schema)
+        else:
+            arrow_table = arrow_table.cast(self.feather_writer.schema)
+        self.feather_writer.write_table(arrow_table,
+                                        max_chunksize=int(self.settings['chunk rows']))
+
+    def fn_write_parquet(self, in_data_frame):
+        arrow_table = pyarrow.Table.from_pandas(in_data_frame, preserve_index=False)
+        if self.parquet_writer is None:
+            self.parquet_writer = pyarrow.parquet.ParquetWriter(
+                self.file_name, arrow_table.schema, compression=self.compression or 'none',
+                use_dictionary=True, coerce_timestamps='us', allow_truncated_timestamps=True,
+                use_deprecated_int96_timestamps=False)
+        else:
+            arrow_table = arrow_table.cast(self.parquet_writer.schema)
+        self.parquet_writer.write_table(arrow_table,
+                                        row_group_size=int(self.settings['chunk rows']))
+
+    @staticmethod
+    def fn_get_stream_writer(in_dict):
+        if len(in_dict.get('partition columns', [])) != 0:
+            return PartitionedDataStreamWriter(in_dict)
+        return DataStreamWriter(in_dict)
+
+
+class PartitionedDataStreamWriter:
+    """
+    Writes Hive-style partitioned datasets (a folder per partition column value,
+    like year=2026/month=10/), keeping one stream writer per partition
+    and recording every file written into a manifest;
+    dataset is written into a sibling staging folder replacing previous dataset only at the end,
+    so readers listing the folder never see partitions left over from a former run
+    """
+    default_partition = '__HIVE_DEFAULT_PARTITION__'
+    executor = None
+    partition_workers = 4
+    partition_writers = None
+    rows_written = 0
+    settings = None
+    staging_folder = None
+
+    def __init__(self, in_dict):
+        """
+        :param in_dict: same keys as DataStreamWriter, where "name" is the dataset folder,
+            plus "partition columns"
+        """
+        self.settings = in_dict
+        self.partition_writers = {}
+        self.executor = ThreadPoolExecutor(max_workers=self.partition_workers)
+        self.staging_folder = FileOperations.fn_build_staging_file_name(
+            os.path.normpath(in_dict['name']))
+        if os.path.isdir(self.staging_folder):
+            shutil.rmtree(self.staging_folder)
+        os.makedirs(self.staging_folder)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        if exception_type is None:
+            self.fn_close()
+        else:
+            # previous dataset stays untouched when writing fails
+            self.fn_discard()
+
+    def fn_build_partition_file_name(self, in_partition_values):
+        folder_parts = [crt_column + '=' + crt_value for crt_column, crt_value
+                        in zip(self.settings['partition columns'], in_partition_values)]
+        file_extension = '.' + self.settings['format'].lower()
+        if self.settings['format'].lower() == 'csv':
+            compression_extensions = {'bz2': '.bz2', 'gzip': '.gz', 'xz': '.xz', 'zip': '.zip',
+                                      'zstd': '.zst'}
+            file_extension += compression_extensions.get(self.settings.get('compression'), '')
+        return os.path.join(*folder_parts, 'part-00000' + file_extension)
+
+    def fn_discard(self):
+        self.executor.shutdown(wait=True)
+        for crt_writer in self.partition_writers.values():
+            try:
+                crt_writer.fn_close()
+            except Exception:
+                pass
+        shutil.rmtree(self.staging_folder, ignore_errors=True)
+
+    def fn_close(self):
+        self.executor.shutdown(wait=True)
+        manifest_files = []
+        for crt_partition_values, crt_writer in sorted(self.partition_writers.items()):
+            crt_writer.fn_close()
+            manifest_files.append({
+                'File': self.fn_build_partition_file_name(crt_partition_values)
+                    .replace(os.path.sep, '/'),
+                'Partition': dict(zip(self.settings['partition columns'],
+                                      crt_partition_values)),
+                'Rows': crt_writer.rows_written,
+            })
+        with open(os.path.join(self.staging_folder, '_manifest.json'), 'w',
+                  encoding='utf-8') as file_handler:
+            json.dump({
+                'Files': manifest_files,
+                'Partition Columns': self.settings['partition columns'],
+                'Rows': self.rows_written,
+            }, file_handler, indent=4)
+        self.fn_replace_dataset_folder()
+
+    def fn_format_partition_value(self, in_value):
+        if pandas.isnull(in_value):
+            return self.default_partition
+        # whole numbers stored as float (due to NULLs) are named without trailing ".0"
+        if pandas.api.types.is_float(in_value) and float(in_value).is_integer():
+            in_value = int(in_value)
+        return urllib.parse.quote(str(in_value), safe='')
+
+    def fn_replace_dataset_folder(self):
+        dataset_folder = os.path.normpath(self.settings['name'])
+        previous_folder = None
+        if os.path.isdir(dataset_folder):
+            previous_folder = os.path.join(
+                os.path.dirname(dataset_folder),
+                '.' + os.path.basename(dataset_folder) + '.previous-' + str(os.getpid()))
+            os.replace(dataset_folder, previous_folder)
+        os.replace(self.staging_folder, dataset_folder)
+        if previous_folder is not None:
+            shutil.rmtree(previous_folder)
+
+    def fn_write(self, in_data_frame):
+        partition_tasks = []
+        for crt_key, crt_data_frame in in_data_frame.groupby(
+                self.settings['partition columns'], dropna=False, sort=False):
+            if not isinstance(crt_key, tuple):
+                crt_key = (crt_key,)
+            partition_values = tuple([self.fn_format_partition_value(crt) for crt in crt_key])
+            if partition_values not in self.partition_writers:
+                partition_settings = dict(self.settings)
+                partition_settings['name'] = os.path.join(
+                    self.staging_folder, self.fn_build_partition_file_name(partition_values))
+                os.makedirs(os.path.dirname(partition_settings['name']), exist_ok=True)
+                self.partition_writers[partition_values] = DataStreamWriter(partition_settings)
+            # partition column values are already given by folder names
+            partition_tasks.append(self.executor.submit(
+                self.partition_writers[partition_values].fn_write,
+                crt_data_frame.drop(columns=self.settings['partition columns'])))
+        # every partition writer gets at most one task per batch, so they never overlap
+        for crt_task in partition_tasks:
+            crt_task.result()
+        self.rows_written += len(in_data_frame)
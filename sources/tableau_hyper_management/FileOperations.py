@@ -3,8 +3,6 @@ facilitates File Operations
 """
 # package to handle date and times
 from datetime import datetime
-# package to add support for multi-language (i18n)
-import gettext
 # package to get ability to search file recursively
 import glob
 # package to use for checksum calculations (in this file)
@@ -17,6 +15,10 @@ import os
 import pathlib
 # package regular expressions
 import re
+# package to facilitate high-level file operations
+import shutil
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
 
 
 class FileOperations:
@@ -24,13 +26,7 @@ class FileOperations:
     locale = None
 
     def __init__(self, in_language='en_US'):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def fn_build_file_list(self, local_logger, timer, given_input_file):
         timer.start()
@@ -46,6 +42,14 @@ class FileOperations:
         timer.stop()
         return relevant_files_list
 
+    @staticmethod
+    def fn_build_staging_file_name(final_file_name):
+        folder_name, file_name = os.path.split(final_file_name)
+        file_base_name, file_extension = os.path.splitext(file_name)
+        # same folder ensures final rename is atomic, extension is kept for format inference
+        return os.path.join(folder_name, '.' + file_base_name + '.staging-'
+                            + str(os.getpid()) + file_extension)
+
     def fn_build_relevant_file_list(self, local_logger, in_folder, matching_pattern):
         folder_parts = pathlib.Path(matching_pattern).parts
         search_pattern = folder_parts[(len(folder_parts)-1)]
@@ -68,6 +72,48 @@ class FileOperations:
                                .replace('{folder_name}', in_folder))
         return list_files
 
+    @staticmethod
+    def fn_detect_file_compression(file_to_evaluate, given_compression='infer'):
+        """
+        Establishes compression of a file, by extension first and by its leading bytes otherwise
+
+        :param file_to_evaluate: file name
+        :param given_compression: explicit compression (used as such) or "infer"
+        :return: compression name as known by Pandas or None when file is not compressed
+        """
+        if given_compression is None or str(given_compression).lower() == 'none':
+            return None
+        if given_compression != 'infer':
+            return given_compression
+        compression_by_extension = FileOperations.fn_get_compression_by_extension(
+            file_to_evaluate)
+        if compression_by_extension is not None:
+            return compression_by_extension
+        known_signatures = {
+            b'\x1f\x8b': 'gzip',
+            b'BZh': 'bz2',
+            b'\xfd7zXZ\x00': 'xz',
+            b'PK\x03\x04': 'zip',
+            b'\x28\xb5\x2f\xfd': 'zstd',
+        }
+        with open(file_to_evaluate, 'rb') as file_handler:
+            leading_bytes = file_handler.read(6)
+        for crt_signature, crt_compression in known_signatures.items():
+            if leading_bytes.startswith(crt_signature):
+                return crt_compression
+        return None
+
+    @staticmethod
+    def fn_get_compression_by_extension(file_name):
+        known_extensions = {
+            '.bz2': 'bz2',
+            '.gz': 'gzip',
+            '.xz': 'xz',
+            '.zip': 'zip',
+            '.zst': 'zstd',
+        }
+        return known_extensions.get(os.path.splitext(file_name)[1].lower())
+
     def fn_get_file_content(self, in_file_handler, in_file_type):
         if in_file_type == 'json':
             try:
@@ -90,6 +136,15 @@ class FileOperations:
                                       + 'expected either "json" or "raw" but got {in_file_type}')
                   .replace('{in_file_type}', in_file_type))
 
+    @staticmethod
+    def fn_get_file_checksum(file_to_evaluate, algorithm='sha256', block_size=8 * 1024 * 1024):
+        # reading in blocks keeps memory usage flat regardless of file size
+        checksum = hashlib.new(algorithm)
+        with open(file_to_evaluate, 'rb') as file_handler:
+            for file_block in iter(lambda: file_handler.read(block_size), b''):
+                checksum.update(file_block)
+        return checksum.hexdigest()
+
     @staticmethod
     def fn_get_file_dates_raw(file_to_evaluate):
         return {
@@ -205,6 +260,48 @@ class FileOperations:
                   self.locale.gettext('File {file_name} does not exist')
                   .replace('{file_name}', str(input_file)))
 
+    def fn_promote_staging_file(self, local_logger, timer, in_dict):
+        """
+        Makes a fully written staging file visible under its final name in a single atomic step
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "staging file", "final file" and "keep previous"
+        """
+        timer.start()
+        # ensure content is physically on disk before becoming visible to readers
+        with open(in_dict['staging file'], 'rb+') as file_handler:
+            file_handler.flush()
+            os.fsync(file_handler.fileno())
+        if in_dict['keep previous'] and os.path.isfile(in_dict['final file']):
+            previous_file = in_dict['final file'] + '.previous'
+            if os.path.isfile(previous_file):
+                os.remove(previous_file)
+            # a hard link keeps final file in place while retaining previous version
+            try:
+                os.link(in_dict['final file'], previous_file)
+            except OSError:
+                shutil.copy2(in_dict['final file'], previous_file)
+            local_logger.info(self.locale.gettext(
+                'Previous version of file {file_name} has been retained as {previous_file_name}')
+                              .replace('{file_name}', in_dict['final file'])
+                              .replace('{previous_file_name}', previous_file))
+        os.replace(in_dict['staging file'], in_dict['final file'])
+        # persisting the rename itself is only possible on POSIX file systems
+        if hasattr(os, 'O_DIRECTORY'):
+            folder_handler = os.open(os.path.dirname(os.path.abspath(in_dict['final file'])),
+                                     os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(folder_handler)
+            finally:
+                os.close(folder_handler)
+        local_logger.info(self.locale.gettext(
+            'Staging file {staging_file_name} has been promoted as {file_name}')
+                          .replace('{staging_file_name}', in_dict['staging file'])
+                          .replace('{file_name}', in_dict['final file']))
+        timer.stop()
+
     def fn_store_file_statistics(self, local_logger, timer, file_name, file_meaning):
         timer.start()
         list_file_names = [file_name]
@@ -0,0 +1,31 @@
+"""
+LocaleNeeds - shared localization catalogs
+
+Every class gets its messages from a catalog (domain) named after its own file,
+loaded once per domain and language and shared by all instances afterwards
+"""
+# package to add support for multi-language (i18n)
+import gettext
+# package to handle files/folders and related metadata/operations
+import os
+
+
+class LocaleNeeds:
+    translations = {}
+
+    @staticmethod
+    def fn_get_translation(in_class_file, in_language):
+        """
+        :param in_class_file: file of the class needing localized messages (__file__)
+        :param in_language: language to use (like ro_RO), English being the fallback
+        :return: gettext translation for the domain named after given file
+        """
+        locale_domain = os.path.splitext(os.path.basename(in_class_file))[0]
+        translation_key = (locale_domain, in_language)
+        if translation_key not in LocaleNeeds.translations:
+            locale_folder = os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(in_class_file))),
+                'project_locale', locale_domain)
+            LocaleNeeds.translations[translation_key] = gettext.translation(
+                locale_domain, localedir=locale_folder, languages=[in_language], fallback=True)
+        return LocaleNeeds.translations[translation_key]
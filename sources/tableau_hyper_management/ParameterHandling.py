@@ -7,14 +7,12 @@ Facilitates handling parameters values
 from datetime import datetime, timedelta
 # package to allow year and/or month operations based on a reference date
 import datedelta
-# package to add support for multi-language (i18n)
-import gettext
 # package to perform mathematical operations
 import math
-# package to handle files/folders and related metadata/operations
-import os
 # package regular expressions
 import re
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
 
 
 class ParameterHandling:
@@ -49,13 +47,7 @@ class ParameterHandling:
     locale = None
 
     def __init__(self, in_language='en_US'):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def build_parameters(self, local_logger, query_session_parameters, in_parameter_rules
                          , in_start_iso_weekday):
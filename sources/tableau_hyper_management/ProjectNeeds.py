@@ -3,61 +3,172 @@ Class Converter Specific Needs
 
 Handling specific needs for Extractor script
 """
+# package to run logic when interpreter exits (whatever the reason)
+import atexit
 # useful methods to measure time performance by small pieces of code
 from codetiming import Timer
-# package to add support for multi-language (i18n)
-import gettext
 # package to facilitate operating system operations
 import os
+# package to import helper modules only when needed
+import importlib
+import importlib.util
 # package to facilitate common operations
-from .BasicNeeds import BasicNeeds
-from .CommandLineArgumentsManagement import CommandLineArgumentsManagement
-from .DataInputOutput import DataInputOutput
-from .FileOperations import FileOperations
-from .ParameterHandling import ParameterHandling
+from .LocaleNeeds import LocaleNeeds
 from .LoggingNeeds import LoggingNeeds
+from .RunMetrics import RunMetrics
+from .StageProfiler import StageProfiler
 
 
 class ProjectNeeds:
-    class_bn = None
-    class_clam = None
-    class_dio = None
-    class_fo = None
-    class_ph = None
+    class_ln = None
+    class_rm = None
     config = None
+    # helpers are built on first use, so a script never pays for modules it does not need
+    # (like Pandas for publishing, or Tableau Server Client for conversion)
+    helper_classes = {
+        'class_bn': ('.BasicNeeds', 'BasicNeeds'),
+        'class_clam': ('.CommandLineArgumentsManagement', 'CommandLineArgumentsManagement'),
+        'class_dio': ('.DataInputOutput', 'DataInputOutput'),
+        'class_fo': ('.FileOperations', 'FileOperations'),
+        'class_ph': ('.ParameterHandling', 'ParameterHandling'),
+    }
+    language = None
     locale = None
     parameters = None
+    run_metrics_stored = False
     script = None
     timer = None
 
     def __init__(self, destination_script, default_language='en_US'):
         self.script = destination_script
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[default_language], fallback=True)
-        # instantiate Basic Needs class
-        self.class_bn = BasicNeeds(default_language)
-        # instantiate File Operations class
-        self.class_fo = FileOperations(default_language)
-        # instantiate Command Line Arguments class
-        self.class_clam = CommandLineArgumentsManagement(default_language)
-        # instantiate Data Manipulator class, useful to manipulate data frames
-        self.class_dio = DataInputOutput(default_language)
+        self.language = default_language
+        self.locale = LocaleNeeds.fn_get_translation(__file__, default_language)
         # instantiate Logger class
         self.class_ln = LoggingNeeds()
-        # instantiate Parameter Handling class
-        self.class_ph = ParameterHandling(default_language)
+
+    def __getattr__(self, attribute_name):
+        # only called when attribute is not there yet
+        if attribute_name not in self.helper_classes:
+            raise AttributeError(attribute_name)
+        module_name, class_name = self.helper_classes[attribute_name]
+        helper_class = getattr(importlib.import_module(module_name, __package__), class_name)
+        setattr(self, attribute_name, helper_class(self.language))
+        return self.__dict__[attribute_name]
 
     def fn_check_inputs_specific(self, input_parameters):
-        if self.script == 'publisher':
+        if self.script == 'converter':
+            if input_parameters.policy_to_handle_hyper_file == 'upsert' \
+                    and len(self.fn_split_column_list(input_parameters.upsert_key_columns)) == 0:
+                self.class_bn.fn_timestamped_print(self.locale.gettext(
+                    'Policy "upsert" requires at least one key column to be provided'))
+                exit(1)
+            if input_parameters.profile not in ('None', 'cprofile', 'sampling'):
+                self.class_bn.fn_timestamped_print(self.locale.gettext(
+                    'Profile "{profile}" is not among known ones: "cprofile", "sampling"')
+                                                   .replace('{profile}', input_parameters.profile))
+                exit(1)
+            self.fn_check_zstandard_availability(input_parameters)
+            if input_parameters.rollups_file != 'None':
+                self.fn_check_rollups(input_parameters.rollups_file)
+            for crt_pair in self.fn_split_column_list(input_parameters.input_column_renames):
+                if '=' not in crt_pair:
+                    self.class_bn.fn_timestamped_print(self.locale.gettext(
+                        'Column rename "{column_rename}" is not in the form '
+                        + '"Original Name=New Name"')
+                                                       .replace('{column_rename}', crt_pair))
+                    exit(1)
+        if self.script in ('converter', 'maintainer') and input_parameters.output_file_write_mode \
+                not in ('direct', 'staged', 'staged-keep-previous'):
+            self.class_bn.fn_timestamped_print(self.locale.gettext(
+                'Output file write mode "{write_mode}" is not among known ones: '
+                + '"direct", "staged", "staged-keep-previous"')
+                                               .replace('{write_mode}',
+                                                        input_parameters.output_file_write_mode))
+            exit(1)
+        if self.script in ('bulk-publisher', 'publisher'):
             self.class_bn.fn_validate_single_value(
                     input_parameters.input_credentials_file, 'file')
             self.class_bn.fn_validate_single_value(
                     input_parameters.tableau_server, 'url')
+            self.fn_check_upload_options(input_parameters)
+
+    def fn_check_rollups(self, in_rollups_file):
+        rollups_content = self.class_fo.fn_open_file_and_get_content(in_rollups_file, 'json')
+        if not isinstance(rollups_content, dict) or 'Rollups' not in rollups_content:
+            self.class_bn.fn_timestamped_print(self.locale.gettext(
+                'Rollups file "{file_name}" has to contain a "Rollups" list')
+                                               .replace('{file_name}', in_rollups_file))
+            exit(1)
+        # Hyper logic is needed anyway by a conversion having rollups
+        from .TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+        rollups_errors = TableauHyperApiExtraLogic(self.language).fn_validate_rollups(
+            rollups_content['Rollups'])
+        for crt_error in rollups_errors:
+            self.class_bn.fn_timestamped_print(crt_error)
+        if len(rollups_errors) != 0:
+            exit(1)
+
+    def fn_check_upload_options(self, input_parameters):
+        # single data source publisher uses 0 for a single (non chunked) request
+        minimum_chunk_size = 0 if self.script == 'publisher' else None
+        try:
+            chunk_size = float(input_parameters.upload_chunk_size)
+            chunk_size_is_valid = chunk_size > 0 or chunk_size == minimum_chunk_size
+        except ValueError:
+            chunk_size_is_valid = False
+        if not chunk_size_is_valid:
+            self.class_bn.fn_timestamped_print(self.locale.gettext(
+                'Upload chunk size "{chunk_size}" has to be a positive number of MB')
+                                               .replace('{chunk_size}',
+                                                        input_parameters.upload_chunk_size))
+            exit(1)
+        timeout_values = input_parameters.upload_timeout.split(',')
+        try:
+            timeouts_are_valid = len(timeout_values) in (1, 2) \
+                and min([float(crt) for crt in timeout_values]) > 0
+        except ValueError:
+            timeouts_are_valid = False
+        if not timeouts_are_valid:
+            self.class_bn.fn_timestamped_print(self.locale.gettext(
+                'Upload timeout "{upload_timeout}" has to be given as positive seconds '
+                + 'in the form "connect,read"')
+                                               .replace('{upload_timeout}',
+                                                        input_parameters.upload_timeout))
+            exit(1)
+
+    def fn_check_zstandard_availability(self, input_parameters):
+        compressions = [input_parameters.input_file_compression,
+                        input_parameters.output_file_compression]
+        for crt_compression, crt_file in ((input_parameters.input_file_compression,
+                                           input_parameters.input_file),
+                                          (input_parameters.output_file_compression,
+                                           input_parameters.output_file)):
+            if crt_compression == 'infer':
+                compressions.append(self.class_fo.fn_get_compression_by_extension(crt_file))
+        # Zstandard is an optional dependency (pip install tableau-hyper-management[zstd])
+        if 'zstd' in compressions and importlib.util.find_spec('zstandard') is None:
+            self.class_bn.fn_timestamped_print(self.locale.gettext(
+                'Compression "zstd" requires "zstandard" package to be installed'))
+            exit(1)
+
+    @staticmethod
+    def fn_split_column_map(in_column_map_string):
+        column_map = {}
+        for crt_pair in ProjectNeeds.fn_split_column_list(in_column_map_string):
+            old_name, new_name = crt_pair.split('=', 1)
+            column_map[old_name.strip()] = new_name.strip()
+        return column_map
+
+    def fn_get_generated_file_name(self):
+        # partitioned output is a folder, described by its manifest
+        if self.script == 'converter' \
+                and len(self.fn_split_column_list(self.parameters.output_partition_columns)) != 0:
+            return os.path.join(self.parameters.output_file, '_manifest.json')
+        return self.parameters.output_file
+
+    @staticmethod
+    def fn_split_column_list(in_column_list_string):
+        return [crt.strip() for crt in in_column_list_string.split(',') if crt.strip() != '']
 
     def initiate_logger_and_timer(self):
         # initiate logger
@@ -67,6 +178,51 @@ class ProjectNeeds:
         self.timer = Timer(self.script,
                            text=self.locale.gettext('Time spent is {seconds}'),
                            logger=self.class_ln.logger.debug)
+        # named timers for every stage, feeding run report
+        self.class_rm = RunMetrics(self.script)
+        if self.script == 'converter' and self.parameters.profile != 'None':
+            self.class_rm.profiler = StageProfiler({
+                'file prefix': self.fn_get_profile_file_prefix(),
+                'mode': self.parameters.profile,
+            })
+        # any exit not passing through fn_store_run_metrics (exit(1), unhandled exception)
+        # still has to leave a run report, flagged as failure
+        atexit.register(self.fn_store_run_metrics_on_exit)
+
+    def fn_get_profile_file_prefix(self):
+        # profiles are stored next to the log file, or in current folder when not logging
+        if self.parameters.output_log_file == 'None':
+            return os.path.join(os.getcwd(), self.script)
+        return os.path.splitext(self.parameters.output_log_file)[0]
+
+    def fn_store_run_metrics(self, in_status='success'):
+        self.run_metrics_stored = True
+        self.class_rm.fn_stop_running_stages()
+        report = self.class_rm.fn_store_reports({
+            'prometheus textfile': self.parameters.prometheus_textfile,
+            'run report file': self.parameters.run_report_file,
+            'status': in_status,
+        })
+        for crt_stage, crt_figures in report['Stages'].items():
+            self.class_ln.logger.info(self.locale.gettext(
+                'Stage "{stage_name}" took {seconds} seconds for {rows} rows and {bytes} bytes')
+                                      .replace('{stage_name}', crt_stage)
+                                      .replace('{seconds}', str(crt_figures['seconds']))
+                                      .replace('{rows}', str(crt_figures['rows']))
+                                      .replace('{bytes}', str(crt_figures['bytes'])))
+        if self.class_rm.profiler is not None:
+            summary_file = self.class_rm.profiler.fn_store_profiles()
+            self.class_ln.logger.info(self.locale.gettext(
+                'Profiling summary has been stored into "{file_name}"')
+                                      .replace('{file_name}', summary_file))
+        return report
+
+    def fn_store_run_metrics_on_exit(self):
+        if self.run_metrics_stored:
+            return
+        self.class_ln.logger.error(self.locale.gettext(
+            'Run has stopped before its end, run metrics are stored with failure status'))
+        self.fn_store_run_metrics('failure')
 
     def load_configuration(self):
         # load application configuration (inputs are defined into a json file)
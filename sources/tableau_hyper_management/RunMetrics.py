@@ -0,0 +1,216 @@
+"""
+RunMetrics - per-stage performance metrics of a script run
+
+Every stage (load, structure detection, rebuild, insert, publish, statistics etc.)
+gets its own named timer, rows and bytes processed and process peak memory so far
+(a high-water mark for whole process, not memory used by that stage alone),
+all being exposed as a JSON run report and/or as Prometheus textfile metrics
+"""
+# package to handle date and time
+from datetime import datetime
+# package to handle JSON report
+import json
+# package to handle files/folders and related metadata/operations
+import os
+# package to interact with the interpreter
+import sys
+# useful methods to measure time performance by small pieces of code
+from codetiming import Timer
+# package to measure peak resident memory (not available on Windows)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class RunMetrics:
+    profiler = None
+    prometheus_prefix = 'tableau_hyper_management'
+    running_stages = None
+    script = None
+    stages = None
+    started = None
+    timers = None
+
+    def __init__(self, in_script):
+        self.script = in_script
+        self.running_stages = []
+        self.stages = {}
+        self.started = datetime.now()
+        self.timers = {}
+
+    @staticmethod
+    def fn_get_peak_memory():
+        """
+        :return: highest resident memory of current process so far, in bytes (None if unknown)
+        """
+        if resource is not None:
+            # Linux reports kilobytes, macOS bytes
+            multiplier = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * multiplier
+        if sys.platform == 'win32':
+            return RunMetrics.fn_get_peak_memory_windows()
+        return None
+
+    @staticmethod
+    def fn_get_peak_memory_windows():
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(ProcessMemoryCounters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+        return None
+
+    @staticmethod
+    def fn_get_files_size(in_file_list):
+        """
+        :param in_file_list: list of files or folders (like partitioned datasets)
+        :return: total size in bytes
+        """
+        total_size = 0
+        for crt_path in in_file_list:
+            if os.path.isdir(crt_path):
+                for crt_folder, _, crt_files in os.walk(crt_path):
+                    total_size += sum([os.path.getsize(os.path.join(crt_folder, crt_file))
+                                       for crt_file in crt_files])
+            elif os.path.isfile(crt_path):
+                total_size += os.path.getsize(crt_path)
+        return total_size
+
+    def fn_start_stage(self, in_stage):
+        if in_stage not in self.timers:
+            self.timers[in_stage] = Timer(name=self.script + ' ' + in_stage, logger=None)
+        if self.profiler is not None:
+            self.profiler.fn_start(in_stage)
+        self.timers[in_stage].start()
+        self.running_stages.append(in_stage)
+
+    def fn_stop_stage(self, in_stage, in_rows=None, in_bytes=None):
+        """
+        Stops the timer of given stage, accumulating figures when stage runs several times
+
+        :param in_stage: stage name
+        :param in_rows: rows processed by this stage run (if relevant)
+        :param in_bytes: bytes processed by this stage run (if relevant)
+        :return: seconds spent by this stage run
+        """
+        seconds = self.timers[in_stage].stop()
+        self.running_stages.remove(in_stage)
+        if self.profiler is not None:
+            self.profiler.fn_stop(in_stage)
+        stage = self.stages.setdefault(in_stage, {
+            'bytes': None,
+            'process peak memory so far [bytes]': None,
+            'rows': None,
+            'runs': 0,
+            'seconds': 0,
+        })
+        stage['runs'] += 1
+        stage['seconds'] += seconds
+        if in_rows is not None:
+            stage['rows'] = (stage['rows'] or 0) + int(in_rows)
+        if in_bytes is not None:
+            stage['bytes'] = (stage['bytes'] or 0) + int(in_bytes)
+        # ru_maxrss (and PeakWorkingSetSize) never decrease, so a stage only shows
+        # whether it raised the high-water mark reached by earlier stages
+        stage['process peak memory so far [bytes]'] = self.fn_get_peak_memory()
+        return seconds
+
+    def fn_stop_running_stages(self):
+        # a run interrupted by an error still reports time spent by the stage that failed
+        for crt_stage in list(reversed(self.running_stages)):
+            self.fn_stop_stage(crt_stage)
+
+    def fn_build_report(self, in_status='success'):
+        stages = {}
+        for crt_stage, crt_figures in self.stages.items():
+            stages[crt_stage] = dict(crt_figures)
+            stages[crt_stage]['seconds'] = round(crt_figures['seconds'], 6)
+            stages[crt_stage]['rows per second'] = None
+            if crt_figures['rows'] is not None and crt_figures['seconds'] != 0:
+                stages[crt_stage]['rows per second'] = \
+                    round(crt_figures['rows'] / crt_figures['seconds'])
+        finished = datetime.now()
+        return {
+            'Finished': finished.isoformat(timespec='seconds'),
+            'Peak Memory [bytes]': self.fn_get_peak_memory(),
+            'Script': self.script,
+            'Seconds': round((finished - self.started).total_seconds(), 6),
+            'Stages': stages,
+            'Started': self.started.isoformat(timespec='seconds'),
+            'Status': in_status,
+        }
+
+    def fn_build_prometheus_lines(self, in_report):
+        prefix = self.prometheus_prefix
+        lines = []
+        stage_metrics = {
+            'bytes': ('stage_bytes', 'Bytes processed by stage'),
+            'process peak memory so far [bytes]': (
+                'stage_end_process_peak_memory_bytes',
+                'Process peak memory (high-water mark) reached by stage end'),
+            'rows': ('stage_rows', 'Rows processed by stage'),
+            'seconds': ('stage_duration_seconds', 'Time spent by stage'),
+        }
+        for crt_key, (crt_metric, crt_help) in stage_metrics.items():
+            lines.append('# HELP ' + prefix + '_' + crt_metric + ' ' + crt_help)
+            lines.append('# TYPE ' + prefix + '_' + crt_metric + ' gauge')
+            for crt_stage, crt_figures in in_report['Stages'].items():
+                if crt_figures[crt_key] is not None:
+                    lines.append(prefix + '_' + crt_metric + '{script="' + self.script
+                                 + '",stage="' + crt_stage + '"} ' + str(crt_figures[crt_key]))
+        run_metrics = {
+            'run_duration_seconds': ('Time spent by whole run', in_report['Seconds']),
+            'run_peak_memory_bytes': ('Process peak memory', in_report['Peak Memory [bytes]']),
+            'run_success': ('1 when run finished successfully',
+                            int(in_report['Status'] == 'success')),
+            'run_finished_timestamp_seconds': ('Unix time when run finished',
+                                               round(datetime.now().timestamp())),
+        }
+        for crt_metric, (crt_help, crt_value) in run_metrics.items():
+            if crt_value is not None:
+                lines.append('# HELP ' + prefix + '_' + crt_metric + ' ' + crt_help)
+                lines.append('# TYPE ' + prefix + '_' + crt_metric + ' gauge')
+                lines.append(prefix + '_' + crt_metric + '{script="' + self.script + '"} '
+                             + str(crt_value))
+        return lines
+
+    def fn_store_reports(self, in_dict):
+        """
+        :param in_dict: dictionary containing following keys with relevant values:
+            "run report file" and "prometheus textfile" (either can be "None" to skip),
+            "status" (success|failure)
+        :return: run report
+        """
+        report = self.fn_build_report(in_dict.get('status', 'success'))
+        if in_dict.get('run report file', 'None') != 'None':
+            self.fn_write_file_atomically(in_dict['run report file'],
+                                          json.dumps(report, indent=4))
+        if in_dict.get('prometheus textfile', 'None') != 'None':
+            self.fn_write_file_atomically(in_dict['prometheus textfile'],
+                                          '\n'.join(self.fn_build_prometheus_lines(report)) + '\n')
+        return report
+
+    @staticmethod
+    def fn_write_file_atomically(in_file_name, in_content):
+        # textfile collectors (and dashboards) should never read a half-written file
+        staging_file_name = in_file_name + '.' + str(os.getpid()) + '.tmp'
+        with open(staging_file_name, 'w', encoding='utf-8') as file_handle:
+            file_handle.write(in_content)
+        os.replace(staging_file_name, in_file_name)
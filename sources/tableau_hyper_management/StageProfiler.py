@@ -0,0 +1,100 @@
+"""
+StageProfiler - optional profiling of script stages
+
+Every stage gets its own profile (cProfile or, when installed, pyinstrument sampling profiler)
+dumped next to the log file, plus a summary of top hotspots;
+chosen stages also get tracemalloc allocation snapshots
+"""
+# package to profile deterministically
+import cProfile
+# package to capture text output
+import io
+# package to summarize profiles
+import pstats
+# package to trace memory allocations
+import tracemalloc
+# sampling profiler is optional
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+class StageProfiler:
+    file_prefix = None
+    memory_stages = ('insert', 'rebuild')
+    mode = None
+    profiles = None
+    snapshots = None
+    top_rows = 25
+
+    def __init__(self, in_dict):
+        """
+        :param in_dict: dictionary containing following keys with relevant values:
+            "mode" (cprofile|sampling) and "file prefix" (folder and base name of dumps)
+        """
+        self.file_prefix = in_dict['file prefix']
+        self.mode = in_dict['mode'].lower()
+        # sampling profiler is used only when installed, deterministic one otherwise
+        if self.mode == 'sampling' and pyinstrument is None:
+            self.mode = 'cprofile'
+        self.profiles = {}
+        self.snapshots = {}
+
+    def fn_build_file_name(self, in_stage, in_extension):
+        return self.file_prefix + '.' + in_stage.replace(' ', '-') + in_extension
+
+    def fn_start(self, in_stage):
+        if in_stage in self.memory_stages:
+            tracemalloc.start(10)
+        if self.mode == 'sampling':
+            self.profiles.setdefault(in_stage, []).append(pyinstrument.Profiler())
+            self.profiles[in_stage][-1].start()
+        else:
+            self.profiles.setdefault(in_stage, cProfile.Profile()).enable()
+
+    def fn_stop(self, in_stage):
+        if self.mode == 'sampling':
+            self.profiles[in_stage][-1].stop()
+        else:
+            self.profiles[in_stage].disable()
+        if in_stage in self.memory_stages and tracemalloc.is_tracing():
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            self.snapshots.setdefault(in_stage, []).append(
+                (tracemalloc.take_snapshot(), peak_memory))
+            tracemalloc.stop()
+
+    def fn_store_profiles(self):
+        """
+        Dumps every stage profile and allocation snapshot, then writes the hotspot summary
+
+        :return: name of the summary file
+        """
+        summary = []
+        for crt_stage, crt_profile in self.profiles.items():
+            summary.append('=' * 20 + ' ' + crt_stage + ' ' + '=' * 20)
+            if self.mode == 'sampling':
+                profile_file = self.fn_build_file_name(crt_stage, '.txt')
+                stage_text = '\n'.join([crt_run.output_text(unicode=False, color=False)
+                                        for crt_run in crt_profile])
+                with open(profile_file, 'w', encoding='utf-8') as file_handle:
+                    file_handle.write(stage_text)
+                summary.append(stage_text)
+            else:
+                profile_file = self.fn_build_file_name(crt_stage, '.prof')
+                crt_profile.dump_stats(profile_file)
+                summary_stream = io.StringIO()
+                pstats.Stats(crt_profile, stream=summary_stream).sort_stats('cumulative') \
+                    .print_stats(self.top_rows)
+                summary.append(summary_stream.getvalue())
+            for run_index, (crt_snapshot, crt_peak) in enumerate(self.snapshots.get(crt_stage, [])):
+                crt_snapshot.dump(self.fn_build_file_name(
+                    crt_stage, '.' + str(run_index + 1) + '.tracemalloc'))
+                summary.append('Peak traced memory [bytes]: ' + str(crt_peak))
+                summary.append('Top allocations by line:')
+                summary.extend(['    ' + str(crt_statistic) for crt_statistic
+                                in crt_snapshot.statistics('lineno')[:self.top_rows]])
+        summary_file = self.file_prefix + '.profile-summary.txt'
+        with open(summary_file, 'w', encoding='utf-8') as file_handle:
+            file_handle.write('\n'.join(summary) + '\n')
+        return summary_file
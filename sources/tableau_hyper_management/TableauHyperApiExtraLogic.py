@@ -3,36 +3,46 @@ TableauHyperApiExtraLogic - a Hyper client library.
 
 This library allows packaging CSV content into HYPER format with data type checks
 """
-# package to add support for multi-language (i18n)
-import gettext
 # package to handle files/folders and related metadata/operations
 import os
 # package regular expression
 import re
+# package to measure elapsed time
+import time
 # package to handle numerical structures
 import numpy
 # package to handle Data Frames (in this file)
 import pandas as pd
 # Custom classes from Tableau Hyper package
 from tableauhyperapi import HyperProcess, Telemetry, Connection, CreateMode, \
-    NOT_NULLABLE, NULLABLE, SqlType, TableDefinition, TableName, Inserter, HyperException
+    NOT_NULLABLE, NULLABLE, SqlType, TableDefinition, TableName, Inserter, HyperException, \
+    Persistence, SchemaName, TypeTag, escape_name, escape_string_literal
+# package to facilitate common operations
+from .DataStreamWriter import DataStreamWriter
+from .FileOperations import FileOperations
+from .LocaleNeeds import LocaleNeeds
 
 
 class TableauHyperApiExtraLogic:
+    class_fo = None
     locale = None
-    supported_input_file_types = ('csv', 'json', 'parquet', 'pickle')
-    supported_output_file_types = ('csv', 'parquet', 'pickle')
+    supported_input_file_types = ('csv', 'feather', 'json', 'jsonl', 'parquet', 'pickle')
+    supported_output_file_types = ('csv', 'feather', 'parquet', 'pickle')
+    rollup_aggregates = {
+        'count': 'COUNT({column})',
+        'max': 'MAX({column})',
+        'mean': 'AVG({column})',
+        'min': 'MIN({column})',
+        'nunique': 'COUNT(DISTINCT {column})',
+        'sum': 'SUM({column})',
+    }
     columns_for_hyper_conversion = {}
     hyper_conversion_dtypes = ['str', 'int64', 'float']
+    row_counts_table = TableName('Extract Metadata', 'Row Counts')
 
     def __init__(self, in_language):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep) \
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts) - 1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
+        self.class_fo = FileOperations(in_language)
 
     def fn_build_hyper_columns(self, logger, timer, in_data_frame_structure):
         timer.start()
@@ -59,6 +69,147 @@ class TableauHyperApiExtraLogic:
         timer.stop()
         return list_to_return
 
+    def fn_compact_hyper_file(self, in_logger, timer, in_dict):
+        """
+        Rewrites an existing Hyper file into a fresh one, copying every schema and table
+        with INSERT ... SELECT, so space left behind by appends and deletes is reclaimed
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "hyper file", "sort key columns" and "write mode"
+        :return: dictionary with size before and after, tables rewritten and seconds spent
+        """
+        timer.start()
+        start_time = time.perf_counter()
+        size_before = os.path.getsize(in_dict['hyper file'])
+        compacted_file = self.class_fo.fn_build_staging_file_name(in_dict['hyper file'])
+        statements = []
+        try:
+            telemetry_chosen = Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU
+            with HyperProcess(telemetry=telemetry_chosen) as hyper_process:
+                # both files are attached, so every name is qualified by its database alias
+                with Connection(endpoint=hyper_process.endpoint) as hyper_connection:
+                    hyper_connection.catalog.create_database(compacted_file)
+                    hyper_connection.catalog.attach_database(compacted_file, alias='Compacted')
+                    hyper_connection.catalog.attach_database(in_dict['hyper file'],
+                                                             alias='Original')
+                    # structure first, as DDL and DML cannot be mixed within a transaction
+                    for crt_schema in hyper_connection.catalog.get_schema_names('Original'):
+                        hyper_connection.catalog.create_schema_if_not_exists(
+                            SchemaName('Compacted', crt_schema.name))
+                        for crt_table in hyper_connection.catalog.get_table_names(crt_schema):
+                            source_table = hyper_connection.catalog.get_table_definition(
+                                crt_table)
+                            target_table = TableName('Compacted', crt_schema.name, crt_table.name)
+                            hyper_connection.catalog.create_table(TableDefinition(
+                                target_table, columns=source_table.columns))
+                            column_names = [crt_column.name.unescaped
+                                            for crt_column in source_table.columns]
+                            sort_key_columns = []
+                            missing_columns = [crt_column for crt_column
+                                               in in_dict['sort key columns']
+                                               if crt_column not in column_names]
+                            if len(missing_columns) == 0:
+                                sort_key_columns = in_dict['sort key columns']
+                            elif crt_table.name.unescaped != self.row_counts_table.name.unescaped:
+                                in_logger.warning(self.locale.gettext(
+                                    'Table {hyper_table_name} will be compacted without sorting, '
+                                    + 'as it lacks sort key columns "{missing_columns}"')
+                                                  .replace('{hyper_table_name}', str(crt_table))
+                                                  .replace('{missing_columns}',
+                                                           '", "'.join(missing_columns)))
+                            statements.append(
+                                'INSERT INTO ' + str(target_table) + ' SELECT * FROM '
+                                + str(crt_table) + self.fn_build_order_by_clause(sort_key_columns))
+                    timer.stop()
+                    self.fn_execute_statements_in_hyper(in_logger, timer, {
+                        'connection': hyper_connection,
+                        'statements': statements,
+                    })
+                    timer.start()
+                    hyper_connection.catalog.detach_all_databases()
+        except HyperException as ex:
+            in_logger.error(str(ex).replace(chr(10), ' '))
+            timer.stop()
+            if os.path.isfile(compacted_file):
+                os.remove(compacted_file)
+            exit(1)
+        timer.stop()
+        self.class_fo.fn_promote_staging_file(in_logger, timer, {
+            'final file': in_dict['hyper file'],
+            'keep previous': (in_dict['write mode'] == 'staged-keep-previous'),
+            'staging file': compacted_file,
+        })
+        compaction_details = {
+            'seconds': round(time.perf_counter() - start_time, 3),
+            'size after [bytes]': os.path.getsize(in_dict['hyper file']),
+            'size before [bytes]': size_before,
+            'tables rewritten': len(statements),
+        }
+        in_logger.info(self.locale.gettext(
+            'Hyper file {file_name} has been compacted from {size_before} to {size_after} bytes '
+            + '({tables_rewritten} tables rewritten in {seconds} seconds)')
+                       .replace('{file_name}', in_dict['hyper file'])
+                       .replace('{size_before}', str(size_before))
+                       .replace('{size_after}', str(compaction_details['size after [bytes]']))
+                       .replace('{tables_rewritten}', str(len(statements)))
+                       .replace('{seconds}', str(compaction_details['seconds'])))
+        return compaction_details
+
+    @staticmethod
+    def fn_build_content_checksum_query(in_table_name, in_table_definition):
+        # every value is length-prefixed (NULL having its own marker), so row text is unambiguous
+        row_text = " || '|' || ".join([
+            "COALESCE(CAST(CHAR_LENGTH(CAST({column} AS TEXT)) AS TEXT) || ':' || "
+            "CAST({column} AS TEXT), '-')".replace('{column}', str(crt_column.name))
+            for crt_column in in_table_definition.columns])
+        # first 15 hexadecimal digits of every row hash summed up, so row order is irrelevant
+        row_hash_value = ' + '.join([
+            "(STRPOS('0123456789abcdef', SUBSTR(row_hash, " + str(crt_position + 1)
+            + ', 1)) - 1) * CAST(' + str(16 ** (14 - crt_position)) + ' AS BIGINT)'
+            for crt_position in range(15)])
+        return 'SELECT COUNT(*), COALESCE(SUM(CAST(' + row_hash_value + ' AS NUMERIC(38,0))), 0) ' \
+            + 'FROM (SELECT MD5(' + (row_text or "''") + ') AS row_hash FROM ' \
+            + str(in_table_name) + ') AS row_hashes'
+
+    def fn_build_hyper_file_fingerprint(self, in_logger, timer, in_dict):
+        """
+        Describes Hyper file content independently of its physical layout,
+        so identical content built twice gets identical fingerprint
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "hyper file"
+        :return: dictionary having, for every table, rows count, columns (name and type)
+            and a row order independent content checksum
+        """
+        timer.start()
+        fingerprint = {}
+        telemetry_chosen = Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU
+        with HyperProcess(telemetry=telemetry_chosen) as hyper_process:
+            with Connection(endpoint=hyper_process.endpoint, database=in_dict['hyper file'],
+                            create_mode=CreateMode.NONE) as hyper_connection:
+                for crt_schema in hyper_connection.catalog.get_schema_names():
+                    for crt_table in hyper_connection.catalog.get_table_names(crt_schema):
+                        table_definition = hyper_connection.catalog.get_table_definition(
+                            crt_table)
+                        rows_count, content_checksum = hyper_connection.execute_list_query(
+                            self.fn_build_content_checksum_query(crt_table, table_definition))[0]
+                        fingerprint[str(crt_table)] = {
+                            'columns': [[crt_column.name.unescaped, str(crt_column.type)]
+                                        for crt_column in table_definition.columns],
+                            'content checksum': str(content_checksum),
+                            'rows': rows_count,
+                        }
+        in_logger.debug(self.locale.gettext(
+            'Fingerprint of Hyper file {file_name} has been determined for {tables_counted} tables')
+                        .replace('{file_name}', in_dict['hyper file'])
+                        .replace('{tables_counted}', str(len(fingerprint))))
+        timer.stop()
+        return fingerprint
+
     def fn_convert_multiple_columns(self, in_logger, timer, in_data_frame, in_target_dtype):
         # if there's a list of columns to be converted to Integer do that
         if in_target_dtype in self.columns_for_hyper_conversion:
@@ -99,16 +250,220 @@ class TableauHyperApiExtraLogic:
             identified_type = SqlType.text()
         return identified_type
 
-    def fn_delete_data_from_hyper(self, in_logger, timer, in_dict):
+    def fn_build_rollup_query(self, in_dict, in_source_table):
+        """
+        Builds the aggregation query of a rollup, naming measures as the Pandas group-by would
+        (<column>_<aggregate>) unless a different name is given through "map"
+
+        :param in_dict: rollup definition with following keys:
+            "group_by" (list of columns), "calculations" (column to list of aggregates)
+            and optionally "map" (resulting column to final name)
+        :param in_source_table: TableName of the detail table
+        :return: SQL query
+        """
+        rename_map = in_dict.get('map', {})
+        select_list = [escape_name(crt_column) for crt_column in in_dict['group_by']]
+        for crt_column, crt_aggregates in in_dict['calculations'].items():
+            for crt_aggregate in crt_aggregates:
+                if crt_aggregate not in self.rollup_aggregates:
+                    raise ValueError(self.locale.gettext(
+                        'Aggregate "{aggregate}" is not among supported ones: "{aggregates}"')
+                                     .replace('{aggregate}', crt_aggregate)
+                                     .replace('{aggregates}',
+                                              '", "'.join(self.rollup_aggregates.keys())))
+                result_name = crt_column + '_' + crt_aggregate
+                select_list.append(self.rollup_aggregates[crt_aggregate]
+                                   .replace('{column}', escape_name(crt_column))
+                                   + ' AS ' + escape_name(rename_map.get(result_name,
+                                                                         result_name)))
+        group_by_clause = ''
+        if len(in_dict['group_by']) != 0:
+            group_by_clause = ' GROUP BY ' + ', '.join(
+                [escape_name(crt_column) for crt_column in in_dict['group_by']])
+        return 'SELECT ' + ', '.join(select_list) + ' FROM ' + str(in_source_table) \
+               + group_by_clause
+
+    def fn_validate_rollups(self, in_rollups):
+        """
+        Checks rollup definitions upfront, so a wrong one never interrupts a write half-way
+
+        :param in_rollups: list of rollup definitions (see fn_build_rollup_query)
+        :return: list of error messages (empty when all definitions are valid)
+        """
+        if not isinstance(in_rollups, list):
+            return [self.locale.gettext('Rollups are expected as a list of definitions')]
+        errors = []
+        for crt_index, crt_rollup in enumerate(in_rollups):
+            rollup_label = str(crt_index + 1)
+            if not isinstance(crt_rollup, dict) \
+                    or not isinstance(crt_rollup.get('table_name'), str) \
+                    or not isinstance(crt_rollup.get('group_by'), list) \
+                    or not isinstance(crt_rollup.get('calculations'), dict) \
+                    or len(crt_rollup['calculations']) == 0:
+                errors.append(self.locale.gettext(
+                    'Rollup {rollup} needs "table_name", "group_by" (list) '
+                    + 'and "calculations" (column to list of aggregates)')
+                              .replace('{rollup}', rollup_label))
+                continue
+            for crt_aggregates in crt_rollup['calculations'].values():
+                for crt_aggregate in (crt_aggregates if isinstance(crt_aggregates, list)
+                                      else [str(crt_aggregates)]):
+                    if crt_aggregate not in self.rollup_aggregates:
+                        errors.append(self.locale.gettext(
+                            'Aggregate "{aggregate}" of rollup {rollup} is not among '
+                            + 'supported ones: "{aggregates}"')
+                                      .replace('{aggregate}', str(crt_aggregate))
+                                      .replace('{rollup}', crt_rollup['table_name'])
+                                      .replace('{aggregates}',
+                                               '", "'.join(self.rollup_aggregates.keys())))
+        return errors
+
+    def fn_build_rollup_tables(self, in_logger, timer, in_dict):
+        """
+        (Re)builds pre-aggregated tables next to the detail table, computed by Hyper itself
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "rollups", "schema name" and "table name"
+        """
+        source_table = TableName(in_dict['schema name'], in_dict['table name'])
+        for crt_rollup in in_dict['rollups']:
+            timer.start()
+            rollup_table = TableName(in_dict['schema name'], crt_rollup['table_name'])
+            query_to_run = 'CREATE TABLE ' + str(rollup_table) + ' AS ' \
+                           + self.fn_build_rollup_query(crt_rollup, source_table)
+            in_logger.debug(self.locale.gettext(
+                'Hyper SQL about to be executed is: {hyper_sql}')
+                            .replace('{hyper_sql}', query_to_run))
+            in_dict['connection'].execute_command(
+                command='DROP TABLE IF EXISTS ' + str(rollup_table))
+            in_dict['connection'].execute_command(command=query_to_run)
+            # aggregated tables are small, so counting them is cheap
+            row_count = in_dict['connection'].execute_scalar_query(
+                query='SELECT COUNT(*) FROM ' + str(rollup_table))
+            in_logger.info(self.locale.gettext(
+                'Rollup table {hyper_table_name} has been built with {row_count} rows')
+                           .replace('{hyper_table_name}', crt_rollup['table_name'])
+                           .replace('{row_count}', str(row_count)))
+            timer.stop()
+
+    @staticmethod
+    def fn_build_order_by_clause(in_sort_key_columns):
+        if len(in_sort_key_columns) == 0:
+            return ''
+        return ' ORDER BY ' + ', '.join([escape_name(crt) for crt in in_sort_key_columns])
+
+    def fn_create_hyper_staging_table(self, local_logger, timer, in_dict):
         timer.start()
-        in_logger.debug(self.locale.gettext(
-            'Hyper SQL about to be executed is: {hyper_sql}')
-                        .replace('{hyper_sql}', in_dict['sql query']))
-        row_count = in_dict['connection'].execute_command(command=in_dict['query'])
-        in_logger.debug(self.locale.gettext(
-            'Hyper SQL executed with success and {rows_counted} have been retrieved')
-                        .replace('{rows_counted}', str(row_count)))
+        # temporary table vanishes with the connection, never reaching the extract file
+        staging_table = TableDefinition(
+            TableName(in_dict['staging table name']),
+            columns=in_dict['table definition'].columns,
+            persistence=Persistence.TEMPORARY,
+        )
+        in_dict['connection'].catalog.create_table(table_definition=staging_table)
+        local_logger.debug(self.locale.gettext(
+            'Hyper temporary table "{hyper_table_name}" has been created')
+                           .replace('{hyper_table_name}', in_dict['staging table name']))
+        timer.stop()
+        return staging_table
+
+    def fn_execute_statements_in_hyper(self, in_logger, timer, in_dict):
+        """
+        Executes one or multiple SQL statements within a single transaction
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection" and "statements" (list of SQL statements)
+        :return: list with affected rows count for every statement
+        """
+        timer.start()
+        affected_rows = []
+        in_dict['connection'].execute_command(command='BEGIN TRANSACTION')
+        try:
+            for crt_statement in in_dict['statements']:
+                in_logger.debug(self.locale.gettext(
+                    'Hyper SQL about to be executed is: {hyper_sql}')
+                                .replace('{hyper_sql}', crt_statement))
+                row_count = in_dict['connection'].execute_command(command=crt_statement)
+                affected_rows.append(row_count)
+                in_logger.info(self.locale.gettext(
+                    'Hyper SQL executed with success and {rows_counted} rows have been affected')
+                               .replace('{rows_counted}', str(row_count)))
+        except Exception:
+            # statements already executed (like DELETE of an upsert) are undone explicitly,
+            # leaving connection outside any transaction
+            in_dict['connection'].execute_command(command='ROLLBACK')
+            in_logger.error(self.locale.gettext(
+                'Hyper SQL failed, transaction has been rolled back'))
+            timer.stop()
+            raise
+        in_dict['connection'].execute_command(command='COMMIT')
         timer.stop()
+        return affected_rows
+
+    def fn_delete_data_from_hyper(self, in_logger, timer, in_dict):
+        rows_before = self.fn_get_row_count_before_change(in_logger, timer, in_dict)
+        statements = self.fn_split_sql_statements(in_dict['query'])
+        affected_rows = self.fn_execute_statements_in_hyper(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'statements': statements,
+        })
+        # only DELETE and INSERT statements change the rows count, UPDATE does not
+        rows_changed = 0
+        for crt_statement, crt_affected_rows in zip(statements, affected_rows):
+            statement_type = crt_statement.split(None, 1)[0].upper()
+            if statement_type == 'DELETE':
+                rows_changed -= crt_affected_rows
+            elif statement_type == 'INSERT':
+                rows_changed += crt_affected_rows
+        self.fn_report_row_count_after_change(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'row count mode': in_dict.get('row count mode', 'tracked'),
+            'rows before': rows_before,
+            'rows changed': rows_changed,
+            'schema name': in_dict['schema name'],
+            'table name': in_dict['table name'],
+        })
+        return affected_rows
+
+    def fn_insert_data_sorted_into_hyper_table(self, in_logger, timer, in_dict):
+        """
+        Inserts data into a Hyper table in the order of given sort key columns,
+        by staging it into a temporary table and letting Hyper sort it on the final insert
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "data", "sort key columns" and "table"
+        :return: count of inserted rows
+        """
+        if len(in_dict['sort key columns']) == 0:
+            return self.fn_insert_data_into_hyper_table(in_logger, timer, in_dict)
+        staging_table = self.fn_create_hyper_staging_table(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'staging table name': 'Sort Staging',
+            'table definition': in_dict['table'],
+        })
+        self.fn_insert_data_into_hyper_table(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'data': in_dict['data'],
+            'table': staging_table,
+        })
+        rows_inserted = self.fn_execute_statements_in_hyper(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'statements': [
+                'INSERT INTO ' + str(in_dict['table'].table_name) + ' SELECT * FROM '
+                + str(staging_table.table_name)
+                + self.fn_build_order_by_clause(in_dict['sort key columns']),
+            ],
+        })[0]
+        in_logger.info(self.locale.gettext(
+            'Data has been inserted into Hyper table sorted by "{sort_key_columns}"')
+                       .replace('{sort_key_columns}', '", "'.join(in_dict['sort key columns'])))
+        return rows_inserted
 
     def fn_insert_data_into_hyper_table(self, local_logger, timer, in_dict):
         timer.start()
@@ -118,6 +473,7 @@ class TableauHyperApiExtraLogic:
             hyper_insert.execute()
         local_logger.info(self.locale.gettext('Data has been inserted into Hyper table'))
         timer.stop()
+        return len(in_dict['data'])
 
     def fn_create_hyper_schema(self, local_logger, timer, in_dict):
         timer.start()
@@ -169,10 +525,110 @@ class TableauHyperApiExtraLogic:
                           .replace('{hyper_table_name}', in_dict['table name']) \
                           .replace('{row_count}', str(row_count)))
         timer.stop()
+        return row_count
+
+    def fn_get_row_count_before_change(self, in_logger, timer, in_dict):
+        """
+        Determines rows count prior to a change without scanning the table,
+        unless a verified count is requested or the cached count is not yet available
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "schema name", "table name" and optionally "row count mode"
+        :return: rows count or None if unknown
+        """
+        row_count_mode = in_dict.get('row count mode', 'tracked')
+        row_count = None
+        if row_count_mode == 'metadata':
+            row_count = self.fn_get_tracked_row_count(in_logger, timer, in_dict)
+        if row_count_mode == 'verified' or (row_count_mode == 'metadata' and row_count is None):
+            row_count = self.fn_get_records_count_from_table(in_logger, timer, in_dict)
+        return row_count
+
+    def fn_get_tracked_row_count(self, in_logger, timer, in_dict):
+        timer.start()
+        row_count = None
+        if in_dict['connection'].catalog.has_table(self.row_counts_table):
+            row_count = in_dict['connection'].execute_scalar_query(
+                query='SELECT "Row Count" FROM ' + str(self.row_counts_table)
+                      + ' WHERE "Schema Name" = ' + escape_string_literal(in_dict['schema name'])
+                      + ' AND "Table Name" = ' + escape_string_literal(in_dict['table name']))
+        in_logger.debug(self.locale.gettext(
+            'Tracked rows count for table {hyper_table_name} is {row_count}')
+                        .replace('{hyper_table_name}', in_dict['table name'])
+                        .replace('{row_count}', str(row_count)))
+        timer.stop()
+        return row_count
+
+    def fn_report_row_count_after_change(self, in_logger, timer, in_dict):
+        """
+        Reports rows count after a change based on known rows count before and rows changed,
+        scanning the table only when a verified count is requested
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "schema name", "table name", "rows before", "rows changed"
+            and optionally "row count mode"
+        """
+        row_count_mode = in_dict.get('row count mode', 'tracked')
+        in_logger.info(self.locale.gettext(
+            'Table {hyper_table_name} has changed by {rows_changed} rows')
+                       .replace('{hyper_table_name}', in_dict['table name'])
+                       .replace('{rows_changed}', str(in_dict['rows changed'])))
+        if row_count_mode == 'verified':
+            row_count = self.fn_get_records_count_from_table(in_logger, timer, in_dict)
+        elif in_dict['rows before'] is not None:
+            row_count = in_dict['rows before'] + in_dict['rows changed']
+            in_logger.info(self.locale.gettext('Table {hyper_table_name} has {row_count} rows')
+                           .replace('{hyper_table_name}', in_dict['table name'])
+                           .replace('{row_count}', str(row_count)))
+        else:
+            return
+        if row_count_mode == 'metadata':
+            self.fn_store_tracked_row_count(in_logger, timer, {
+                'connection': in_dict['connection'],
+                'row count': row_count,
+                'schema name': in_dict['schema name'],
+                'table name': in_dict['table name'],
+            })
+
+    def fn_store_tracked_row_count(self, in_logger, timer, in_dict):
+        timer.start()
+        table_filter = ' WHERE "Schema Name" = ' + escape_string_literal(in_dict['schema name']) \
+                       + ' AND "Table Name" = ' + escape_string_literal(in_dict['table name'])
+        if not in_dict['connection'].catalog.has_table(self.row_counts_table):
+            in_dict['connection'].catalog.create_schema_if_not_exists(
+                self.row_counts_table.schema_name)
+            in_dict['connection'].catalog.create_table(TableDefinition(
+                self.row_counts_table, columns=[
+                    TableDefinition.Column('Schema Name', SqlType.text(), NOT_NULLABLE),
+                    TableDefinition.Column('Table Name', SqlType.text(), NOT_NULLABLE),
+                    TableDefinition.Column('Row Count', SqlType.big_int(), NOT_NULLABLE),
+                ]))
+        in_dict['connection'].execute_command(
+            command='DELETE FROM ' + str(self.row_counts_table) + table_filter)
+        in_dict['connection'].execute_command(
+            command='INSERT INTO ' + str(self.row_counts_table) + ' VALUES ('
+                    + escape_string_literal(in_dict['schema name']) + ', '
+                    + escape_string_literal(in_dict['table name']) + ', '
+                    + str(int(in_dict['row count'])) + ')')
+        in_logger.debug(self.locale.gettext(
+            'Tracked rows count for table {hyper_table_name} has been stored as {row_count}')
+                        .replace('{hyper_table_name}', in_dict['table name'])
+                        .replace('{row_count}', str(in_dict['row count'])))
+        timer.stop()
 
     def fn_hyper_handle(self, in_logger, timer, in_dict):
         timer.start()
         out_data_frame = None
+        database_file = in_dict['hyper file']
+        # a fresh extract can be built aside and only swapped in once complete
+        staged = (in_dict['action'] == 'overwrite'
+                  and in_dict.get('write mode', 'direct') != 'direct')
+        if staged:
+            database_file = self.class_fo.fn_build_staging_file_name(in_dict['hyper file'])
         try:
             # Starts Hyper Process with telemetry enabled/disabled to send data to Tableau or not
             # To opt in, simply set telemetry=Telemetry.SEND_USAGE_DATA_TO_TABLEAU.
@@ -187,28 +643,38 @@ class TableauHyperApiExtraLogic:
                 hyper_create_mode = {
                     'append': CreateMode.NONE,
                     'overwrite': CreateMode.CREATE_AND_REPLACE,
+                    'export': CreateMode.NONE,
                     'read': CreateMode.NONE,
                     'delete': CreateMode.NONE,
                     'update': CreateMode.NONE,
+                    'upsert': CreateMode.NONE,
                 }
                 #  Connect to an existing .hyper file
                 with Connection(endpoint=hyper_process.endpoint,
-                                database=in_dict['hyper file'],
+                                database=database_file,
                                 create_mode=hyper_create_mode.get(in_dict['action'])
                                 ) as hyper_connection:
                     in_logger.debug(self.locale.gettext(
                         'Connection to the Hyper engine using file name "{file_name}" '
                         + 'has been established')
-                                    .replace('{file_name}', in_dict['hyper file']))
+                                    .replace('{file_name}', database_file))
                     timer.stop()
                     in_dict['connection'] = hyper_connection
                     if in_dict['action'] == 'read':
                         out_data_frame = self.fn_hyper_read(in_logger, timer, in_dict)
+                    elif in_dict['action'] == 'export':
+                        in_dict['output']['rows written'] = \
+                            self.fn_hyper_export(in_logger, timer, in_dict)
                     elif in_dict['action'] in ('append', 'overwrite'):
                         self.fn_write_data_into_hyper_file(in_logger, timer, in_dict)
                     elif in_dict['action'] in ('delete', 'update'):
                         self.fn_delete_data_from_hyper(in_logger, timer, in_dict)
-                        self.fn_get_records_count_from_table(in_logger, timer, in_dict)
+                    elif in_dict['action'] == 'upsert':
+                        self.fn_upsert_data_into_hyper_table(in_logger, timer, in_dict)
+                    # aggregates always reflect the detail table as it has just become
+                    if in_dict['action'] not in ('export', 'read') \
+                            and len(in_dict.get('rollups', [])) != 0:
+                        self.fn_build_rollup_tables(in_logger, timer, in_dict)
             timer.start()
             hyper_connection.close()
             in_logger.info(self.locale.gettext(
@@ -218,13 +684,95 @@ class TableauHyperApiExtraLogic:
         except HyperException as ex:
             in_logger.error(str(ex).replace(chr(10), ' '))
             timer.stop()
+            if staged and os.path.isfile(database_file):
+                os.remove(database_file)
             exit(1)
+        except Exception:
+            # a half-built staging file is never left behind, whatever the failure
+            if staged and os.path.isfile(database_file):
+                os.remove(database_file)
+            raise
+        if staged:
+            self.class_fo.fn_promote_staging_file(in_logger, timer, {
+                'final file': in_dict['hyper file'],
+                'keep previous': (in_dict['write mode'] == 'staged-keep-previous'),
+                'staging file': database_file,
+            })
         return out_data_frame
 
+    def fn_hyper_export(self, in_logger, timer, in_dict):
+        """
+        Exports Hyper table content into a flat file batch by batch,
+        so memory needed is bound by a single batch whatever the table size
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "schema name", "table name", "columns", "column renames"
+            and "output" (see DataStreamWriter)
+        :return: count of exported rows
+        """
+        timer.start()
+        source_table = TableName(in_dict['schema name'], in_dict['table name'])
+        table_definition = in_dict['connection'].catalog.get_table_definition(name=source_table)
+        table_columns = [crt_column for crt_column in table_definition.columns
+                         if len(in_dict.get('columns', [])) == 0
+                         or crt_column.name.unescaped in in_dict['columns']]
+        column_names = [in_dict.get('column renames', {}).get(
+            crt_column.name.unescaped, crt_column.name.unescaped) for crt_column in table_columns]
+        # Hyper specific date and timestamp values are turned into Python native ones
+        converters = {
+            TypeTag.DATE: lambda x: x.to_date(),
+            TypeTag.TIMESTAMP: lambda x: x.to_datetime(),
+            TypeTag.TIMESTAMP_TZ: lambda x: x.to_datetime(),
+        }
+        columns_to_convert = [(crt_index, converters[crt_column.type.tag])
+                              for crt_index, crt_column in enumerate(table_columns)
+                              if crt_column.type.tag in converters]
+        query_to_run = 'SELECT ' \
+                       + ', '.join([str(crt_column.name) for crt_column in table_columns]) \
+                       + ' FROM ' + str(source_table)
+        in_logger.debug(self.locale.gettext(
+            'Hyper SQL about to be executed is: {hyper_sql}')
+                        .replace('{hyper_sql}', query_to_run))
+        chunk_rows = int(in_dict['output']['chunk rows'])
+        with DataStreamWriter.fn_get_stream_writer(in_dict['output']) as stream_writer, \
+                in_dict['connection'].execute_query(query=query_to_run) as result_set:
+            rows_batch = []
+            for crt_row in result_set:
+                rows_batch.append(crt_row)
+                if len(rows_batch) == chunk_rows:
+                    stream_writer.fn_write(self.fn_build_export_batch(
+                        rows_batch, column_names, columns_to_convert))
+                    rows_batch = []
+            if len(rows_batch) != 0 or stream_writer.rows_written == 0:
+                stream_writer.fn_write(self.fn_build_export_batch(
+                    rows_batch, column_names, columns_to_convert))
+        in_logger.info(self.locale.gettext(
+            '{rows_counted} rows have been exported to file "{file_name}"')
+                       .replace('{rows_counted}', str(stream_writer.rows_written))
+                       .replace('{file_name}', in_dict['output']['name']))
+        timer.stop()
+        return stream_writer.rows_written
+
+    @staticmethod
+    def fn_build_export_batch(in_rows, in_column_names, in_columns_to_convert):
+        for crt_index, crt_converter in in_columns_to_convert:
+            for crt_row in in_rows:
+                if crt_row[crt_index] is not None:
+                    crt_row[crt_index] = crt_converter(crt_row[crt_index])
+        # nullable types keep column types stable from one batch to another
+        return pd.DataFrame(in_rows, columns=in_column_names).convert_dtypes()
+
     def fn_hyper_read(self, in_logger, timer, in_dict):
         timer.start()
+        # only needed columns are retrieved from Hyper
+        columns_to_read = '*'
+        if len(in_dict.get('columns', [])) != 0:
+            columns_to_read = ', '.join([escape_name(crt) for crt in in_dict['columns']])
         # once Hyper is opened we can get data out
-        query_to_run = f"SELECT * FROM {TableName('Extract', 'Extract')}"
+        source_table = TableName(in_dict['schema name'], in_dict['table name'])
+        query_to_run = f"SELECT {columns_to_read} FROM {source_table}"
         in_logger.debug(self.locale.gettext(
             'Hyper SQL about to be executed is: {hyper_sql}')
                         .replace('{hyper_sql}', str(query_to_run)))
@@ -233,17 +781,22 @@ class TableauHyperApiExtraLogic:
         in_logger.debug(self.locale.gettext(
             'Hyper SQL executed with success and {rows_counted} have been retrieved')
                         .replace('{rows_counted}', str(len(out_data_frame))))
-        table_definition = in_dict['connection'].catalog.get_table_definition(
-            name=TableName('Extract', 'Extract'))
-        table_columns = self.fn_get_column_names_from_table(in_logger, {
-            'table definition': table_definition,
-        })
+        table_columns = in_dict.get('columns', [])
+        if len(table_columns) == 0:
+            table_definition = in_dict['connection'].catalog.get_table_definition(
+                name=source_table)
+            table_columns = self.fn_get_column_names_from_table(in_logger, {
+                'table definition': table_definition,
+            })
+        table_columns = [in_dict.get('column renames', {}).get(crt, crt) for crt in table_columns]
         out_data_frame.set_axis(table_columns, axis='columns', inplace=True)
         timer.stop()
         return out_data_frame
 
     def fn_rebuild_data_frame_content_for_hyper(self, in_logger, timer, in_dict):
         timer.start()
+        # columns to convert belong to current data frame only, not to any previous one
+        self.columns_for_hyper_conversion = {}
         in_dict['data frame'].replace(to_replace=[numpy.nan], value=[None], inplace=True)
         in_logger.info(self.locale.gettext('Filling empty values with NAN finished'))
         timer.stop()
@@ -289,6 +842,24 @@ class TableauHyperApiExtraLogic:
                 self.columns_for_hyper_conversion[target_data_type] = [in_field['name']]
         return in_df_column
 
+    @staticmethod
+    def fn_split_sql_statements(in_query):
+        statements = []
+        current_statement = ''
+        quote_character = None
+        for crt_character in in_query:
+            if quote_character is None and crt_character in ('"', "'"):
+                quote_character = crt_character
+            elif crt_character == quote_character:
+                quote_character = None
+            if crt_character == ';' and quote_character is None:
+                statements.append(current_statement)
+                current_statement = ''
+            else:
+                current_statement += crt_character
+        statements.append(current_statement)
+        return [crt.strip() for crt in statements if crt.strip() != '']
+
     @staticmethod
     def fn_standardize_data_type(in_field):
         target_data_type = ''
@@ -312,15 +883,69 @@ class TableauHyperApiExtraLogic:
             in_df_column = pd.to_datetime(in_df_column)
         return in_df_column
 
+    def fn_upsert_data_into_hyper_table(self, in_logger, timer, in_dict):
+        """
+        Replaces rows having same key column values with new ones and adds the rest,
+        staging new data into a temporary table and applying it with set-based statements
+
+        :param in_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "data", "key columns", "schema name" and "table name"
+        :return: dictionary with counts of replaced and inserted rows
+        """
+        target_table = TableName(in_dict['schema name'], in_dict['table name'])
+        rows_before = self.fn_get_row_count_before_change(in_logger, timer, in_dict)
+        staging_table = self.fn_create_hyper_staging_table(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'staging table name': 'Upsert Staging',
+            'table definition': in_dict['connection'].catalog.get_table_definition(target_table),
+        })
+        self.fn_insert_data_into_hyper_table(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'data': in_dict['data'],
+            'table': staging_table,
+        })
+        # NULL keys are considered matching, same as a plain value comparison would expect
+        key_condition = ' AND '.join([
+            str(target_table) + '.' + escape_name(crt_column) + ' IS NOT DISTINCT FROM '
+            + str(staging_table.table_name) + '.' + escape_name(crt_column)
+            for crt_column in in_dict['key columns']])
+        affected_rows = self.fn_execute_statements_in_hyper(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'statements': [
+                'DELETE FROM ' + str(target_table) + ' USING ' + str(staging_table.table_name)
+                + ' WHERE ' + key_condition,
+                'INSERT INTO ' + str(target_table) + ' SELECT * FROM '
+                + str(staging_table.table_name)
+                + self.fn_build_order_by_clause(in_dict.get('sort key columns', [])),
+            ],
+        })
+        in_logger.info(self.locale.gettext(
+            'Upsert completed: {rows_replaced} rows replaced and {rows_added} rows added '
+            + 'based on key columns "{key_columns}"')
+                       .replace('{rows_replaced}', str(affected_rows[0]))
+                       .replace('{rows_added}', str(affected_rows[1] - affected_rows[0]))
+                       .replace('{key_columns}', '", "'.join(in_dict['key columns'])))
+        self.fn_report_row_count_after_change(in_logger, timer, {
+            'connection': in_dict['connection'],
+            'row count mode': in_dict.get('row count mode', 'tracked'),
+            'rows before': rows_before,
+            'rows changed': affected_rows[1] - affected_rows[0],
+            'schema name': in_dict['schema name'],
+            'table name': in_dict['table name'],
+        })
+        return {
+            'rows inserted': affected_rows[1],
+            'rows replaced': affected_rows[0],
+        }
+
     def fn_write_data_into_hyper_file(self, in_logger, timer, in_dict):
+        rows_before = 0
         if in_dict['action'] == 'append':
-            self.fn_get_records_count_from_table(in_logger, timer, {
-                'connection': in_dict['connection'],
-                'schema name': in_dict['schema name'],
-                'table name': in_dict['table name'],
-            })
+            rows_before = self.fn_get_row_count_before_change(in_logger, timer, in_dict)
             hyper_table = in_dict['connection'].catalog.get_table_definition(
-                TableName('Extract', 'Extract'))
+                TableName(in_dict['schema name'], in_dict['table name']))
         elif in_dict['action'] == 'overwrite':
             self.fn_create_hyper_schema(in_logger, timer, in_dict)
             hyper_table = self.fn_create_hyper_table(in_logger, timer, {
@@ -329,13 +954,17 @@ class TableauHyperApiExtraLogic:
                 'schema name': in_dict['schema name'],
                 'table name': in_dict['table name'],
             })
-        self.fn_insert_data_into_hyper_table(in_logger, timer, {
+        rows_inserted = self.fn_insert_data_sorted_into_hyper_table(in_logger, timer, {
             'connection': in_dict['connection'],
             'data': in_dict['data'],
+            'sort key columns': in_dict.get('sort key columns', []),
             'table': hyper_table,
         })
-        self.fn_get_records_count_from_table(in_logger, timer, {
+        self.fn_report_row_count_after_change(in_logger, timer, {
             'connection': in_dict['connection'],
+            'row count mode': in_dict.get('row count mode', 'tracked'),
+            'rows before': rows_before,
+            'rows changed': rows_inserted,
             'schema name': in_dict['schema name'],
             'table name': in_dict['table name'],
         })
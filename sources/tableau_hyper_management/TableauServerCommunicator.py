@@ -3,29 +3,44 @@ TableauServerCommunication - a Tableau Server Client wrapper
 
 This library facilitates publishing data source to Tableau Server
 """
-# package to add support for multi-language (i18n)
-import gettext
+# useful methods to measure time performance by small pieces of code
+from codetiming import Timer
+# package to handle json files
+import json
 # package to handle files/folders and related metadata/operations
 import os
+# package to evaluate cache age
+import time
 # package to ensure communication with Tableau Server
 import tableauserverclient as tsc
 # Path manager
 from pathlib import Path
+# package to facilitate common operations
+from .FileOperations import FileOperations
+from .LocaleNeeds import LocaleNeeds
+# package to upload large files in chunks
+from .TableauServerFileUploader import TableauServerFileUploader
 
 
 class TableauServerCommunicator:
-    req_opts = tsc.RequestOptions(pagesize=1000)
+    class_tsfu = None
+    connection_details = None
+    project_cache = {
+        'file': 'None',
+        'ttl seconds': 0,
+    }
+    project_index = None
+    project_index_from_cache = False
+    projects_page_size = 1000
+    publish_ledger_file = 'None'
     tableau_server = None
+    language = None
     locale = None
 
     def __init__(self, in_language):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.language = in_language
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
+        self.class_tsfu = TableauServerFileUploader(in_language)
 
     def connect_to_tableau_server(self, local_logger, timer, in_connection):
         timer.start()
@@ -39,6 +54,11 @@ class TableauServerCommunicator:
         tableau_auth = tsc.TableauAuth(
             in_connection['Username'], in_connection['Password'], in_connection['Tableau Site'])
         self.tableau_server.auth.sign_in(tableau_auth)
+        self.connection_details = {
+            'Tableau Server': in_connection['Tableau Server'],
+            'Tableau Site': in_connection['Tableau Site'],
+        }
+        self.project_index = None
         local_logger.debug(self.locale.gettext(
             'Connection to the Tableau Server has been established successfully!'))
         timer.stop()
@@ -50,17 +70,31 @@ class TableauServerCommunicator:
             'Connection to the Tableau Server has been terminated!'))
         timer.stop()
 
-    @staticmethod
-    def get_project_relevancy(relevant_projects_to_filter, filtering_type, current_project):
-        relevant = 0
-        if filtering_type == 'JustOnesMentioned':
-            if current_project.name.replace(chr(8211), chr(45)) in relevant_projects_to_filter:
-                relevant = 1
-        elif filtering_type == 'OnesMentionedMarked':
-            relevant = 2
-        elif filtering_type == 'All':
-            relevant = 99
-        return relevant
+    def is_publishing_necessary(self, local_logger, in_data_source):
+        """
+        Compares current extract fingerprint with the one recorded on last successful publish
+
+        :param local_logger: logger handler to capture running details
+        :param in_data_source: dictionary containing following keys with relevant values:
+            "file name", "data source name" and "project id"
+        :return: False only when an identical content has already been published
+        """
+        if self.publish_ledger_file == 'None':
+            return True
+        in_data_source['fingerprint'] = self.fn_build_data_source_fingerprint(
+            local_logger, in_data_source['file name'])
+        ledger_key = self.fn_build_publish_ledger_key(in_data_source['project id'],
+                                                      in_data_source['data source name'])
+        previous_publish = self.fn_load_publish_ledger(local_logger).get(ledger_key)
+        if previous_publish is not None \
+                and previous_publish['fingerprint'] == in_data_source['fingerprint']:
+            local_logger.info(self.locale.gettext(
+                'File "{file_name}" is identical with the one published on {published_at}, '
+                + 'so publishing will be skipped')
+                              .replace('{file_name}', in_data_source['file name'])
+                              .replace('{published_at}', previous_publish['published at']))
+            return False
+        return True
 
     def is_publishing_possible(self, local_logger, relevant_project_name, relevant_project_ids):
         publish_possible = False
@@ -69,11 +103,11 @@ class TableauServerCommunicator:
             local_logger.error(self.locale.gettext(
                 'No project with provided name "{project_name}" has been found')
                                .replace('{project_name}', relevant_project_name))
-            self.no_publishing_feedback()
+            self.no_publishing_feedback(local_logger)
         elif int_found_projects > 1:
             local_logger.error(f'There are {str(int_found_projects)} projects with provided name "'
                                + relevant_project_name + ' but a unique identifier is expected')
-            self.no_publishing_feedback()
+            self.no_publishing_feedback(local_logger)
         else:
             publish_possible = True
             local_logger.info(self.locale.gettext(
@@ -83,25 +117,174 @@ class TableauServerCommunicator:
             local_logger.info(self.locale.gettext('Stay tuned for the confirmation'))
         return publish_possible
 
-    def load_tableau_project_ids(self, local_logger, timer, in_projects_to_filter, in_filter_type):
-        timer.start()
-        project_items, pagination_item = self.tableau_server.projects.get(req_options=self.req_opts)
+    def configure_publish_ledger(self, in_ledger_file):
+        self.publish_ledger_file = in_ledger_file
+
+    def configure_project_cache(self, in_cache_file, in_ttl_seconds):
+        self.project_cache = {
+            'file': in_cache_file,
+            'ttl seconds': float(in_ttl_seconds),
+        }
+
+    def configure_request_timeout(self, in_timeout_seconds):
+        self.class_tsfu.fn_configure_request_timeout(in_timeout_seconds)
+
+    def fn_build_project_index(self, local_logger):
+        project_index = {}
+        page_number = 1
+        projects_counted = 0
+        while True:
+            request_options = tsc.RequestOptions(pagenumber=page_number,
+                                                 pagesize=self.projects_page_size)
+            project_items, pagination_item = self.tableau_server.projects.get(
+                req_options=request_options)
+            for project_current in project_items:
+                project_name = project_current.name.replace(chr(8211), chr(45))
+                project_index.setdefault(project_name, []).append(project_current.id)
+            projects_counted += len(project_items)
+            local_logger.debug(self.locale.gettext(
+                'Page {page_number} of projects has been read, '
+                + '{projects_counted} of {projects_available} projects so far')
+                               .replace('{page_number}', str(page_number))
+                               .replace('{projects_counted}', str(projects_counted))
+                               .replace('{projects_available}',
+                                        str(pagination_item.total_available)))
+            if len(project_items) == 0 or projects_counted >= pagination_item.total_available:
+                break
+            page_number += 1
+        return project_index
+
+    def fn_build_data_source_fingerprint(self, local_logger, in_file_name):
+        if os.path.splitext(in_file_name)[1].lower() != '.hyper':
+            return {
+                'size [bytes]': os.path.getsize(in_file_name),
+                'SHA256 Checksum': FileOperations.fn_get_file_checksum(in_file_name),
+            }
+        # Hyper file bytes differ even for identical content, so content itself is described;
+        # imported only when a publish ledger is used, keeping publisher start-up light
+        from .TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+        return TableauHyperApiExtraLogic(self.language).fn_build_hyper_file_fingerprint(
+            local_logger, Timer(logger=None), {'hyper file': in_file_name})
+
+    def fn_build_publish_ledger_key(self, in_project_id, in_data_source_name):
+        return ' | '.join([self.connection_details['Tableau Server'],
+                           self.connection_details['Tableau Site'],
+                           in_project_id, in_data_source_name])
+
+    def fn_load_publish_ledger(self, local_logger):
+        publish_ledger = {}
+        if os.path.isfile(self.publish_ledger_file):
+            try:
+                with open(self.publish_ledger_file, 'r', encoding='utf-8') as file_handler:
+                    publish_ledger = json.load(file_handler)
+                if not isinstance(publish_ledger, dict):
+                    raise ValueError('JSON object expected')
+            except (OSError, ValueError) as err:
+                # an unreadable ledger only means every data source gets published again
+                local_logger.warning(self.locale.gettext(
+                    'Publish ledger "{ledger_file}" cannot be used and will be ignored: '
+                    + '{error_details}')
+                                     .replace('{ledger_file}', self.publish_ledger_file)
+                                     .replace('{error_details}', str(err)))
+                publish_ledger = {}
+        return publish_ledger
+
+    def fn_load_project_index_from_cache(self, local_logger):
+        cache_file = self.project_cache['file']
+        if cache_file == 'None' or self.project_cache['ttl seconds'] <= 0 \
+                or not os.path.isfile(cache_file):
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as file_handler:
+                cache_content = json.load(file_handler)
+            cache_age = time.time() - cache_content['created']
+            cache_is_relevant = cache_content['connection'] == self.connection_details \
+                and cache_age <= self.project_cache['ttl seconds'] \
+                and isinstance(cache_content['projects'], dict)
+        except (OSError, KeyError, TypeError, ValueError) as err:
+            # a truncated or foreign cache file is just a cache miss
+            local_logger.warning(self.locale.gettext(
+                'Cache file "{cache_file}" cannot be used and will be ignored: {error_details}')
+                                 .replace('{cache_file}', cache_file)
+                                 .replace('{error_details}', str(err)))
+            return None
+        if not cache_is_relevant:
+            return None
         local_logger.info(self.locale.gettext(
-            'Reading list of all projects available has been completed'))
+            'Projects have been loaded from cache file "{cache_file}" '
+            + 'created {cache_age} seconds ago')
+                          .replace('{cache_file}', cache_file)
+                          .replace('{cache_age}', str(round(cache_age))))
+        return cache_content['projects']
+
+    def fn_store_project_index_to_cache(self, local_logger):
+        cache_file = self.project_cache['file']
+        if cache_file == 'None' or self.project_cache['ttl seconds'] <= 0:
+            return
+        # written aside then renamed, so concurrent publishers never read a partial cache
+        cache_file_temporary = cache_file + '.' + str(os.getpid()) + '.tmp'
+        with open(cache_file_temporary, 'w', encoding='utf-8') as file_handler:
+            json.dump({
+                'connection': self.connection_details,
+                'created': time.time(),
+                'projects': self.project_index,
+            }, file_handler)
+        os.replace(cache_file_temporary, cache_file)
+        local_logger.debug(self.locale.gettext(
+            'Projects have been stored to cache file "{cache_file}"')
+                           .replace('{cache_file}', cache_file))
+
+    def load_project_index(self, local_logger, timer, in_project_names=None):
+        """
+        Ensures project name to identifiers index is available
+        (from memory, cache file within its time-to-live or reading all project pages)
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_project_names: project names needed, a cached index missing any of them
+            being refreshed from Tableau Server (as those projects may be newer than the cache)
+        :return: dictionary with project name as key and list of project identifiers as value
+        """
+        timer.start()
+        if self.project_index is None:
+            self.project_index = self.fn_load_project_index_from_cache(local_logger)
+            self.project_index_from_cache = (self.project_index is not None)
+        if self.project_index_from_cache and in_project_names is not None:
+            missing_project_names = [crt_name for crt_name in in_project_names
+                                     if crt_name not in self.project_index]
+            if len(missing_project_names) != 0:
+                local_logger.info(self.locale.gettext(
+                    'Projects "{project_names}" are not within cached projects, '
+                    + 'so projects will be read again from Tableau Server')
+                                  .replace('{project_names}',
+                                           '", "'.join(sorted(missing_project_names))))
+                self.project_index = None
+        if self.project_index is None:
+            self.project_index = self.fn_build_project_index(local_logger)
+            self.project_index_from_cache = False
+            local_logger.info(self.locale.gettext(
+                'Reading list of all projects available has been completed'))
+            self.fn_store_project_index_to_cache(local_logger)
         local_logger.info(self.locale.gettext(
             'A number of {projects_counted} projects have been identified')
-                          .replace('{projects_counted}', str(len(project_items))))
+                          .replace('{projects_counted}', str(sum(
+                              [len(crt_ids) for crt_ids in self.project_index.values()]))))
         timer.stop()
+        return self.project_index
+
+    def load_tableau_project_ids(self, local_logger, timer, in_projects_to_filter, in_filter_type):
+        project_names_needed = None
+        if in_filter_type == 'JustOnesMentioned':
+            project_names_needed = in_projects_to_filter
+        project_index = self.load_project_index(local_logger, timer, project_names_needed)
         timer.start()
         dictionary_project_ids = []
-        project_counter = 0
-        for project_current in project_items:
-            relevant = self.get_project_relevancy(
-                in_projects_to_filter, in_filter_type, project_current)
-            if relevant >= 1:
-                dictionary_project_ids.append(project_counter)
-                dictionary_project_ids[project_counter] = project_current.id
-                project_counter = project_counter + 1
+        if in_filter_type == 'JustOnesMentioned':
+            for crt_project_name in in_projects_to_filter:
+                dictionary_project_ids += project_index.get(crt_project_name, [])
+        elif in_filter_type in ('All', 'OnesMentionedMarked'):
+            for crt_project_ids in project_index.values():
+                dictionary_project_ids += crt_project_ids
         local_logger.info(self.locale.gettext(
             'Retaining the projects according to filtering type provided ({filter_type}) '
             + 'has been completed')
@@ -112,19 +295,152 @@ class TableauServerCommunicator:
         timer.stop()
         return dictionary_project_ids
 
+    def load_tableau_project_ids_by_name(self, local_logger, timer, in_project_names):
+        project_index = self.load_project_index(local_logger, timer, in_project_names)
+        project_ids_by_name = {}
+        for crt_project_name in in_project_names:
+            project_ids_by_name[crt_project_name] = project_index.get(crt_project_name, [])
+        return project_ids_by_name
+
     def no_publishing_feedback(self, local_logger):
         local_logger.debug(self.locale.gettext('No publishing action will take place!'))
         local_logger.debug(self.locale.gettext(
             'Check your input parameter values for accuracy and try again!'))
 
+    def get_rest_connection_details(self):
+        return {
+            'auth token': self.tableau_server.auth_token,
+            'base url': self.tableau_server.baseurl,
+            'site id': self.tableau_server.site_id,
+        }
+
+    def record_successful_publishes(self, local_logger, in_data_sources):
+        if self.publish_ledger_file == 'None' or len(in_data_sources) == 0:
+            return
+        publish_ledger = self.fn_load_publish_ledger(local_logger)
+        for crt_data_source in in_data_sources:
+            ledger_key = self.fn_build_publish_ledger_key(crt_data_source['project id'],
+                                                          crt_data_source['data source name'])
+            publish_ledger[ledger_key] = {
+                'fingerprint': crt_data_source['fingerprint'],
+                'published at': time.strftime('%Y-%m-%d %H:%M:%S %Z'),
+            }
+        # written aside then renamed, so an interrupted run never leaves a corrupted ledger
+        ledger_file_temporary = self.publish_ledger_file + '.' + str(os.getpid()) + '.tmp'
+        with open(ledger_file_temporary, 'w', encoding='utf-8') as file_handler:
+            json.dump(publish_ledger, file_handler, indent=4)
+        os.replace(ledger_file_temporary, self.publish_ledger_file)
+        local_logger.debug(self.locale.gettext(
+            'Publish ledger "{ledger_file}" has been updated with {data_sources_counted} entries')
+                           .replace('{ledger_file}', self.publish_ledger_file)
+                           .replace('{data_sources_counted}', str(len(in_data_sources))))
+
+    def publish_multiple_data_sources_to_tableau_server(self, local_logger, timer, in_dict):
+        """
+        Publishes several data sources within current session with bounded concurrency
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "Publishing Plan" (list of dictionaries with "Tableau Extract File",
+            "Tableau Project" and "Publishing Mode"), "Workers", "Chunk Size [MB]",
+            "Retries" and "Retry Backoff Seconds"
+        :return: list of dictionaries with outcome and latency for every data source
+        """
+        # projects are resolved once for the entire plan
+        project_names = set([crt['Tableau Project'] for crt in in_dict['Publishing Plan']])
+        project_ids_by_name = self.load_tableau_project_ids_by_name(
+            local_logger, timer, project_names)
+        data_sources = []
+        results_not_possible = []
+        for crt_publish in in_dict['Publishing Plan']:
+            if not self.is_publishing_possible(local_logger, crt_publish['Tableau Project'],
+                                               project_ids_by_name[crt_publish['Tableau Project']]):
+                results_not_possible.append({
+                    'data source id': None,
+                    'error details': self.locale.gettext(
+                        'Project "{project_name}" cannot be uniquely identified')
+                    .replace('{project_name}', crt_publish['Tableau Project']),
+                    'file name': crt_publish['Tableau Extract File'],
+                    'seconds': 0,
+                })
+            else:
+                crt_data_source = {
+                    'data source name': Path(crt_publish['Tableau Extract File'])
+                    .name.replace('.hyper', '') + ' Extract',
+                    'file name': crt_publish['Tableau Extract File'],
+                    'project id': project_ids_by_name[crt_publish['Tableau Project']][0],
+                    'publishing mode': crt_publish['Publishing Mode'],
+                }
+                if self.is_publishing_necessary(local_logger, crt_data_source):
+                    data_sources.append(crt_data_source)
+        results = self.class_tsfu.fn_publish_multiple_data_sources(local_logger, timer, {
+            'backoff seconds': float(in_dict['Retry Backoff Seconds']),
+            'chunk size [MB]': in_dict['Chunk Size [MB]'],
+            'connection': self.get_rest_connection_details(),
+            'data sources': data_sources,
+            'retries': int(in_dict['Retries']),
+            'workers': in_dict['Workers'],
+        })
+        published_files = [crt['file name'] for crt in results if crt['error details'] is None]
+        self.record_successful_publishes(
+            local_logger, [crt for crt in data_sources if crt['file name'] in published_files])
+        return results_not_possible + results
+
+    def fn_log_publishing_failures(self, local_logger, in_results):
+        """
+        :param local_logger: logger handler to capture running details
+        :param in_results: outcome of publish_multiple_data_sources_to_tableau_server
+        :return: number of data sources which could not be published
+        """
+        failed_results = [crt for crt in in_results if crt['error details'] is not None]
+        if len(failed_results) != 0:
+            local_logger.error(self.locale.gettext(
+                '{failed_counted} of {data_sources_counted} data sources could not be published: '
+                + '"{file_names}"')
+                               .replace('{failed_counted}', str(len(failed_results)))
+                               .replace('{data_sources_counted}', str(len(in_results)))
+                               .replace('{file_names}', '", "'.join(
+                                   [crt['file name'] for crt in failed_results])))
+        return len(failed_results)
+
     def publish_data_source_to_tableau_server(self, local_logger, timer, publish_details):
         timer.start()
         local_logger.info(self.locale.gettext('About to start publishing'))
         data_source_name = Path(publish_details['Tableau Extract File'])\
             .name.replace('.hyper', '') + " Extract"
-        project_data_source = tsc.DatasourceItem(publish_details['Project ID'], data_source_name)
-        self.tableau_server.datasources.publish(
-            project_data_source, publish_details['Tableau Extract File'],
-            publish_details['Publishing Mode'])
+        data_source = {
+            'data source name': data_source_name,
+            'file name': publish_details['Tableau Extract File'],
+            'project id': publish_details['Project ID'],
+        }
+        if not self.is_publishing_necessary(local_logger, data_source):
+            timer.stop()
+            return
+        if float(publish_details.get('Chunk Size [MB]', 0)) > 0:
+            timer.stop()
+            upload_metrics = self.class_tsfu.fn_upload_file_in_chunks(local_logger, timer, {
+                'backoff seconds': float(publish_details.get('Retry Backoff Seconds', 2)),
+                'chunk size [MB]': publish_details['Chunk Size [MB]'],
+                'connection': self.get_rest_connection_details(),
+                'file name': publish_details['Tableau Extract File'],
+                'retries': int(publish_details.get('Retries', 3)),
+            })
+            self.class_tsfu.fn_publish_uploaded_data_source(local_logger, timer, {
+                'connection': self.get_rest_connection_details(),
+                'data source name': data_source_name,
+                'file name': publish_details['Tableau Extract File'],
+                'project id': publish_details['Project ID'],
+                'publishing mode': publish_details['Publishing Mode'],
+                'upload session id': upload_metrics['upload session id'],
+            })
+            timer.start()
+        else:
+            project_data_source = tsc.DatasourceItem(publish_details['Project ID'],
+                                                     data_source_name)
+            self.tableau_server.datasources.publish(
+                project_data_source, publish_details['Tableau Extract File'],
+                publish_details['Publishing Mode'])
         local_logger.info(self.locale.gettext('Publishing completed successfully!'))
+        self.record_successful_publishes(local_logger, [data_source])
         timer.stop()
@@ -0,0 +1,398 @@
+"""
+TableauServerFileUploader - chunked file upload to Tableau Server via REST API
+
+This library uploads large files in chunks using Tableau Server file upload sessions,
+retrying failed chunks and measuring throughput, then publishes the uploaded content
+"""
+# useful methods to measure time performance by small pieces of code
+from codetiming import Timer
+# package to facilitate parallel operations
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# package to bind arguments to functions
+from functools import partial
+# package to handle files/folders and related metadata/operations
+import os
+# package to generate unique multipart boundaries
+import uuid
+# package to measure elapsed time and pause between retries
+import time
+# package to interpret XML responses from Tableau Server
+import xml.etree.ElementTree as ElementTree
+# package to handle XML special characters
+from xml.sax.saxutils import quoteattr
+# package to perform HTTP requests
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+# package to share localization catalogs
+from .LocaleNeeds import LocaleNeeds
+
+
+class TableauServerFileUploader:
+    bytes_per_megabyte = 1024 * 1024
+    http_session = None
+    locale = None
+    # (connect, read) seconds, so a stalled server fails the request instead of hanging it
+    request_timeout = (30, 300)
+    retry_status_codes = (429, 500, 502, 503, 504)
+    xml_namespace = {'t': 'http://tableau.com/api'}
+
+    def __init__(self, in_language='en_US', in_http_session=None):
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
+        self.http_session = in_http_session
+        if self.http_session is None:
+            self.http_session = requests.Session()
+
+    @staticmethod
+    def fn_build_multipart_body(in_parts):
+        boundary = uuid.uuid4().hex
+        body = b''
+        for crt_part in in_parts:
+            disposition = 'Content-Disposition: name="' + crt_part['name'] + '"'
+            if 'file name' in crt_part:
+                disposition += '; filename="' + crt_part['file name'] + '"'
+            body += ('--' + boundary + '\r\n' + disposition + '\r\n'
+                     + 'Content-Type: ' + crt_part['content type'] + '\r\n\r\n').encode('utf-8')
+            body += crt_part['content'] + b'\r\n'
+        body += ('--' + boundary + '--\r\n').encode('utf-8')
+        return body, 'multipart/mixed; boundary=' + boundary
+
+    @staticmethod
+    def fn_build_site_url(in_connection):
+        return in_connection['base url'].rstrip('/') + '/sites/' + in_connection['site id']
+
+    def fn_configure_connection_pool(self, in_pool_size):
+        # one kept-alive connection per concurrent worker avoids re-establishing TLS per request
+        http_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=int(in_pool_size))
+        self.http_session.mount('http://', http_adapter)
+        self.http_session.mount('https://', http_adapter)
+
+    def fn_configure_request_timeout(self, in_timeout_seconds):
+        """
+        :param in_timeout_seconds: "connect,read" seconds (a single value is used for both)
+        """
+        timeout_values = [float(crt) for crt in str(in_timeout_seconds).split(',')]
+        self.request_timeout = (timeout_values[0], timeout_values[-1])
+
+    def fn_is_chunk_appended(self, local_logger, in_dict):
+        """
+        Checks whether a chunk which failed to be confirmed was appended anyway,
+        so it is never appended twice to upload session
+
+        :param local_logger: logger handler to capture running details
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "url" (of upload session), "bytes before" and "chunk bytes"
+        :return: True if upload session already contains given chunk
+        """
+        size_before = in_dict['bytes before'] / self.bytes_per_megabyte
+        size_after = (in_dict['bytes before'] + in_dict['chunk bytes']) / self.bytes_per_megabyte
+        # Tableau Server reports upload session size in whole megabytes
+        if int(size_before) == int(size_after):
+            raise requests.HTTPError(self.locale.gettext(
+                'Upload session size cannot confirm whether chunk has been appended'))
+        response = self.fn_request_with_retry(local_logger, {
+            'connection': in_dict['connection'],
+            'method': 'GET',
+            'url': in_dict['url'],
+        })
+        size_reported = float(self.fn_get_response_attribute(response, 'fileUpload', 'fileSize'))
+        chunk_appended = size_reported >= int(size_after)
+        local_logger.debug(self.locale.gettext(
+            'Upload session reports {size_reported} MB, chunk appended already: {chunk_appended}')
+                           .replace('{size_reported}', str(size_reported))
+                           .replace('{chunk_appended}', str(chunk_appended)))
+        return chunk_appended
+
+    @staticmethod
+    def fn_is_request_not_sent(in_error):
+        # connection could not be established, so server cannot have received anything
+        if isinstance(in_error, requests.ConnectTimeout):
+            return True
+        error_reason = getattr(in_error.args[0], 'reason', None) if in_error.args else None
+        return isinstance(error_reason, NewConnectionError)
+
+    def fn_get_response_attribute(self, in_response, in_element, in_attribute):
+        response_tree = ElementTree.fromstring(in_response.content)
+        return response_tree.find('.//t:' + in_element, self.xml_namespace).get(in_attribute)
+
+    def fn_initiate_upload_session(self, local_logger, in_connection):
+        response = self.fn_request_with_retry(local_logger, {
+            'connection': in_connection,
+            'method': 'POST',
+            'url': self.fn_build_site_url(in_connection) + '/fileUploads',
+        })
+        upload_session_id = self.fn_get_response_attribute(
+            response, 'fileUpload', 'uploadSessionId')
+        local_logger.debug(self.locale.gettext(
+            'File upload session {upload_session_id} has been initiated')
+                           .replace('{upload_session_id}', upload_session_id))
+        return upload_session_id
+
+    def fn_publish_multiple_data_sources(self, local_logger, timer, in_dict):
+        """
+        Uploads and publishes several data sources concurrently over a shared HTTP session
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "data sources" (list of dictionaries with "file name",
+            "data source name", "project id" and "publishing mode"), "workers",
+            "chunk size [MB]" and optionally "retries" and "backoff seconds"
+        :return: list of dictionaries with outcome and latency for every data source
+        """
+        timer.start()
+        workers = max(1, int(in_dict['workers']))
+        self.fn_configure_connection_pool(workers)
+        local_logger.info(self.locale.gettext(
+            'About to publish {data_sources_counted} data sources using {workers} workers')
+                          .replace('{data_sources_counted}', str(len(in_dict['data sources'])))
+                          .replace('{workers}', str(workers)))
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            future_to_source = {executor.submit(
+                self.fn_publish_single_data_source, local_logger, in_dict, crt_source):
+                crt_source for crt_source in in_dict['data sources']}
+            for crt_future in as_completed(future_to_source):
+                results.append(crt_future.result())
+        published_counted = len([crt for crt in results if crt['error details'] is None])
+        local_logger.info(self.locale.gettext(
+            '{published_counted} of {data_sources_counted} data sources published successfully')
+                          .replace('{published_counted}', str(published_counted))
+                          .replace('{data_sources_counted}', str(len(results))))
+        timer.stop()
+        return results
+
+    def fn_publish_single_data_source(self, local_logger, in_dict, in_data_source):
+        # shared timers are not thread safe, so each concurrent publish gets its own
+        thread_timer = Timer(logger=None)
+        result = {
+            'data source id': None,
+            'error details': None,
+            'file name': in_data_source['file name'],
+            'seconds': 0,
+        }
+        time_started = time.perf_counter()
+        try:
+            upload_metrics = self.fn_upload_file_in_chunks(local_logger, thread_timer, {
+                'backoff seconds': in_dict.get('backoff seconds', 2),
+                'chunk size [MB]': in_dict['chunk size [MB]'],
+                'connection': in_dict['connection'],
+                'file name': in_data_source['file name'],
+                'retries': in_dict.get('retries', 3),
+            })
+            result['data source id'] = self.fn_publish_uploaded_data_source(
+                local_logger, thread_timer, {
+                    'connection': in_dict['connection'],
+                    'data source name': in_data_source['data source name'],
+                    'file name': in_data_source['file name'],
+                    'project id': in_data_source['project id'],
+                    'publishing mode': in_data_source['publishing mode'],
+                    'upload session id': upload_metrics['upload session id'],
+                })
+            result.update(upload_metrics)
+        except Exception as err:
+            # any failure (HTTP, file access, unexpected response) is confined to its own file
+            result['error details'] = str(err)
+            local_logger.error(self.locale.gettext(
+                'Publishing file "{file_name}" failed: {error_details}')
+                               .replace('{file_name}', in_data_source['file name'])
+                               .replace('{error_details}', str(err)))
+        result['seconds'] = round(time.perf_counter() - time_started, 3)
+        local_logger.info(self.locale.gettext(
+            'File "{file_name}" publishing took {seconds} seconds')
+                          .replace('{file_name}', in_data_source['file name'])
+                          .replace('{seconds}', str(result['seconds'])))
+        return result
+
+    def fn_publish_uploaded_data_source(self, local_logger, timer, in_dict):
+        timer.start()
+        query_parameters = {
+            'uploadSessionId': in_dict['upload session id'],
+            'datasourceType': os.path.splitext(in_dict['file name'])[1].replace('.', ''),
+        }
+        if in_dict['publishing mode'] == 'Overwrite':
+            query_parameters['overwrite'] = 'true'
+        elif in_dict['publishing mode'] == 'Append':
+            query_parameters['append'] = 'true'
+        request_payload = '<tsRequest><datasource name=' + quoteattr(in_dict['data source name']) \
+                          + '><project id=' + quoteattr(in_dict['project id']) \
+                          + '/></datasource></tsRequest>'
+        body, content_type = self.fn_build_multipart_body([{
+            'content': request_payload.encode('utf-8'),
+            'content type': 'text/xml',
+            'name': 'request_payload',
+        }])
+        response = self.fn_request_with_retry(local_logger, {
+            'connection': in_dict['connection'],
+            'data': body,
+            'headers': {'Content-Type': content_type},
+            'method': 'POST',
+            'params': query_parameters,
+            # publishing is not idempotent: a server error might come after content was applied
+            'retry policy': 'never' if in_dict['publishing mode'] == 'Append' else 'not sent',
+            'url': self.fn_build_site_url(in_dict['connection']) + '/datasources',
+        })
+        data_source_id = self.fn_get_response_attribute(response, 'datasource', 'id')
+        local_logger.info(self.locale.gettext(
+            'Data source "{data_source_name}" has been published with identifier {data_source_id}')
+                          .replace('{data_source_name}', in_dict['data source name'])
+                          .replace('{data_source_id}', str(data_source_id)))
+        timer.stop()
+        return data_source_id
+
+    @staticmethod
+    def fn_read_file_chunk(in_file_handler, in_chunk_size):
+        return in_file_handler.read(in_chunk_size)
+
+    def fn_request_with_retry(self, local_logger, in_dict):
+        """
+        Performs a REST request, retrying transient failures with exponential backoff
+
+        :param local_logger: logger handler to capture running details
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection", "method", "url" and optionally "data", "headers", "params",
+            "retries", "backoff seconds", "retry counter" (list), "before retry" (callable
+            returning True when request does not need to be sent again) and "retry policy":
+            "idempotent" (default, any transient failure), "not sent" (only HTTP 429 or
+            connection never established) or "never"
+        :return: response or None when "before retry" found request already applied
+        """
+        attempt = 0
+        retries_allowed = in_dict.get('retries', 3)
+        retry_policy = in_dict.get('retry policy', 'idempotent')
+        headers = {'X-Tableau-Auth': in_dict['connection']['auth token']}
+        headers.update(in_dict.get('headers', {}))
+        while True:
+            error_details = None
+            request_not_sent = False
+            try:
+                response = self.http_session.request(
+                    in_dict['method'], in_dict['url'], data=in_dict.get('data'),
+                    headers=headers, params=in_dict.get('params'),
+                    timeout=self.request_timeout)
+                if response.status_code not in self.retry_status_codes:
+                    response.raise_for_status()
+                    return response
+                error_details = 'HTTP ' + str(response.status_code)
+                # too many requests means server turned it down without processing it
+                request_not_sent = response.status_code == 429
+            except requests.ConnectionError as err:
+                error_details = str(err)
+                request_not_sent = self.fn_is_request_not_sent(err)
+            except requests.Timeout as err:
+                error_details = str(err)
+            retry_possible = retry_policy == 'idempotent' \
+                or (retry_policy == 'not sent' and request_not_sent)
+            if attempt >= retries_allowed or not retry_possible:
+                local_logger.error(self.locale.gettext(
+                    'Request to {url} failed after {attempts} attempts: {error_details}')
+                                   .replace('{url}', in_dict['url'])
+                                   .replace('{attempts}', str(attempt + 1))
+                                   .replace('{error_details}', error_details))
+                raise requests.HTTPError(error_details)
+            waiting_seconds = in_dict.get('backoff seconds', 2) * (2 ** attempt)
+            local_logger.warning(self.locale.gettext(
+                'Request to {url} failed ({error_details}), retrying in {seconds} seconds')
+                                 .replace('{url}', in_dict['url'])
+                                 .replace('{error_details}', error_details)
+                                 .replace('{seconds}', str(waiting_seconds)))
+            time.sleep(waiting_seconds)
+            attempt += 1
+            if in_dict.get('retry counter') is not None:
+                in_dict['retry counter'].append(attempt)
+            if in_dict.get('before retry') is not None and in_dict['before retry']():
+                return None
+
+    def fn_upload_file_in_chunks(self, local_logger, timer, in_dict):
+        """
+        Uploads a file in chunks within a Tableau Server file upload session
+
+        :param local_logger: logger handler to capture running details
+        :param timer: pointer to measure code performance
+        :param in_dict: dictionary containing following keys with relevant values:
+            "connection" (with "base url", "site id" and "auth token"), "file name",
+            "chunk size [MB]" and optionally "retries" and "backoff seconds"
+        :return: dictionary with upload session identifier and throughput metrics
+        """
+        chunk_size = int(float(in_dict['chunk size [MB]']) * self.bytes_per_megabyte)
+        if chunk_size <= 0:
+            raise ValueError(self.locale.gettext('Upload chunk size has to be positive'))
+        timer.start()
+        file_size = os.path.getsize(in_dict['file name'])
+        chunks_expected = max(1, -(-file_size // chunk_size))
+        upload_session_id = self.fn_initiate_upload_session(local_logger, in_dict['connection'])
+        url = self.fn_build_site_url(in_dict['connection']) + '/fileUploads/' + upload_session_id
+        metrics = {
+            'bytes uploaded': 0,
+            'chunks uploaded': 0,
+            'retries': [],
+            'seconds': 0,
+        }
+        time_started = time.perf_counter()
+        # Tableau Server appends chunks in arrival order, therefore only reading next chunk
+        # from disk can overlap with the upload of current one
+        with open(in_dict['file name'], 'rb') as file_handler, \
+                ThreadPoolExecutor(max_workers=1) as read_ahead:
+            next_chunk = read_ahead.submit(self.fn_read_file_chunk, file_handler, chunk_size)
+            current_chunk = next_chunk.result()
+            while current_chunk:
+                next_chunk = read_ahead.submit(self.fn_read_file_chunk, file_handler, chunk_size)
+                body, content_type = self.fn_build_multipart_body([{
+                    'content': b'',
+                    'content type': 'text/xml',
+                    'name': 'request_payload',
+                }, {
+                    'content': current_chunk,
+                    'content type': 'application/octet-stream',
+                    'file name': 'file',
+                    'name': 'tableau_file',
+                }])
+                self.fn_request_with_retry(local_logger, {
+                    'backoff seconds': in_dict.get('backoff seconds', 2),
+                    # appending is not idempotent, a failed chunk might have been applied anyway
+                    'before retry': partial(self.fn_is_chunk_appended, local_logger, {
+                        'bytes before': metrics['bytes uploaded'],
+                        'chunk bytes': len(current_chunk),
+                        'connection': in_dict['connection'],
+                        'url': url,
+                    }),
+                    'connection': in_dict['connection'],
+                    'data': body,
+                    'headers': {'Content-Type': content_type},
+                    'method': 'PUT',
+                    'retries': in_dict.get('retries', 3),
+                    'retry counter': metrics['retries'],
+                    'url': url,
+                })
+                metrics['bytes uploaded'] += len(current_chunk)
+                metrics['chunks uploaded'] += 1
+                metrics['seconds'] = time.perf_counter() - time_started
+                local_logger.info(self.locale.gettext(
+                    'Chunk {chunk_number} of {chunks_expected} uploaded, '
+                    + '{percentage}% completed at {throughput} MB/s')
+                                  .replace('{chunk_number}', str(metrics['chunks uploaded']))
+                                  .replace('{chunks_expected}', str(chunks_expected))
+                                  .replace('{percentage}', str(round(
+                                      metrics['bytes uploaded'] * 100 / max(file_size, 1), 2)))
+                                  .replace('{throughput}', str(self.fn_throughput(metrics))))
+                current_chunk = next_chunk.result()
+        metrics['retries'] = len(metrics['retries'])
+        metrics['throughput [MB/s]'] = self.fn_throughput(metrics)
+        metrics['upload session id'] = upload_session_id
+        local_logger.info(self.locale.gettext(
+            'File "{file_name}" uploaded as {bytes_uploaded} bytes in {chunks_uploaded} chunks '
+            + 'within {seconds} seconds ({throughput} MB/s) with {retries} retries')
+                          .replace('{file_name}', in_dict['file name'])
+                          .replace('{bytes_uploaded}', str(metrics['bytes uploaded']))
+                          .replace('{chunks_uploaded}', str(metrics['chunks uploaded']))
+                          .replace('{seconds}', str(round(metrics['seconds'], 3)))
+                          .replace('{throughput}', str(metrics['throughput [MB/s]']))
+                          .replace('{retries}', str(metrics['retries'])))
+        timer.stop()
+        return metrics
+
+    @staticmethod
+    def fn_throughput(in_metrics):
+        if in_metrics['seconds'] == 0:
+            return 0
+        return round(in_metrics['bytes uploaded'] / 1024 / 1024 / in_metrics['seconds'], 3)
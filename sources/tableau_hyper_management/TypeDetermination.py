@@ -3,29 +3,20 @@ TypeDetermination - a data type determination library
 
 This library allows data type determination based on data frame content
 """
-# package to add support for multi-language (i18n)
-import gettext
 # package to handle numerical structures
 import numpy
-# package to handle files/folders and related metadata/operations
-import os
 # regular expression package
 import re
 # package to facilitate common operations
 from .BasicNeeds import BasicNeeds
+from .LocaleNeeds import LocaleNeeds
 
 
 class TypeDetermination(BasicNeeds):
     locale = None
 
     def __init__(self, in_language):
-        file_parts = os.path.normpath(os.path.abspath(__file__)).replace('\\', os.path.altsep)\
-            .split(os.path.altsep)
-        locale_domain = file_parts[(len(file_parts)-1)].replace('.py', '')
-        locale_folder = os.path.normpath(os.path.join(
-            os.path.join(os.path.altsep.join(file_parts[:-2]), 'project_locale'), locale_domain))
-        self.locale = gettext.translation(locale_domain, localedir=locale_folder,
-                                          languages=[in_language], fallback=True)
+        self.locale = LocaleNeeds.fn_get_translation(__file__, in_language)
 
     def fn_analyze_field_content_to_establish_data_type(self, logger, field_characteristics,
                                                         data_types):
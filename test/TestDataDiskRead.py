@@ -0,0 +1,89 @@
+import openpyxl
+import os
+import pandas as pd
+from sources.tableau_hyper_management.DataDiskRead import DataDiskRead
+from sources.tableau_hyper_management.DataManipulator import DataManipulator
+import tempfile
+import unittest
+
+
+class TestDataDiskRead(unittest.TestCase):
+
+    def test_flatten_nested_columns(self):
+        data_frame = pd.DataFrame({
+            'id': [1, 2],
+            'user': [{'name': 'Ana', 'geo': {'country': 'RO'}}, None],
+        })
+        value_to_assert = DataDiskRead.fn_internal_flatten_nested_columns(data_frame)
+        self.assertEqual(list(value_to_assert.columns),
+                         ['id', 'user.name', 'user.geo.country'])
+        self.assertEqual(value_to_assert['user.geo.country'].tolist()[0], 'RO')
+
+    def test_read_json_lines_with_key_missing_in_chunk(self):
+        file_name = os.path.join(tempfile.mkdtemp(), 'events.jsonl')
+        with open(file_name, 'w') as file_handle:
+            file_handle.write('{"id": 1, "user": {"name": "Ana"}}\n'
+                              + '{"id": 2, "user": {"name": "Ion", "geo": {"country": "RO"}}}\n')
+        value_to_assert = DataDiskRead.fn_internal_read_json_lines_file({
+            'chunk rows': 1,
+            'column renames': {},
+            'columns': ['id', 'user.geo.country'],
+            'compression': 'infer',
+            'filter rule': None,
+        }, file_name)
+        self.assertEqual(value_to_assert['id'].tolist(), [1, 2])
+        self.assertTrue(pd.isna(value_to_assert['user.geo.country'].tolist()[0]))
+        self.assertEqual(value_to_assert['user.geo.country'].tolist()[1], 'RO')
+
+    def test_split_excel_range(self):
+        self.assertEqual(DataDiskRead.fn_internal_split_excel_range('Sales!$A$2:C10'),
+                         {'sheet': 'Sales', 'range': 'A2:C10'})
+        self.assertEqual(DataDiskRead.fn_internal_split_excel_range('!B1:D5'),
+                         {'sheet': 0, 'range': 'B1:D5'})
+        self.assertEqual(DataDiskRead.fn_internal_split_excel_range(''),
+                         {'sheet': 0, 'range': None})
+
+    def test_stream_excel_sheet_range(self):
+        work_book = openpyxl.Workbook()
+        work_book.active.title = 'Notes'
+        work_sheet = work_book.create_sheet('Sales')
+        work_sheet.append(['Title line to skip'])
+        work_sheet.append(['Country', 'Amount', 'Comment'])
+        for crt_row in (['RO', 10, 'a'], ['FR', 20, None], [None, None, None]):
+            work_sheet.append(crt_row)
+        file_name = os.path.join(tempfile.mkdtemp(), 'workbook.xlsx')
+        work_book.save(file_name)
+        excel_range = DataDiskRead.fn_internal_split_excel_range('Sales!A2:C5')
+        value_to_assert = DataDiskRead.fn_internal_stream_excel_sheet(
+            {'columns': ['Amount', 'Country']}, file_name, excel_range)
+        self.assertEqual(list(value_to_assert.columns), ['Amount', 'Country'])
+        self.assertEqual(value_to_assert['Amount'].tolist(), [10, 20])
+
+    def test_parquet_filter_matches_in_memory_filter_with_nulls(self):
+        data_frame = pd.DataFrame({
+            'Amount': [1.0, None, 10.0, 4.0, None],
+            'Region': ['North', 'South', None, 'East', None],
+        })
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            file_name = os.path.join(temporary_folder, 'data.parquet')
+            data_frame.to_parquet(file_name, index=False)
+            for crt_rule in [
+                {'column': 'Region', 'operator': 'ne', 'value': 'South'},
+                {'column': 'Region', 'operator': 'notin', 'values': ['North', 'East']},
+                {'column': 'Amount', 'operator': 'ne', 'value': 4},
+                {'or': [{'column': 'Amount', 'operator': 'gt', 'value': 2},
+                        {'column': 'Region', 'operator': 'isin', 'values': ['North']}]},
+            ]:
+                value_to_assert = DataDiskRead.fn_internal_load_parquet_file_into_data_frame({
+                    'column renames': {},
+                    'columns': [],
+                    'files list': [file_name],
+                    'filter rule': crt_rule,
+                    'format': 'parquet',
+                })['out data frame']
+                expected_rows = data_frame.loc[
+                    DataManipulator.fn_build_filter_mask(data_frame, crt_rule)]
+                self.assertEqual(
+                    value_to_assert[['Amount', 'Region']].reset_index(drop=True)
+                    .fillna('NULL').values.tolist(),
+                    expected_rows.reset_index(drop=True).fillna('NULL').values.tolist())
@@ -0,0 +1,123 @@
+import logging
+from codetiming import Timer
+import numpy
+import pandas as pd
+from sources.tableau_hyper_management.DataManipulator import DataManipulator
+import unittest
+
+
+class TestDataManipulator(unittest.TestCase):
+
+    def test_add_and_shift_column(self):
+        class_dm = DataManipulator()
+        data_frame = pd.DataFrame({
+            'Amount': [10.05, 3.0, numpy.nan, 7.0],
+            'Item': ['banana', 'apple', None, 'pear'],
+        })
+        data_frame = class_dm.fn_add_and_shift_column(
+            logging.getLogger(__name__), Timer('test', logger=None), data_frame, [{
+                'Deviation': 1,
+                'Direction': 'down',
+                'Empty Values Replacement': 0,
+                'New Column': 'Previous Amount',
+                'Original Column': 'Amount',
+            }, {
+                'Deviation': 1,
+                'Direction': 'up',
+                'Empty Values Replacement': '-',
+                'New Column': 'Next Item',
+                'Original Column': 'Item',
+            }])
+        self.assertEqual(data_frame['Previous Amount'].tolist(), ['0', '10.05', '3', '0'])
+        self.assertEqual(data_frame['Next Item'].tolist(), ['apple', '-', 'pear', '-'])
+
+    def test_apply_transformations(self):
+        class_dm = DataManipulator()
+        data_frame = pd.DataFrame({
+            'Amount': [10.0, -2.0, 4.0],
+            'Internal Code': ['x', 'y', 'z'],
+            'Region': ['North', 'South', 'Unknown'],
+        })
+        data_frame = class_dm.fn_apply_transformations_to_data_frame(
+            logging.getLogger(__name__), Timer('test', logger=None), data_frame, [
+                {'operation': 'filter', 'column_to_filter': 'Region',
+                 'filter_to_apply': 'different', 'filter_values': 'Unknown'},
+                {'operation': 'derive', 'New Column': 'Double', 'Expression': '`Amount` * 2'},
+                {'operation': 'filter', 'query': '`Amount` > 0'},
+                {'operation': 'rename', 'map': {'Amount': 'Net Amount'}},
+                {'operation': 'drop', 'columns': ['Internal Code']},
+            ])
+        self.assertEqual(list(data_frame.columns), ['Net Amount', 'Region', 'Double'])
+        self.assertEqual(data_frame['Double'].tolist(), [20.0])
+
+    def test_apply_query_with_quoted_values(self):
+        class_dm = DataManipulator()
+        data_frame = pd.DataFrame({
+            'Amount': [1, 5, 10, numpy.nan],
+            'Region': ['North', 'It\'s "q"', 'South', None],
+        })
+        value_to_assert = class_dm.fn_apply_query_to_data_frame(
+            logging.getLogger(__name__), Timer('test', logger=None), data_frame, {
+                'column_to_filter': 'Region',
+                'filter_to_apply': 'equal',
+                'filter_values': 'It\'s "q"',
+            })
+        self.assertEqual(value_to_assert['Amount'].tolist(), [5])
+        value_to_assert = class_dm.fn_apply_query_to_data_frame(
+            logging.getLogger(__name__), Timer('test', logger=None), data_frame, {
+                'column_to_filter': 'Region',
+                'filter_to_apply': 'multiple_match',
+                'filter_values': {'1': 'It\'s "q"', '2': 'South'},
+            })
+        self.assertEqual(value_to_assert['Amount'].tolist(), [5, 10])
+        value_to_assert = class_dm.fn_apply_transformations_to_data_frame(
+            logging.getLogger(__name__), Timer('test', logger=None), data_frame, [
+                {'operation': 'filter', 'rule': {'or': [
+                    {'and': [
+                        {'column': 'Amount', 'operator': 'between', 'lower': 2, 'upper': 10},
+                        {'column': 'Region', 'operator': 'isin', 'values': ['It\'s "q"']},
+                    ]},
+                    {'column': 'Region', 'operator': 'isnull'},
+                ]}},
+            ])
+        self.assertEqual(value_to_assert['Region'].tolist(), ['It\'s "q"', None])
+        # source data frame is left untouched by filtering
+        self.assertEqual(len(data_frame), 4)
+
+    def test_filter_mask(self):
+        data_frame = pd.DataFrame({
+            'Amount': [1, 5, 10, numpy.nan],
+            'Region': ['North', 'South', 'It\'s "quoted"', None],
+        })
+        value_to_assert = DataManipulator.fn_build_filter_mask(data_frame, {'or': [
+            {'and': [
+                {'column': 'Amount', 'operator': 'between', 'lower': 2, 'upper': 10},
+                {'column': 'Region', 'operator': 'isin', 'values': ['It\'s "quoted"']},
+            ]},
+            {'column': 'Region', 'operator': 'isnull'},
+        ]})
+        self.assertEqual(list(value_to_assert), [False, False, True, True])
+        for crt_combination, crt_expected in (('and', True), ('or', False)):
+            value_to_assert = data_frame.loc[DataManipulator.fn_build_filter_mask(
+                data_frame, {'or': [{crt_combination: []}, {'column': 'Amount',
+                                                            'operator': 'eq', 'value': 1}]})]
+            self.assertEqual(len(value_to_assert), 4 if crt_expected else 1)
+            self.assertIsNone(DataManipulator.fn_convert_filter_to_parquet_filters(
+                {crt_combination: []}))
+
+    def test_parquet_filters(self):
+        value_to_assert = DataManipulator.fn_convert_filter_to_parquet_filters({'or': [
+            {'column': 'Region', 'operator': 'eq', 'value': 'North'},
+            {'and': [
+                {'column': 'Amount', 'operator': 'between', 'lower': 2, 'upper': 10},
+                {'column': 'Region', 'operator': 'isin', 'values': ['South']},
+            ]},
+        ]})
+        self.assertEqual(value_to_assert, [
+            [('Region', '=', 'North')],
+            [('Amount', '>=', 2), ('Amount', '<=', 10), ('Region', 'in', ['South'])],
+        ])
+        for crt_operator in ('isnull', 'ne', 'notin'):
+            self.assertIsNone(DataManipulator.fn_convert_filter_to_parquet_filters(
+                {'column': 'Region', 'operator': crt_operator, 'value': 'South',
+                 'values': ['South']}))
@@ -0,0 +1,95 @@
+import json
+import os
+import pandas as pd
+import pyarrow.feather
+import pyarrow.parquet
+from sources.tableau_hyper_management.DataStreamWriter import DataStreamWriter
+import tempfile
+import unittest
+import zipfile
+
+
+class TestDataStreamWriter(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.data_frame = pd.DataFrame({
+            'Amount': range(10),
+            'Day': pd.date_range('2020-01-01', periods=10),
+        })
+        self.folder = tempfile.mkdtemp()
+
+    def test_csv_compressed_in_chunks(self):
+        file_name = os.path.join(self.folder, 'output.csv.gz')
+        with DataStreamWriter({'field delimiter': ',', 'format': 'csv',
+                               'name': file_name}) as stream_writer:
+            stream_writer.fn_write(self.data_frame.iloc[0:6])
+            stream_writer.fn_write(self.data_frame.iloc[6:10])
+        value_to_assert = pd.read_csv(file_name, compression='gzip')
+        self.assertEqual(value_to_assert['Amount'].tolist(), list(range(10)))
+
+    def test_csv_zip_archive(self):
+        file_name = os.path.join(self.folder, 'output.csv.zip')
+        with DataStreamWriter({'field delimiter': ',', 'format': 'csv',
+                               'name': file_name}) as stream_writer:
+            stream_writer.fn_write(self.data_frame.iloc[0:6])
+            stream_writer.fn_write(self.data_frame.iloc[6:10])
+        self.assertEqual(zipfile.ZipFile(file_name).namelist(), ['output.csv'])
+        value_to_assert = pd.read_csv(file_name, compression='zip')
+        self.assertEqual(value_to_assert['Amount'].tolist(), list(range(10)))
+
+    def test_parquet_row_groups(self):
+        file_name = os.path.join(self.folder, 'output.parquet')
+        with DataStreamWriter({'chunk rows': 4, 'format': 'parquet',
+                               'name': file_name}) as stream_writer:
+            stream_writer.fn_write(self.data_frame)
+        value_to_assert = pyarrow.parquet.ParquetFile(file_name)
+        self.assertEqual(value_to_assert.metadata.num_row_groups, 3)
+        self.assertEqual(str(value_to_assert.schema_arrow.field('Day').type), 'timestamp[us]')
+
+    def test_partitioned_dataset(self):
+        folder_name = os.path.join(self.folder, 'dataset')
+        self.data_frame['Month'] = self.data_frame['Day'].dt.month
+        self.data_frame['Parity'] = (self.data_frame['Amount'] % 2).map({0: 'even', 1: 'odd'})
+        with DataStreamWriter.fn_get_stream_writer({
+            'chunk rows': 100,
+            'format': 'parquet',
+            'name': folder_name,
+            'partition columns': ['Month', 'Parity'],
+        }) as stream_writer:
+            stream_writer.fn_write(self.data_frame.iloc[0:5])
+            stream_writer.fn_write(self.data_frame.iloc[5:10])
+        with open(os.path.join(folder_name, '_manifest.json'), 'r') as file_handler:
+            manifest = json.load(file_handler)
+        self.assertEqual(manifest['Rows'], 10)
+        self.assertEqual([crt['File'] for crt in manifest['Files']],
+                         ['Month=1/Parity=even/part-00000.parquet',
+                          'Month=1/Parity=odd/part-00000.parquet'])
+        value_to_assert = pd.read_parquet(
+            os.path.join(folder_name, 'Month=1', 'Parity=odd', 'part-00000.parquet'))
+        self.assertEqual(value_to_assert['Amount'].tolist(), [1, 3, 5, 7, 9])
+
+    def test_partitioned_dataset_rewritten(self):
+        folder_name = os.path.join(self.folder, 'dataset')
+        for crt_keys in ([1, 2, None], [1]):
+            with DataStreamWriter.fn_get_stream_writer({
+                'chunk rows': 100,
+                'field delimiter': ',',
+                'format': 'csv',
+                'name': folder_name,
+                'partition columns': ['K'],
+            }) as stream_writer:
+                stream_writer.fn_write(pd.DataFrame({
+                    'Amount': range(len(crt_keys)),
+                    'K': pd.Series(crt_keys, dtype='float64'),
+                }))
+        self.assertEqual(sorted(os.listdir(folder_name)), ['K=1', '_manifest.json'])
+        self.assertEqual(os.listdir(self.folder), ['dataset'])
+
+    def test_feather_record_batches(self):
+        file_name = os.path.join(self.folder, 'output.feather')
+        with DataStreamWriter({'chunk rows': 4, 'format': 'feather',
+                               'name': file_name}) as stream_writer:
+            stream_writer.fn_write(self.data_frame)
+        value_to_assert = pyarrow.feather.read_table(file_name, memory_map=True)
+        self.assertEqual(value_to_assert.num_rows, 10)
+        self.assertEqual(value_to_assert.column('Amount').num_chunks, 3)
@@ -1,6 +1,9 @@
+from codetiming import Timer
 from datetime import datetime
+import logging
 import os
 from sources.tableau_hyper_management.FileOperations import FileOperations
+import tempfile
 import unittest
 # package to facilitate multiple operation system operations
 import platform
@@ -27,3 +30,37 @@ class TestFileOperations(unittest.TestCase):
         value_to_assert = class_fo.fn_get_file_dates(__file__)['created']
         value_to_compare_with = datetime.fromtimestamp(os.path.getctime(__file__))
         self.assertEqual(value_to_assert, value_to_compare_with)
+
+    def test_staging_file_name(self):
+        final_file_name = os.path.join('output', 'extract.hyper')
+        value_to_assert = FileOperations.fn_build_staging_file_name(final_file_name)
+        self.assertEqual(os.path.dirname(value_to_assert), 'output')
+        self.assertTrue(value_to_assert.endswith('.hyper'))
+        self.assertNotEqual(value_to_assert, final_file_name)
+
+    def test_promote_staging_file(self):
+        class_fo = FileOperations()
+        final_file_name = os.path.join(tempfile.mkdtemp(), 'extract.hyper')
+        for crt_content, crt_write_mode in (('first', 'staged'), ('second', 'staged'),
+                                            ('third', 'staged-keep-previous')):
+            staging_file_name = FileOperations.fn_build_staging_file_name(final_file_name)
+            with open(staging_file_name, 'w') as file_handle:
+                file_handle.write(crt_content)
+            class_fo.fn_promote_staging_file(
+                logging.getLogger(__name__), Timer('test', logger=None), {
+                    'final file': final_file_name,
+                    'keep previous': (crt_write_mode == 'staged-keep-previous'),
+                    'staging file': staging_file_name,
+                })
+            self.assertFalse(os.path.exists(staging_file_name))
+        with open(final_file_name, 'r') as file_handle:
+            self.assertEqual(file_handle.read(), 'third')
+        with open(final_file_name + '.previous', 'r') as file_handle:
+            self.assertEqual(file_handle.read(), 'second')
+        self.assertEqual(sorted(os.listdir(os.path.dirname(final_file_name))),
+                         ['extract.hyper', 'extract.hyper.previous'])
+
+    def test_file_compression_detection(self):
+        self.assertEqual(FileOperations.fn_detect_file_compression('feed.csv.zst'), 'zstd')
+        self.assertEqual(FileOperations.fn_detect_file_compression(__file__, 'gzip'), 'gzip')
+        self.assertIsNone(FileOperations.fn_detect_file_compression(__file__))
@@ -0,0 +1,16 @@
+from sources.tableau_hyper_management.DataManipulator import DataManipulator
+from sources.tableau_hyper_management.LocaleNeeds import LocaleNeeds
+import unittest
+
+
+class TestLocaleNeeds(unittest.TestCase):
+
+    def test_translation_shared_by_instances(self):
+        first_instance = DataManipulator('en_US')
+        second_instance = DataManipulator('en_US')
+        self.assertIs(first_instance.locale, second_instance.locale)
+        self.assertIs(first_instance.locale, LocaleNeeds.translations[('DataManipulator', 'en_US')])
+
+    def test_missing_catalog_falls_back(self):
+        translation = LocaleNeeds.fn_get_translation(__file__, 'xx_XX')
+        self.assertEqual(translation.gettext('Some message'), 'Some message')
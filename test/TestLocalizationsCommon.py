@@ -0,0 +1,80 @@
+import json
+import os
+from sources.project_locale.localizations_common import LocalizationsCommon
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+
+class TemporaryLocalizations(LocalizationsCommon):
+    folder = None
+
+    def get_this_file_folder(self):
+        return self.folder
+
+
+class TestLocalizationsCommon(unittest.TestCase):
+
+    def setUp(self):
+        self.class_lc = TemporaryLocalizations()
+        self.class_lc.folder = tempfile.mkdtemp()
+        catalog_folder = os.path.join(self.class_lc.folder, 'Domain', 'it_IT', 'LC_MESSAGES')
+        os.makedirs(catalog_folder)
+        self.source_file = os.path.join(catalog_folder, 'Domain.po')
+        for crt_file in (self.source_file, self.source_file.replace('.po', '.mo')):
+            with open(crt_file, 'w', encoding='utf-8') as file_handle:
+                file_handle.write('msgid "A"\n')
+
+    def replace_file(self, in_file_name, in_content):
+        # like git checkout or editors saving, a new file takes the place of the old one
+        time.sleep(0.05)
+        with open(in_file_name + '.new', 'w', encoding='utf-8') as file_handle:
+            file_handle.write(in_content)
+        os.replace(in_file_name + '.new', in_file_name)
+
+    def test_stamp_follows_sources(self):
+        self.assertFalse(self.class_lc.is_compiled_catalogs_stamp_valid())
+        self.assertTrue(self.class_lc.store_compiled_catalogs_stamp())
+        # no catalog is looked for while folders are unchanged
+        with unittest.mock.patch.object(self.class_lc, 'get_project_localisation_source_files',
+                                        side_effect=AssertionError):
+            self.assertTrue(self.class_lc.is_compiled_catalogs_stamp_valid())
+        self.replace_file(self.source_file, 'msgid "B"\n')
+        self.assertFalse(self.class_lc.is_compiled_catalogs_stamp_valid())
+
+    def test_new_domain_invalidates_stamp(self):
+        self.class_lc.store_compiled_catalogs_stamp()
+        time.sleep(0.05)
+        other_folder = os.path.join(self.class_lc.folder, 'Other', 'it_IT', 'LC_MESSAGES')
+        os.makedirs(other_folder)
+        with open(os.path.join(other_folder, 'Other.po'), 'w', encoding='utf-8') as file_handle:
+            file_handle.write('msgid "A"\n')
+        self.assertFalse(self.class_lc.is_compiled_catalogs_stamp_valid())
+
+    def test_touched_folders_with_same_catalogs_refresh_stamp(self):
+        self.class_lc.store_compiled_catalogs_stamp()
+        # like a re-install: same content, all modification times different
+        self.replace_file(self.source_file, 'msgid "A"\n')
+        for crt_folder, _, _ in os.walk(self.class_lc.folder):
+            os.utime(crt_folder, (1, 1))
+        stamp_file = os.path.join(self.class_lc.folder, self.class_lc.compiled_stamp_file)
+        stamp_before = os.path.getmtime(stamp_file)
+        self.assertTrue(self.class_lc.is_compiled_catalogs_stamp_valid())
+        self.assertNotEqual(os.path.getmtime(stamp_file), stamp_before)
+        with open(stamp_file, 'r', encoding='utf-8') as file_handle:
+            self.assertEqual(json.load(file_handle)['folders']['.'], 1000000000)
+
+    def test_missing_compiled_catalog_invalidates_stamp(self):
+        self.class_lc.store_compiled_catalogs_stamp()
+        os.remove(self.source_file.replace('.po', '.mo'))
+        self.assertFalse(self.class_lc.is_compiled_catalogs_stamp_valid())
+        self.assertFalse(self.class_lc.store_compiled_catalogs_stamp())
+
+    def test_corrupt_stamp_ignored(self):
+        stamp_file = os.path.join(self.class_lc.folder, self.class_lc.compiled_stamp_file)
+        for crt_content in ('{"Domain/it_IT', '[]', '{"catalogs": 1, "folders": {}}',
+                            '{"catalogs": {"Domain/it_IT/LC_MESSAGES/Domain.po": 1}}'):
+            with open(stamp_file, 'w', encoding='utf-8') as file_handle:
+                file_handle.write(crt_content)
+            self.assertFalse(self.class_lc.is_compiled_catalogs_stamp_valid())
@@ -0,0 +1,76 @@
+import json
+import os
+from sources.tableau_hyper_management.RunMetrics import RunMetrics
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# a script stopping midway, either by exit(1) or by an unhandled exception
+INTERRUPTED_SCRIPT = '''
+import sys
+from types import SimpleNamespace
+from sources.tableau_hyper_management.ProjectNeeds import ProjectNeeds
+class_pn = ProjectNeeds('converter')
+class_pn.parameters = SimpleNamespace(output_log_file='None', profile='None',
+                                      prometheus_textfile='None', run_report_file=sys.argv[1])
+class_pn.initiate_logger_and_timer()
+class_pn.class_rm.fn_start_stage('load')
+class_pn.class_rm.fn_stop_stage('load', 10)
+class_pn.class_rm.fn_start_stage('insert')
+if sys.argv[2] == 'exit':
+    exit(1)
+raise RuntimeError('insert failed')
+'''
+
+
+class TestRunMetrics(unittest.TestCase):
+
+    def test_stage_figures_accumulate(self):
+        class_rm = RunMetrics('converter')
+        for crt_rows in (10, 30):
+            class_rm.fn_start_stage('load')
+            class_rm.fn_stop_stage('load', crt_rows, 100)
+        value_to_assert = class_rm.fn_build_report()['Stages']['load']
+        self.assertEqual(value_to_assert['runs'], 2)
+        self.assertEqual(value_to_assert['rows'], 40)
+        self.assertEqual(value_to_assert['bytes'], 200)
+
+    def test_store_reports(self):
+        folder = tempfile.mkdtemp()
+        class_rm = RunMetrics('converter')
+        class_rm.fn_start_stage('insert')
+        class_rm.fn_stop_stage('insert', 5)
+        class_rm.fn_store_reports({
+            'prometheus textfile': os.path.join(folder, 'converter.prom'),
+            'run report file': os.path.join(folder, 'report.json'),
+        })
+        with open(os.path.join(folder, 'report.json'), 'r') as file_handle:
+            self.assertEqual(json.load(file_handle)['Stages']['insert']['rows'], 5)
+        with open(os.path.join(folder, 'converter.prom'), 'r') as file_handle:
+            self.assertIn(
+                'tableau_hyper_management_stage_rows{script="converter",stage="insert"} 5',
+                file_handle.read().splitlines())
+        self.assertEqual(sorted(os.listdir(folder)), ['converter.prom', 'report.json'])
+
+    def test_report_stored_when_run_stops_midway(self):
+        folder = tempfile.mkdtemp()
+        project_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for crt_way in ('exit', 'exception'):
+            report_file = os.path.join(folder, crt_way + '.json')
+            completed = subprocess.run([sys.executable, '-c', INTERRUPTED_SCRIPT,
+                                        report_file, crt_way], cwd=project_folder,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.assertEqual(completed.returncode, 1)
+            with open(report_file, 'r') as file_handle:
+                report = json.load(file_handle)
+            self.assertEqual(report['Status'], 'failure')
+            self.assertEqual(report['Stages']['load']['rows'], 10)
+            self.assertEqual(report['Stages']['insert']['runs'], 1)
+
+    def test_running_stages_stopped(self):
+        class_rm = RunMetrics('converter')
+        class_rm.fn_start_stage('load')
+        class_rm.fn_stop_running_stages()
+        class_rm.fn_stop_running_stages()
+        self.assertEqual(class_rm.fn_build_report()['Stages']['load']['runs'], 1)
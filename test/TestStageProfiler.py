@@ -0,0 +1,21 @@
+import os
+from sources.tableau_hyper_management.StageProfiler import StageProfiler
+import tempfile
+import unittest
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def test_profiles_and_snapshots_stored(self):
+        folder = tempfile.mkdtemp()
+        class_sp = StageProfiler({'file prefix': os.path.join(folder, 'run'), 'mode': 'cprofile'})
+        for crt_stage in ('load', 'rebuild'):
+            class_sp.fn_start(crt_stage)
+            sorted([str(crt_value) for crt_value in range(1000)])
+            class_sp.fn_stop(crt_stage)
+        summary_file = class_sp.fn_store_profiles()
+        self.assertEqual(sorted(os.listdir(folder)), [
+            'run.load.prof', 'run.profile-summary.txt', 'run.rebuild.1.tracemalloc',
+            'run.rebuild.prof'])
+        with open(summary_file, 'r', encoding='utf-8') as file_handle:
+            self.assertIn('Peak traced memory [bytes]', file_handle.read())
@@ -0,0 +1,190 @@
+from codetiming import Timer
+import logging
+import os
+from sources.tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+from tableauhyperapi import Connection, CreateMode, HyperException, HyperProcess, NOT_NULLABLE, \
+    NULLABLE, SqlType, TableDefinition, TableName, Telemetry
+import tempfile
+import unittest
+
+
+class TestTableauHyperApiExtraLogic(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.current_folder = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        # Hyper engine writes its own logs into current folder
+        os.chdir(self.folder)
+        self.hyper_file = os.path.join(self.folder, 'Test.hyper')
+        self.logger = logging.getLogger(__name__)
+        self.timer = Timer('test', logger=None)
+
+    def tearDown(self) -> None:
+        os.chdir(self.current_folder)
+
+    def hyper_handle(self, in_action, in_rows, **in_options):
+        in_dict = {
+            'action': in_action,
+            'data': in_rows,
+            'hyper file': self.hyper_file,
+            'hyper table columns': [
+                TableDefinition.Column('Id', SqlType.big_int(), NULLABLE),
+                TableDefinition.Column('Region', SqlType.text(), NOT_NULLABLE),
+                TableDefinition.Column('Amount', SqlType.double(), NULLABLE),
+            ],
+            'schema name': 'Extract',
+            'table name': 'Extract',
+        }
+        in_dict.update(in_options)
+        return TableauHyperApiExtraLogic('en_US').fn_hyper_handle(self.logger, self.timer, in_dict)
+
+    def read_rows(self, in_query):
+        with HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hyper_process:
+            with Connection(endpoint=hyper_process.endpoint, database=self.hyper_file,
+                            create_mode=CreateMode.NONE) as hyper_connection:
+                return hyper_connection.execute_list_query(in_query)
+
+    def test_rollup_query(self):
+        class_thael = TableauHyperApiExtraLogic('en_US')
+        value_to_assert = class_thael.fn_build_rollup_query({
+            'group_by': ['Region'],
+            'calculations': {'Amount': ['sum', 'max']},
+            'map': {'Amount_sum': 'Total Amount'},
+        }, TableName('Extract', 'Extract'))
+        value_to_compare_with = 'SELECT "Region", SUM("Amount") AS "Total Amount", ' \
+                                + 'MAX("Amount") AS "Amount_max" FROM "Extract"."Extract" ' \
+                                + 'GROUP BY "Region"'
+        self.assertEqual(value_to_assert, value_to_compare_with)
+
+    def test_rollup_query_unknown_aggregate(self):
+        class_thael = TableauHyperApiExtraLogic('en_US')
+        with self.assertRaises(ValueError):
+            class_thael.fn_build_rollup_query({
+                'group_by': ['Region'],
+                'calculations': {'Amount': ['median']},
+            }, TableName('Extract', 'Extract'))
+
+    def test_rollups_validated_upfront(self):
+        class_thael = TableauHyperApiExtraLogic('en_US')
+        self.assertEqual(class_thael.fn_validate_rollups([{
+            'table_name': 'Totals', 'group_by': [], 'calculations': {'Amount': ['sum']},
+        }]), [])
+        self.assertEqual(len(class_thael.fn_validate_rollups([
+            {'table_name': 'Totals', 'group_by': [], 'calculations': {'Amount': ['median']}},
+            {'table_name': 'Totals', 'calculations': {'Amount': ['sum']}},
+        ])), 2)
+
+    def test_rollup_table_built_in_hyper(self):
+        self.hyper_handle('overwrite', [
+            [1, 'North', 10.0], [2, 'North', 5.0], [3, 'South', 7.5], [4, 'South', None],
+        ], rollups=[{
+            'table_name': 'Regional Totals',
+            'group_by': ['Region'],
+            'calculations': {'Amount': ['sum', 'count'], 'Id': ['nunique']},
+            'map': {'Amount_sum': 'Total Amount'},
+        }])
+        self.assertEqual(self.read_rows(
+            'SELECT "Region", "Total Amount", "Amount_count", "Id_nunique" '
+            + 'FROM "Extract"."Regional Totals" ORDER BY "Region"'), [
+            ['North', 15.0, 2, 2],
+            ['South', 7.5, 1, 2],
+        ])
+
+    def test_compact_hyper_file(self):
+        self.hyper_handle('overwrite', [[crt_id, 'Region ' + str(crt_id % 3), float(crt_id)]
+                                        for crt_id in range(3000)])
+        self.hyper_handle('delete', None,
+                          query='DELETE FROM "Extract"."Extract" WHERE "Id" >= 1000')
+        size_before = os.path.getsize(self.hyper_file)
+        with self.assertLogs(self.logger, level='WARNING') as captured_logs:
+            compaction_details = TableauHyperApiExtraLogic('en_US').fn_compact_hyper_file(
+                self.logger, self.timer, {
+                    'hyper file': self.hyper_file,
+                    'sort key columns': ['Region', 'Not Existing'],
+                    'write mode': 'staged',
+                })
+        self.assertIn('Not Existing', captured_logs.output[0])
+        self.assertEqual(compaction_details['tables rewritten'], 1)
+        self.assertEqual(compaction_details['size before [bytes]'], size_before)
+        self.assertEqual(compaction_details['size after [bytes]'],
+                         os.path.getsize(self.hyper_file))
+        self.assertEqual(self.read_rows('SELECT COUNT(*) FROM "Extract"."Extract"'), [[1000]])
+        self.assertEqual([crt_file for crt_file in os.listdir(self.folder)
+                          if crt_file.endswith('.hyper')], ['Test.hyper'])
+
+    def test_upsert_with_null_key(self):
+        self.hyper_handle('overwrite', [[1, 'North', 1.0], [2, 'South', 2.0], [None, 'West', 3.0]])
+        with self.assertLogs(self.logger, level='INFO') as captured_logs:
+            self.hyper_handle('upsert', [[2, 'South', 20.0], [None, 'West', 30.0],
+                                         [4, 'East', 4.0]], **{'key columns': ['Id']})
+        self.assertIn('2 rows replaced and 1 rows added', '\n'.join(captured_logs.output))
+        self.assertIn('Table Extract has changed by 1 rows', '\n'.join(captured_logs.output))
+        self.assertEqual(self.read_rows(
+            'SELECT "Id", "Region", "Amount" FROM "Extract"."Extract" ORDER BY "Id" NULLS LAST'), [
+            [1, 'North', 1.0], [2, 'South', 20.0], [4, 'East', 4.0], [None, 'West', 30.0],
+        ])
+
+    def test_metadata_row_count_tracked_across_changes(self):
+        metadata_mode = {'row count mode': 'metadata'}
+        self.hyper_handle('overwrite', [[1, 'North', 1.0], [2, 'South', 2.0]], **metadata_mode)
+        self.hyper_handle('append', [[3, 'East', 3.0]], **metadata_mode)
+        self.hyper_handle('upsert', [[3, 'East', 30.0], [None, 'West', 4.0]],
+                          **{'key columns': ['Id'], 'row count mode': 'metadata'})
+        self.assertEqual(self.read_rows('SELECT COUNT(*) FROM "Extract"."Extract"'), [[4]])
+        self.assertEqual(self.read_rows(
+            'SELECT "Schema Name", "Table Name", "Row Count"'
+            + ' FROM "Extract Metadata"."Row Counts"'), [['Extract', 'Extract', 4]])
+
+    def test_sorted_insert_stores_rows_in_key_order(self):
+        sort_keys = {'sort key columns': ['Region', 'Id']}
+        self.hyper_handle('overwrite', [
+            [3, 'South', 3.0], [2, 'North', 2.0], [4, 'North', 4.0], [1, 'South', 1.0],
+        ], **sort_keys)
+        # no ORDER BY here, the physical insertion order is what is being checked
+        self.assertEqual(self.read_rows('SELECT "Id", "Region" FROM "Extract"."Extract"'), [
+            [2, 'North'], [4, 'North'], [1, 'South'], [3, 'South'],
+        ])
+        self.hyper_handle('upsert', [[6, 'East', 6.0], [5, 'East', 5.0], [3, 'South', 30.0]],
+                          **{'key columns': ['Id'], 'sort key columns': ['Region', 'Id']})
+        self.assertEqual(self.read_rows('SELECT "Id", "Region" FROM "Extract"."Extract"'), [
+            [2, 'North'], [4, 'North'], [1, 'South'], [5, 'East'], [6, 'East'], [3, 'South'],
+        ])
+
+    def test_export_and_read_use_given_table(self):
+        table_options = {'schema name': 'Sales', 'table name': 'Orders'}
+        self.hyper_handle('overwrite', [[1, 'North', 1.5]], **table_options)
+        self.hyper_handle('append', [[2, 'South', None]], **table_options)
+        output_file = os.path.join(self.folder, 'Orders.csv')
+        self.hyper_handle('export', None, output={
+            'chunk rows': 1,
+            'compression': 'infer',
+            'field delimiter': ',',
+            'format': 'csv',
+            'name': output_file,
+            'partition columns': [],
+        }, **table_options)
+        with open(output_file, 'r', encoding='utf-8') as file_handle:
+            self.assertEqual(file_handle.read().splitlines(),
+                             ['Id,Region,Amount', '1,North,1.5', '2,South,'])
+        value_to_assert = self.hyper_handle('read', None, **table_options)
+        self.assertEqual(value_to_assert['Region'].tolist(), ['North', 'South'])
+
+    def test_failed_statements_rolled_back(self):
+        self.hyper_handle('overwrite', [[1, 'North', 1.0], [2, 'South', 2.0]])
+        class_thael = TableauHyperApiExtraLogic('en_US')
+        with HyperProcess(telemetry=Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hyper_process:
+            with Connection(endpoint=hyper_process.endpoint, database=self.hyper_file,
+                            create_mode=CreateMode.NONE) as hyper_connection:
+                with self.assertRaises(HyperException):
+                    class_thael.fn_execute_statements_in_hyper(self.logger, self.timer, {
+                        'connection': hyper_connection,
+                        'statements': [
+                            'DELETE FROM "Extract"."Extract"',
+                            'INSERT INTO "Extract"."Extract" VALUES (3, NULL, 3.0)',
+                        ],
+                    })
+                # connection is usable again, outside any transaction
+                hyper_connection.execute_command(command='BEGIN TRANSACTION')
+                hyper_connection.execute_command(command='COMMIT')
+                self.assertEqual(hyper_connection.execute_scalar_query(
+                    query='SELECT COUNT(*) FROM "Extract"."Extract"'), 2)
@@ -0,0 +1,151 @@
+from codetiming import Timer
+import logging
+import os
+from sources.tableau_hyper_management.TableauHyperApiExtraLogic import TableauHyperApiExtraLogic
+from sources.tableau_hyper_management.TableauServerCommunicator import TableauServerCommunicator
+from tableauhyperapi import NOT_NULLABLE, NULLABLE, SqlType, TableDefinition
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+
+class FakeProjectsEndpoint:
+
+    def __init__(self, project_names, page_size):
+        self.page_size = page_size
+        self.pages_requested = []
+        self.projects = [SimpleNamespace(id='id-' + str(ndx), name=crt_name)
+                         for ndx, crt_name in enumerate(project_names)]
+
+    def get(self, req_options):
+        self.pages_requested.append(req_options.pagenumber)
+        first_item = (req_options.pagenumber - 1) * self.page_size
+        return self.projects[first_item:(first_item + self.page_size)], \
+            SimpleNamespace(page_number=req_options.pagenumber, page_size=self.page_size,
+                            total_available=len(self.projects))
+
+
+class TestTableauServerCommunicator(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger('test')
+        self.timer = Timer('test', logger=None)
+        self.projects = FakeProjectsEndpoint(
+            ['Project ' + str(ndx) for ndx in range(25)] + ['Sales', 'Sales'], 10)
+        self.class_tsc = TableauServerCommunicator('en_US')
+        self.class_tsc.tableau_server = SimpleNamespace(projects=self.projects)
+        self.class_tsc.connection_details = {
+            'Tableau Server': 'https://tableau.example.com',
+            'Tableau Site': 'site',
+        }
+
+    def test_project_ids_across_pages(self):
+        self.assertEqual(self.class_tsc.load_tableau_project_ids(
+            self.logger, self.timer, ['Project 24'], 'JustOnesMentioned'), ['id-24'])
+        self.assertEqual(len(self.class_tsc.load_tableau_project_ids(
+            self.logger, self.timer, ['Sales'], 'JustOnesMentioned')), 2)
+        self.assertEqual(len(self.class_tsc.load_tableau_project_ids(
+            self.logger, self.timer, [], 'All')), 27)
+        # index is built once, with every page read a single time
+        self.assertEqual(self.projects.pages_requested, [1, 2, 3])
+
+    def test_project_cache_file(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            cache_file = os.path.join(temporary_folder, 'projects.json')
+            self.class_tsc.configure_project_cache(cache_file, 3600)
+            self.class_tsc.load_project_index(self.logger, self.timer)
+            self.assertTrue(os.path.isfile(cache_file))
+            another_tsc = TableauServerCommunicator('en_US')
+            another_tsc.tableau_server = SimpleNamespace(projects=FakeProjectsEndpoint([], 10))
+            another_tsc.connection_details = self.class_tsc.connection_details
+            another_tsc.configure_project_cache(cache_file, 3600)
+            self.assertEqual(another_tsc.load_tableau_project_ids_by_name(
+                self.logger, self.timer, ['Project 3']), {'Project 3': ['id-3']})
+            self.assertEqual(another_tsc.tableau_server.projects.pages_requested, [])
+
+    def test_project_cache_refreshed_on_missing_project(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            cache_file = os.path.join(temporary_folder, 'projects.json')
+            self.class_tsc.configure_project_cache(cache_file, 3600)
+            self.class_tsc.load_project_index(self.logger, self.timer)
+            another_tsc = TableauServerCommunicator('en_US')
+            another_tsc.tableau_server = SimpleNamespace(projects=FakeProjectsEndpoint(
+                ['Project 0', 'Created Later'], 10))
+            another_tsc.connection_details = self.class_tsc.connection_details
+            another_tsc.configure_project_cache(cache_file, 3600)
+            self.assertEqual(another_tsc.load_tableau_project_ids_by_name(
+                self.logger, self.timer, ['Created Later']), {'Created Later': ['id-1']})
+            self.assertEqual(another_tsc.tableau_server.projects.pages_requested, [1])
+            # refreshed index is cached for next runs and a real miss is not read again
+            self.assertEqual(another_tsc.load_tableau_project_ids_by_name(
+                self.logger, self.timer, ['Not Existing']), {'Not Existing': []})
+            self.assertEqual(another_tsc.tableau_server.projects.pages_requested, [1])
+            with open(cache_file, 'r') as file_handler:
+                self.assertIn('Created Later', file_handler.read())
+
+    def test_corrupt_project_cache_ignored(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            cache_file = os.path.join(temporary_folder, 'projects.json')
+            for crt_content in ('{"connection": {', '{"created": 1}'):
+                with open(cache_file, 'w') as file_handler:
+                    file_handler.write(crt_content)
+                self.class_tsc.configure_project_cache(cache_file, 3600)
+                self.class_tsc.project_index = None
+                self.assertEqual(self.class_tsc.load_tableau_project_ids_by_name(
+                    self.logger, self.timer, ['Project 3']), {'Project 3': ['id-3']})
+
+    def build_extract(self, in_file_name, in_rows):
+        TableauHyperApiExtraLogic('en_US').fn_hyper_handle(self.logger, self.timer, {
+            'action': 'overwrite',
+            'data': in_rows,
+            'hyper file': in_file_name,
+            'hyper table columns': [
+                TableDefinition.Column('Id', SqlType.big_int(), NOT_NULLABLE),
+                TableDefinition.Column('Region', SqlType.text(), NULLABLE),
+            ],
+            'schema name': 'Extract',
+            'table name': 'Extract',
+        })
+
+    def test_publish_ledger_skips_unchanged_extract(self):
+        current_folder = os.getcwd()
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            # Hyper engine writes its own logs into current folder
+            os.chdir(temporary_folder)
+            try:
+                extract_file = os.path.join(temporary_folder, 'Test.hyper')
+                rows = [[crt_id, None if crt_id % 7 == 0 else 'Region ' + str(crt_id % 5)]
+                        for crt_id in range(1000)]
+                self.build_extract(extract_file, rows)
+                self.class_tsc.configure_publish_ledger(
+                    os.path.join(temporary_folder, 'ledger.json'))
+                data_source = {
+                    'data source name': 'Test Extract',
+                    'file name': extract_file,
+                    'project id': 'id-1',
+                }
+                self.assertTrue(self.class_tsc.is_publishing_necessary(self.logger, data_source))
+                self.class_tsc.record_successful_publishes(self.logger, [data_source])
+                # same content rebuilt (in another order) is recognized, despite different bytes
+                self.build_extract(extract_file, list(reversed(rows)))
+                self.assertFalse(self.class_tsc.is_publishing_necessary(self.logger, data_source))
+                rows[10][1] = 'Changed'
+                self.build_extract(extract_file, rows)
+                self.assertTrue(self.class_tsc.is_publishing_necessary(self.logger, data_source))
+            finally:
+                os.chdir(current_folder)
+
+    def test_corrupt_publish_ledger_ignored(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            ledger_file = os.path.join(temporary_folder, 'ledger.json')
+            for crt_content in ('', '{"key": ', '[]'):
+                with open(ledger_file, 'w') as file_handler:
+                    file_handler.write(crt_content)
+                self.class_tsc.configure_publish_ledger(ledger_file)
+                self.assertEqual(self.class_tsc.fn_load_publish_ledger(self.logger), {})
+
+    def test_publishing_failures_counted(self):
+        self.assertEqual(self.class_tsc.fn_log_publishing_failures(self.logger, [
+            {'error details': None, 'file name': 'First.hyper'},
+            {'error details': 'HTTP 503', 'file name': 'Second.hyper'},
+        ]), 1)
@@ -0,0 +1,249 @@
+from codetiming import Timer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import logging
+import os
+from sources.tableau_hyper_management.TableauServerFileUploader import TableauServerFileUploader
+import requests
+import tempfile
+import threading
+import time
+import unittest
+
+
+class MockTableauServerHandler(BaseHTTPRequestHandler):
+    appended_content = []
+    failures_after_append = 0
+    failures_to_simulate = 0
+    publish_failures = []
+    published_names = []
+    stall_seconds = 0
+
+    def do_GET(self):
+        # like Tableau Server, upload session size is given in whole megabytes
+        self.respond(200, '<fileUpload uploadSessionId="session-1" fileSize="'
+                     + str(len(b''.join(self.appended_content)) // (1024 * 1024)) + '"/>')
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(MockTableauServerHandler.stall_seconds)
+        if '/fileUploads' in self.path:
+            self.respond(200, '<fileUpload uploadSessionId="session-1" fileSize="0"/>')
+        else:
+            MockTableauServerHandler.published_names.append(self.path)
+            if len(MockTableauServerHandler.publish_failures) != 0:
+                self.respond(MockTableauServerHandler.publish_failures.pop(0), '')
+                return
+            self.respond(201, '<datasource id="datasource-1" name="Test Extract"/>')
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if MockTableauServerHandler.failures_to_simulate > 0:
+            MockTableauServerHandler.failures_to_simulate -= 1
+            self.respond(503, '')
+            return
+        file_part = body.split(b'filename="file"')[1].split(b'\r\n\r\n', 1)[1]
+        MockTableauServerHandler.appended_content.append(file_part.rsplit(b'\r\n--', 1)[0])
+        if MockTableauServerHandler.failures_after_append > 0:
+            # content applied, yet client only sees a server error
+            MockTableauServerHandler.failures_after_append -= 1
+            self.respond(503, '')
+            return
+        self.respond(200, '<fileUpload uploadSessionId="session-1" fileSize="1"/>')
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status_code, xml_content):
+        content = ('<tsResponse xmlns="http://tableau.com/api">' + xml_content
+                   + '</tsResponse>').encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class TestTableauServerFileUploader(unittest.TestCase):
+
+    def setUp(self) -> None:
+        MockTableauServerHandler.appended_content = []
+        MockTableauServerHandler.failures_after_append = 0
+        MockTableauServerHandler.failures_to_simulate = 0
+        MockTableauServerHandler.publish_failures = []
+        MockTableauServerHandler.published_names = []
+        MockTableauServerHandler.stall_seconds = 0
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), MockTableauServerHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = {
+            'auth token': 'token',
+            'base url': 'http://127.0.0.1:' + str(self.server.server_port) + '/api/3.8',
+            'site id': 'site-1',
+        }
+        self.logger = logging.getLogger('test')
+        self.timer = Timer('test', logger=None)
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_upload_in_chunks_with_retry(self):
+        MockTableauServerHandler.failures_to_simulate = 1
+        file_content = os.urandom(2 * 1024 * 1024 + 12345)
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            file_name = os.path.join(temporary_folder, 'Test.hyper')
+            with open(file_name, 'wb') as file_handler:
+                file_handler.write(file_content)
+            class_tsfu = TableauServerFileUploader()
+            metrics = class_tsfu.fn_upload_file_in_chunks(self.logger, self.timer, {
+                'backoff seconds': 0,
+                'chunk size [MB]': 1,
+                'connection': self.connection,
+                'file name': file_name,
+                'retries': 2,
+            })
+            data_source_id = class_tsfu.fn_publish_uploaded_data_source(self.logger, self.timer, {
+                'connection': self.connection,
+                'data source name': 'Test Extract',
+                'file name': file_name,
+                'project id': 'project-1',
+                'publishing mode': 'Overwrite',
+                'upload session id': metrics['upload session id'],
+            })
+        self.assertEqual(metrics['chunks uploaded'], 3)
+        self.assertEqual(metrics['retries'], 1)
+        self.assertEqual(b''.join(MockTableauServerHandler.appended_content), file_content)
+        self.assertEqual(data_source_id, 'datasource-1')
+
+    def test_publish_multiple_data_sources(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            data_sources = []
+            for file_index in range(5):
+                file_name = os.path.join(temporary_folder, 'Test' + str(file_index) + '.hyper')
+                with open(file_name, 'wb') as file_handler:
+                    file_handler.write(os.urandom(1024))
+                data_sources.append({
+                    'data source name': 'Test' + str(file_index) + ' Extract',
+                    'file name': file_name,
+                    'project id': 'project-1',
+                    'publishing mode': 'CreateNew',
+                })
+            results = TableauServerFileUploader().fn_publish_multiple_data_sources(
+                self.logger, self.timer, {
+                    'backoff seconds': 0,
+                    'chunk size [MB]': 1,
+                    'connection': self.connection,
+                    'data sources': data_sources,
+                    'workers': 3,
+                })
+        self.assertEqual(len(results), 5)
+        self.assertEqual(len(MockTableauServerHandler.published_names), 5)
+        for crt_result in results:
+            self.assertIsNone(crt_result['error details'])
+            self.assertEqual(crt_result['data source id'], 'datasource-1')
+
+    def test_failure_confined_to_its_file(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            file_name = os.path.join(temporary_folder, 'Test.hyper')
+            with open(file_name, 'wb') as file_handler:
+                file_handler.write(os.urandom(1024))
+            results = TableauServerFileUploader().fn_publish_multiple_data_sources(
+                self.logger, self.timer, {
+                    'backoff seconds': 0,
+                    'chunk size [MB]': 1,
+                    'connection': self.connection,
+                    'data sources': [{
+                        'data source name': crt_name + ' Extract',
+                        'file name': os.path.join(temporary_folder, crt_name + '.hyper'),
+                        'project id': 'project-1',
+                        'publishing mode': 'CreateNew',
+                    } for crt_name in ('Missing', 'Test')],
+                    'workers': 2,
+                })
+        results_by_file = {os.path.basename(crt['file name']): crt for crt in results}
+        self.assertIn('Missing.hyper', results_by_file['Missing.hyper']['error details'])
+        self.assertIsNone(results_by_file['Test.hyper']['error details'])
+
+    def test_stalled_server_times_out(self):
+        MockTableauServerHandler.stall_seconds = 1
+        class_tsfu = TableauServerFileUploader()
+        class_tsfu.fn_configure_request_timeout('5,0.2')
+        self.assertEqual(class_tsfu.request_timeout, (5, 0.2))
+        time_started = time.perf_counter()
+        with self.assertRaises(requests.HTTPError):
+            class_tsfu.fn_request_with_retry(self.logger, {
+                'backoff seconds': 0,
+                'connection': self.connection,
+                'method': 'POST',
+                'retries': 1,
+                'url': self.connection['base url'] + '/sites/site-1/fileUploads',
+            })
+        self.assertLess(time.perf_counter() - time_started, 1)
+
+    def build_test_file(self, in_folder, in_size):
+        file_name = os.path.join(in_folder, 'Test.hyper')
+        with open(file_name, 'wb') as file_handler:
+            file_handler.write(os.urandom(in_size))
+        return file_name
+
+    def test_chunk_applied_despite_server_error_not_appended_twice(self):
+        MockTableauServerHandler.failures_after_append = 1
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            file_name = self.build_test_file(temporary_folder, 2 * 1024 * 1024)
+            with open(file_name, 'rb') as file_handler:
+                file_content = file_handler.read()
+            metrics = TableauServerFileUploader().fn_upload_file_in_chunks(
+                self.logger, self.timer, {
+                    'backoff seconds': 0,
+                    'chunk size [MB]': 1,
+                    'connection': self.connection,
+                    'file name': file_name,
+                    'retries': 2,
+                })
+        self.assertEqual(metrics['retries'], 1)
+        self.assertEqual(len(MockTableauServerHandler.appended_content), 2)
+        self.assertEqual(b''.join(MockTableauServerHandler.appended_content), file_content)
+
+    def test_publish_retried_only_when_not_processed(self):
+        class_tsfu = TableauServerFileUploader()
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            publish_details = {
+                'connection': self.connection,
+                'data source name': 'Test Extract',
+                'file name': self.build_test_file(temporary_folder, 1024),
+                'project id': 'project-1',
+                'upload session id': 'session-1',
+            }
+            for crt_mode, crt_failures, crt_expected_posts in (
+                    ('Overwrite', [429], 2), ('Overwrite', [503], 1), ('Append', [429], 1)):
+                MockTableauServerHandler.published_names = []
+                MockTableauServerHandler.publish_failures = list(crt_failures)
+                publish_details['publishing mode'] = crt_mode
+                if crt_expected_posts == 2:
+                    class_tsfu.fn_publish_uploaded_data_source(
+                        self.logger, self.timer, publish_details)
+                else:
+                    with self.assertRaises(requests.HTTPError):
+                        class_tsfu.fn_publish_uploaded_data_source(
+                            self.logger, self.timer, publish_details)
+                    self.timer.stop()
+                self.assertEqual(len(MockTableauServerHandler.published_names),
+                                 crt_expected_posts)
+
+    def test_refused_connection_means_request_not_sent(self):
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaises(requests.ConnectionError) as captured_error:
+            requests.get(self.connection['base url'], timeout=1)
+        self.assertTrue(TableauServerFileUploader.fn_is_request_not_sent(
+            captured_error.exception))
+
+    def test_chunk_size_has_to_be_positive(self):
+        with tempfile.TemporaryDirectory() as temporary_folder:
+            file_name = self.build_test_file(temporary_folder, 1024)
+            for crt_chunk_size in (0, -1):
+                with self.assertRaises(ValueError):
+                    TableauServerFileUploader().fn_upload_file_in_chunks(
+                        self.logger, self.timer, {
+                            'chunk size [MB]': crt_chunk_size,
+                            'connection': self.connection,
+                            'file name': file_name,
+                        })